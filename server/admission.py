@@ -0,0 +1,154 @@
+"""
+Admission control
+─────────────────
+Keeps the important cameras on time when the process falls behind.  Every
+camera has a priority class:
+
+  critical  never degraded — their detection latency is what is protected
+  normal    degraded after every low camera has taken the same step
+  low       degraded first
+
+A controller thread samples process CPU and each camera's detection
+latency (frame capture → detectors done) every ADMISSION_INTERVAL seconds.
+While the worst critical camera (every camera, if none is critical) is over
+ADMISSION_TARGET_MS, or CPU is over ADMISSION_CPU_HIGH, it climbs one rung
+of the ladder per tick; after ADMISSION_RECOVER_TICKS calm ticks it steps
+back down one rung.  The ladder applies, in order:
+
+  1. detection_rate  run detectors DEGRADED_INTERVAL_FACTOR× less often
+  2. lite_model      switch detectors to LITE_MODEL
+  3. annotation      stop drawing boxes (frames pass through untouched)
+  4. viewer_fps      publish only every VIEWER_FPS_DIVISOR-th frame
+
+each first to the low cameras, then to the normal ones.  Every level change
+is logged and kept in status() (GET /health) and per camera in get_stats().
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from .metrics import ADMISSION_LEVEL
+
+log = logging.getLogger(__name__)
+
+ADMISSION_ENABLED       = os.getenv("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_INTERVAL      = float(os.getenv("ADMISSION_INTERVAL", "2"))
+ADMISSION_TARGET_MS     = float(os.getenv("ADMISSION_TARGET_MS", "500"))
+ADMISSION_CPU_HIGH      = float(os.getenv("ADMISSION_CPU_HIGH", "0.90"))   # of all cores
+ADMISSION_CPU_LOW       = float(os.getenv("ADMISSION_CPU_LOW", "0.65"))
+ADMISSION_RECOVER_TICKS = int(os.getenv("ADMISSION_RECOVER_TICKS", "3"))
+CALM_LATENCY_RATIO      = 0.6      # of the target, to count a tick as calm
+
+PRIORITIES = ("critical", "normal", "low")
+DEFAULT_PRIORITY = "normal"
+STEPS  = ("detection_rate", "lite_model", "annotation", "viewer_fps")
+LADDER: List[Tuple[str, str]] = [(step, cls) for step in STEPS for cls in ("low", "normal")]
+
+
+class AdmissionController:
+    """
+    Drives the degradation ladder for the processors returned by
+    `processors()` (objects with priority, detect_latency and
+    apply_degradation(steps)).
+    """
+
+    def __init__(self, processors: Callable[[], list], interval: float = ADMISSION_INTERVAL):
+        self._processors = processors
+        self._interval   = interval
+        self.level       = 0
+        self._calm       = 0
+        self._cpu        = 0.0
+        self._latency    = (0.0, None)  # (worst latency / target, camera)
+        self._decisions: deque = deque(maxlen=50)
+        self._stop       = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not ADMISSION_ENABLED or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="admission")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        ratio, camera = self._latency
+        return {
+            "enabled":       ADMISSION_ENABLED,
+            "level":         self.level,
+            "max_level":     len(LADDER),
+            "applied":       [f"{step}:{cls}" for step, cls in LADDER[:self.level]],
+            "cpu":           round(self._cpu, 3),
+            "latency_ratio": round(ratio, 2),
+            "worst_camera":  camera,
+            "decisions":     list(self._decisions),
+        }
+
+    # ─── Control loop ────────────────────────────────────────────────────
+
+    def _run(self):
+        cpu0, t0 = _cpu_seconds(), time.monotonic()
+        while not self._stop.wait(self._interval):
+            cpu1, t1 = _cpu_seconds(), time.monotonic()
+            self._cpu = (cpu1 - cpu0) / max(t1 - t0, 1e-6) / (os.cpu_count() or 1)
+            cpu0, t0  = cpu1, t1
+            try:
+                self.tick()
+            except Exception:
+                log.exception("Admission control tick failed")
+
+    def tick(self):
+        """One control step: measure, move at most one rung, apply."""
+        procs = list(self._processors())
+        watched = [p for p in procs if p.priority == "critical"] or procs
+        ratio, camera = max(
+            ((p.detect_latency * 1000.0 / ADMISSION_TARGET_MS, p.camera_id) for p in watched),
+            default=(0.0, None),
+        )
+        self._latency = (ratio, camera)
+
+        overloaded = ratio > 1.0 or self._cpu > ADMISSION_CPU_HIGH
+        calm       = ratio < CALM_LATENCY_RATIO and self._cpu < ADMISSION_CPU_LOW
+        self._calm = self._calm + 1 if calm else 0
+
+        if overloaded and self.level < len(LADDER):
+            self._move(+1, f"latency {ratio:.2f}× target ({camera}), cpu {self._cpu:.0%}")
+        elif self._calm >= ADMISSION_RECOVER_TICKS and self.level > 0:
+            self._calm = 0
+            self._move(-1, f"calm for {ADMISSION_RECOVER_TICKS} ticks, cpu {self._cpu:.0%}")
+
+        for proc in procs:
+            proc.apply_degradation(self.steps_for(proc.priority))
+
+    def steps_for(self, priority: str) -> frozenset:
+        return frozenset(step for step, cls in LADDER[:self.level] if cls == priority)
+
+    def _move(self, delta: int, reason: str):
+        step, cls = LADDER[self.level if delta > 0 else self.level - 1]
+        self.level += delta
+        ADMISSION_LEVEL.labels().set(self.level)
+        action = "degrade" if delta > 0 else "restore"
+        self._decisions.append({
+            "at":     datetime.utcnow().isoformat(timespec="seconds"),
+            "action": action,
+            "step":   step,
+            "class":  cls,
+            "level":  self.level,
+            "reason": reason,
+        })
+        (log.warning if delta > 0 else log.info)(
+            "Admission: %s %s for %s cameras (level %d) — %s", action, step, cls, self.level, reason,
+        )
+
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system
@@ -0,0 +1,145 @@
+"""
+Analytics
+─────────
+Per-camera time series for the ops dashboards, aggregated while the
+pipeline runs instead of scanned out of `detections` / `parking_logs`.
+
+Each StreamProcessor feeds a MinuteRecorder on every detection tick
+(vehicles per zone, visible trash) and persisted event.  Once a minute the
+AnalyticsWriter thread of the ProcessorManager closes the bucket, adds the
+frames read and connected seconds, and writes:
+
+  analytics_minute  one document per camera and minute (TTL: ANALYTICS_MINUTE_DAYS)
+  analytics_hour    upserted with $inc / $max per camera and hour
+  analytics_day     the same per day
+
+All three share one bucket layout, so GET /api/analytics answers a range
+at any resolution by reading the matching collection.  Zone names are
+stored as document keys, so "." and "$" in them are replaced with "_".
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+ANALYTICS_ENABLED        = os.getenv("ANALYTICS", "1") == "1"
+ANALYTICS_SAMPLE_SECONDS = 5.0          # uptime sampling / minute-boundary check
+
+TRASH_LABEL   = "trash_proxy"
+PARKING_LABEL = "illegal_parking"
+
+
+def _key(name: str) -> str:
+    return name.replace(".", "_").replace("$", "_")
+
+
+class MinuteRecorder:
+    """The open one-minute bucket of one camera; fed from its processor thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.ticks      = 0
+        self.trash_sum  = 0
+        self.trash_max  = 0
+        self.events     = {"trash": 0, "parking": 0}
+        self.zones: Dict[str, list] = {}        # name → [sum, max]
+        self.uptime_s   = 0.0
+
+    def tick(self, trash: int, occupancy: Optional[Dict[str, int]]):
+        with self._lock:
+            self.ticks     += 1
+            self.trash_sum += trash
+            self.trash_max  = max(self.trash_max, trash)
+            for name, count in (occupancy or {}).items():
+                acc = self.zones.setdefault(_key(name), [0, 0])
+                acc[0] += count
+                acc[1]  = max(acc[1], count)
+
+    def event(self, label: str):
+        if label == TRASH_LABEL:
+            kind = "trash"
+        elif label == PARKING_LABEL:
+            kind = "parking"
+        else:
+            return
+        with self._lock:
+            self.events[kind] += 1
+
+    def add_uptime(self, seconds: float):
+        with self._lock:
+            self.uptime_s += seconds
+
+    def take(self) -> dict:
+        """Close the bucket: its counters as a document body, and start a new one."""
+        with self._lock:
+            body = {
+                "ticks":    self.ticks,
+                "uptime_s": round(self.uptime_s, 1),
+                "trash":    {"sum": self.trash_sum, "max": self.trash_max},
+                "events":   dict(self.events),
+                "zones":    {name: {"sum": s, "max": m} for name, (s, m) in self.zones.items()},
+            }
+            self._reset()
+        return body
+
+
+class AnalyticsWriter:
+    """Closes every processor's bucket at each minute boundary and stores it."""
+
+    def __init__(self, processors: Callable[[], list], interval: float = ANALYTICS_SAMPLE_SECONDS):
+        self._processors = processors
+        self._interval   = interval
+        self._frames: Dict[str, int] = {}       # camera_id → frames_read at the last flush
+        self._stop       = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not ANALYTICS_ENABLED or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="analytics")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        last   = time.monotonic()
+        minute = int(time.time() // 60)
+        while not self._stop.wait(self._interval):
+            now = time.monotonic()
+            for proc in list(self._processors()):
+                if proc.stats.connected:
+                    proc.analytics.add_uptime(now - last)
+            last = now
+            current = int(time.time() // 60)
+            if current != minute:
+                try:
+                    self.flush(datetime.utcfromtimestamp(minute * 60))
+                except Exception:
+                    log.exception("Analytics flush failed")
+                minute = current
+
+    def flush(self, bucket: datetime):
+        """Write the closed minute starting at `bucket` (UTC) for every camera."""
+        from .db.mongo import write_analytics
+
+        docs = []
+        for proc in list(self._processors()):
+            frames = proc.stats.frames_read
+            seen   = self._frames.get(proc.camera_id, 0)
+            body   = proc.analytics.take()
+            body["frames"] = frames - seen if frames >= seen else frames   # re-added camera
+            self._frames[proc.camera_id] = frames
+            docs.append({"camera_id": proc.camera_id, "t": bucket, **body})
+        if docs:
+            write_analytics(docs)
@@ -1,34 +1,73 @@
 """
 Central Server — Flask REST API
 
-Cameras are auto-registered on startup using the hardcoded Pi stream URL.
-Manual registration via POST /api/cameras is also supported for additional cameras.
+Importing this module does no work: `create_app()` builds the Flask app and
+`start()` registers every camera in the persistent registry (seeded from
+the hardcoded Pi cameras).  Cameras begin streaming at
+once; their YOLO models load in the background and detection switches on
+per detector as each becomes ready.
+Manual registration via POST /api/cameras is also supported for additional
+cameras; those registrations are stored and survive restarts.
+
+With SHARD_WORKERS > 0 the cameras run in worker processes (server/shards.py)
+and `manager` is a ShardedManager that routes each call to the owning worker.
 
 Routes
 ------
 GET    /api/cameras                      List all cameras + live stats
-POST   /api/cameras                      Manually register an extra camera
+POST   /api/cameras                      Register an extra camera (persisted)
+GET    /api/cameras/<id>                 Camera config + live stats
+PATCH  /api/cameras/<id>                 Hot-update zones / thresholds / intervals
 DELETE /api/cameras/<id>                 Remove a camera
 GET    /api/cameras/<id>/feed            MJPEG annotated live stream
 GET    /api/cameras/<id>/snapshot        Latest JPEG frame
-GET    /api/parking/events               Parking log (filter: camera_id, resolved, limit)
+GET    /api/cameras/<id>/detections      Detection metadata of the latest frame (JSON)
+GET    /api/cameras/<id>/annotations     Detection metadata as Server-Sent Events
+GET    /api/snapshots/<id>               Stored evidence image (?thumb=1 for the thumbnail)
+GET    /api/parking/events               Parking log (filter: camera_id, resolved, from, to, limit)
+GET    /api/parking/events/export        Full parking history as streamed CSV / NDJSON
+POST   /api/parking/events/resolve       Resolve many events (by ids, or camera / time range)
 POST   /api/parking/events/<id>/resolve  Mark a parking event as resolved
 GET    /api/stats                        Detection counts by label
-GET    /health                           Health check
+GET    /api/analytics                    Per-camera time series (minute / hour / day buckets)
+GET    /health                           Liveness + readiness summary
+GET    /health/live                      200 while the process is serving
+GET    /health/ready                     200 once every model is loaded, else 503
+GET    /metrics                          Prometheus metrics (stage latencies, counters)
+POST   /api/admin/profile                Sample stacks / trace stages for N seconds
+POST   /api/admin/models/retry           Reload the models that failed to load
+GET    /api/jobs                         Offline analysis jobs + progress
+POST   /api/jobs                         Start (or resume) an offline analysis job
+GET    /api/jobs/<id>                    Job progress / throughput
+DELETE /api/jobs/<id>                    Cancel a job
 """
 
 from __future__ import annotations
 
+import atexit
+import csv
+import hmac
+import io
+import json
 import logging
+import os
+import threading
 import time
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from flask import Flask, Response, jsonify, request, abort
+from flask import Blueprint, Flask, Response, jsonify, request, abort, send_file, stream_with_context
 
-from .processor import ProcessorManager, StreamProcessor
-from .detectors.trash_detector import TrashDetector
-from .detectors.parking_detector import IllegalParkingDetector
-from .db.mongo import get_parking_events, resolve_parking_event, get_detection_stats
+from . import metrics, profiler
+from .jobs import JOB_WORKERS, JobManager, JobSpec, resolve_input
+from .processor import ProcessorManager
+from .registry import CameraConfig, CameraRegistry
+from .shards import SHARD_WORKERS, RemoteProcessor, ShardError, ShardedManager
+from .db.mongo import (
+    get_analytics, get_detection_stats, get_parking_events, iter_parking_events,
+    resolve_parking_event, resolve_parking_events,
+)
+from .utils.snapshot import resolve_snapshot
 
 log = logging.getLogger(__name__)
 
@@ -59,112 +98,194 @@ PI_CAMERAS = [
     # },
 ]
 
-# ─── App + manager ────────────────────────────────────────────────────────────
+# ─── Blueprint + manager ──────────────────────────────────────────────────────
+
+bp       = Blueprint("api", __name__)
+manager  = ProcessorManager()
+registry = CameraRegistry()
+jobs     = JobManager()
+
+# Pause of a viewer whose wait returned early without a frame.
+VIEWER_IDLE_BACKOFF = 0.1
+
+# Required (X-Admin-Token or Bearer) on /api/admin/*; unset disables them.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+_started    = False
+_start_lock = threading.Lock()
+
 
-app     = Flask(__name__)
-manager = ProcessorManager()
+# ─── Registration ─────────────────────────────────────────────────────────────
 
+def _register(cfg: CameraConfig):
+    """Create a StreamProcessor for a config and add it to the manager."""
+    manager.add_camera(cfg)
+    log.info("Camera registered: %s -> %s", cfg.camera_id, cfg.stream_url)
 
-# ─── Detector factory ─────────────────────────────────────────────────────────
 
-def _build_detectors(parking_zones: Optional[list] = None) -> list:
+# ─── Lifecycle ───────────────────────────────────────────────────────────────
+
+def create_app(start_cameras: bool = True) -> Flask:
     """
-    Build the detector stack for a camera.
-    parking_zones: list of polygon point-lists in 640x480 pixel coords.
+    Application factory.
+    start_cameras: register PI_CAMERAS now (models keep loading in the background).
     """
-    zones = parking_zones or [[(0, 320), (640, 320), (640, 480), (0, 480)]]
-    return [
-        TrashDetector(),
-        IllegalParkingDetector(zones=zones),
-    ]
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    if start_cameras:
+        start()
+    return app
 
 
-def _register(camera_id: str, stream_url: str, parking_zones: Optional[list] = None):
-    """Create a StreamProcessor and add it to the manager."""
-    proc = StreamProcessor(
-        camera_id=camera_id,
-        stream_url=stream_url,
-        detectors=_build_detectors(parking_zones),
-    )
-    manager.add(proc)
-    log.info("Camera registered: %s -> %s", camera_id, stream_url)
+def start():
+    """
+    Register every stored camera (PI_CAMERAS seed the registry the first
+    time).  Idempotent; returns immediately.
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        global manager
+        if SHARD_WORKERS > 0 and not isinstance(manager, ShardedManager):
+            manager = ShardedManager(SHARD_WORKERS)
+        for cfg in registry.load(PI_CAMERAS):
+            _register(cfg)
+        atexit.register(shutdown)
 
 
-# ─── Auto-register Pi cameras on import ──────────────────────────────────────
-
-for _cam in PI_CAMERAS:
-    _register(
-        camera_id=    _cam["camera_id"],
-        stream_url=   _cam["stream_url"],
-        parking_zones=_cam.get("parking_zones"),
-    )
+def shutdown():
+    """Stop every camera thread and the model loader."""
+    global _started
+    with _start_lock:
+        jobs.cancel_all()
+        manager.stop_all()
+        _started = False
 
 
 # ─── Routes ───────────────────────────────────────────────────────────────────
 
-@app.route("/api/cameras", methods=["GET"])
+@bp.route("/api/cameras", methods=["GET"])
 def list_cameras():
     return jsonify(manager.all_stats())
 
 
-@app.route("/api/cameras", methods=["POST"])
+@bp.route("/api/cameras", methods=["POST"])
 def register_camera():
-    """Manually register an additional camera at runtime."""
-    body      = request.get_json(force=True)
-    camera_id = body.get("camera_id")
-    url       = body.get("stream_url")
-    zones     = body.get("parking_zones")
+    """Register an additional camera at runtime; the config is persisted."""
+    body = request.get_json(force=True)
+    try:
+        cfg = CameraConfig.from_dict(body)
+    except (TypeError, ValueError) as exc:
+        abort(400, str(exc))
+    if manager.get(cfg.camera_id):
+        abort(409, f"Camera '{cfg.camera_id}' is already registered")
+
+    try:
+        _register(cfg)                  # persist only a camera that is running
+    except (TypeError, ValueError) as exc:
+        abort(400, str(exc))
+    except ShardError as exc:
+        abort(503, f"Camera worker unavailable: {exc}")
+    persisted = registry.put(cfg)
+    return jsonify({"status": "ok", "camera_id": cfg.camera_id, "persisted": persisted}), 201
+
+
+@bp.route("/api/cameras/<camera_id>", methods=["GET"])
+def get_camera(camera_id):
+    proc = manager.get(camera_id)
+    cfg  = registry.get(camera_id)
+    if proc is None or cfg is None:
+        abort(404, f"Camera '{camera_id}' not found")
+    return jsonify({"config": cfg.to_dict(), "stats": proc.get_stats()})
 
-    if not camera_id or not url:
-        abort(400, "camera_id and stream_url are required")
-    if manager.get(camera_id):
-        abort(409, f"Camera '{camera_id}' is already registered")
 
-    _register(camera_id, url, zones)
-    return jsonify({"status": "ok", "camera_id": camera_id}), 201
+@bp.route("/api/cameras/<camera_id>", methods=["PATCH"])
+def update_camera(camera_id):
+    """
+    Change zones, thresholds, intervals or the stream URL of a live camera.
+    The stream, loaded models and dwell tracks are kept.
+    """
+    proc = manager.get(camera_id)
+    old  = registry.get(camera_id)
+    if proc is None or old is None:
+        abort(404, f"Camera '{camera_id}' not found")
+
+    patch = request.get_json(force=True)
+    if not isinstance(patch, dict):
+        abort(400, "Body must be a JSON object")
+    try:
+        new     = old.merged(patch)
+        changed = manager.reconfigure(camera_id, old, new)
+    except (TypeError, ValueError) as exc:
+        abort(400, str(exc))
+    except ShardError as exc:
+        abort(503, f"Camera worker unavailable: {exc}")
+
+    persisted = registry.put(new)
+    return jsonify({
+        "status":    "updated",
+        "camera_id": camera_id,
+        "changed":   changed,
+        "persisted": persisted,
+        "config":    new.to_dict(),
+    })
 
 
-@app.route("/api/cameras/<camera_id>", methods=["DELETE"])
+@bp.route("/api/cameras/<camera_id>", methods=["DELETE"])
 def unregister_camera(camera_id):
     if not manager.get(camera_id):
         abort(404, f"Camera '{camera_id}' not found")
     manager.remove(camera_id)
+    registry.delete(camera_id)
     return jsonify({"status": "removed", "camera_id": camera_id})
 
 
 # ─── Live feed + snapshot ─────────────────────────────────────────────────────
 
-@app.route("/api/cameras/<camera_id>/feed")
+def _mjpeg_part(seq: int, frame: bytes, meta: dict) -> bytes:
+    """One multipart chunk; the X- part headers let clients match metadata."""
+    headers = (
+        "--frame\r\n"
+        "Content-Type: image/jpeg\r\n"
+        f"Content-Length: {len(frame)}\r\n"
+        f"X-Frame-Seq: {seq}\r\n"
+        f"X-Detection-Seq: {meta.get('detection_seq', 0)}\r\n"
+        f"X-Annotated: {int(bool(meta.get('annotated')))}\r\n\r\n"
+    )
+    return headers.encode() + frame + b"\r\n"
+
+
+@bp.route("/api/cameras/<camera_id>/feed")
 def camera_feed(camera_id):
     proc = manager.get(camera_id)
     if proc is None:
         abort(404, f"Camera '{camera_id}' not found")
 
     def generate():
-        # Wait for the first frame (max 10 seconds)
-        timeout = 10
-        start = time.monotonic()
-        frame = None
-        while frame is None and (time.monotonic() - start) < timeout:
-            frame = proc.get_latest_frame()
-            if frame is None:
-                time.sleep(0.1)   # don't burn CPU
-
-        if frame is None:
-            log.error("[%s] No frame available after %ds", camera_id, timeout)
-            # Yield an error frame? For now, just stop the generator (client will retry)
-            return
-
-        # Yield the first frame, then continue as normal
-        yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + frame + b"\r\n")
-
-        while True:
-            frame = proc.get_latest_frame()
-            if frame:
-                yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + frame + b"\r\n")
-            else:
-                # If we lose the stream, wait a bit before retrying
-                time.sleep(0.1)
+        with metrics.viewer(camera_id):
+            # Wait for the first frame (max 10 seconds)
+            timeout = 10
+            latest = proc.wait_for_frame(0, timeout=timeout)
+            if latest is None:
+                log.error("[%s] No frame available after %ds", camera_id, timeout)
+                # Yield an error frame? For now, just stop the generator (client will retry)
+                return
+
+            seq, frame, meta = latest
+            yield _mjpeg_part(seq, frame, meta)
+
+            # Only send frames the viewer hasn't seen; block until a new one lands.
+            while True:
+                latest = proc.wait_for_frame(seq, timeout=1.0)
+                if latest is None:
+                    if _viewer_gone(camera_id, proc):
+                        return
+                    time.sleep(VIEWER_IDLE_BACKOFF)
+                    continue
+                seq, frame, meta = latest
+                yield _mjpeg_part(seq, frame, meta)
 
     return Response(
         generate(),
@@ -172,7 +293,15 @@ def camera_feed(camera_id):
     )
 
 
-@app.route("/api/cameras/<camera_id>/snapshot")
+def _viewer_gone(camera_id: str, proc) -> bool:
+    """True once the viewer's processor was stopped, removed or replaced."""
+    current = manager.get(camera_id)
+    if current is None or not proc.running:
+        return True
+    return not isinstance(proc, RemoteProcessor) and current is not proc
+
+
+@bp.route("/api/cameras/<camera_id>/snapshot")
 def camera_snapshot(camera_id):
     proc = manager.get(camera_id)
     if proc is None:
@@ -180,30 +309,144 @@ def camera_snapshot(camera_id):
     frame = proc.get_latest_frame()
     if frame is None:
         abort(503, "No frame available yet — stream may still be connecting")
-    return Response(frame, mimetype="image/jpeg")
+    meta = proc.get_latest_meta()
+    resp = Response(frame, mimetype="image/jpeg")
+    resp.headers["X-Frame-Seq"] = str(meta.get("seq", 0))
+    resp.headers["X-Annotated"] = str(int(bool(meta.get("annotated"))))
+    return resp
+
+
+@bp.route("/api/snapshots/<path:snapshot_id>")
+def stored_snapshot(snapshot_id):
+    """
+    Evidence image by the id stored on its event.  Ids are content hashes,
+    so responses are cacheable for good; ETag / Range requests are honoured.
+    """
+    path = resolve_snapshot(snapshot_id, thumb=request.args.get("thumb") == "1")
+    if path is None:
+        abort(404, "Snapshot not found")
+    return send_file(
+        os.path.abspath(path), mimetype="image/jpeg",
+        conditional=True, etag=True, max_age=365 * 24 * 3600,
+    )
+
+
+@bp.route("/api/cameras/<camera_id>/detections")
+def camera_detections(camera_id):
+    proc = manager.get(camera_id)
+    if proc is None:
+        abort(404, f"Camera '{camera_id}' not found")
+    return jsonify(proc.get_latest_meta())
+
+
+@bp.route("/api/cameras/<camera_id>/annotations")
+def camera_annotations(camera_id):
+    """Push frame metadata whenever the detection set changes (SSE)."""
+    proc = manager.get(camera_id)
+    if proc is None:
+        abort(404, f"Camera '{camera_id}' not found")
+
+    def generate():
+        with metrics.viewer(camera_id):
+            seq, sent_detection_seq, sent_annotated = 0, -1, None
+            last_write = time.monotonic()
+            while True:
+                latest = proc.wait_for_frame(seq, timeout=1.0)
+                if latest is None:
+                    if _viewer_gone(camera_id, proc):
+                        return
+                    time.sleep(VIEWER_IDLE_BACKOFF)
+                else:
+                    seq, _, meta = latest
+                    if (meta["detection_seq"] != sent_detection_seq
+                            or meta["annotated"] != sent_annotated):
+                        sent_detection_seq = meta["detection_seq"]
+                        sent_annotated     = meta["annotated"]
+                        last_write = time.monotonic()
+                        yield f"data: {json.dumps(meta)}\n\n"
+                        continue
+                if time.monotonic() - last_write > 15:
+                    last_write = time.monotonic()
+                    yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ─── Parking events ───────────────────────────────────────────────────────────
 
-@app.route("/api/parking/events", methods=["GET"])
+# Columns of the CSV export; bbox and meta fields are flattened.
+EXPORT_COLUMNS = (
+    "id", "timestamp", "camera_id", "label", "confidence", "x1", "y1", "x2", "y2",
+    "vehicle_label", "dwell_seconds", "zone", "track_id",
+    "resolved", "resolved_at", "officer", "notes", "snapshot", "clip",
+)
+
+
+@bp.route("/api/parking/events", methods=["GET"])
 def list_parking():
-    camera_id    = request.args.get("camera_id")
-    resolved_str = request.args.get("resolved")
-    limit        = int(request.args.get("limit", 100))
+    limit  = int(request.args.get("limit", 100))
+    events = get_parking_events(limit=limit, **_parking_filter())
+    return jsonify(events)
 
-    resolved_bool: Optional[bool] = None
-    if resolved_str is not None:
-        resolved_bool = resolved_str.lower() == "true"
 
-    events = get_parking_events(
-        camera_id=camera_id,
-        resolved=resolved_bool,
-        limit=limit,
+@bp.route("/api/parking/events/export", methods=["GET"])
+def export_parking():
+    """
+    ?format=ndjson (default) | csv, with the filters of GET /api/parking/events
+    and no limit.  Rows are streamed from a database cursor as they are read.
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        abort(400, "format must be ndjson or csv")
+    events = iter_parking_events(**_parking_filter())
+
+    if fmt == "ndjson":
+        body     = (json.dumps(e, default=str) + "\n" for e in events)
+        mimetype = "application/x-ndjson"
+    else:
+        body     = _csv_rows(events)
+        mimetype = "text/csv"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=parking_events.{fmt}"},
     )
-    return jsonify(events)
 
 
-@app.route("/api/parking/events/<event_id>/resolve", methods=["POST"])
+@bp.route("/api/parking/events/resolve", methods=["POST"])
+def resolve_events():
+    """
+    Body: {"ids": [...]} or a filter {"camera_id", "from", "to"} (at least
+    one), plus "officer" and "notes".  Only open events are touched.
+    """
+    body = request.get_json(force=True)
+    if not isinstance(body, dict):
+        abort(400, "Body must be a JSON object")
+    ids = body.get("ids")
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+            abort(400, "ids must be a list of event ids")
+        if any(body.get(k) for k in ("camera_id", "from", "to")):
+            abort(400, "Give either ids or a camera_id / from / to filter, not both")
+    elif not any(body.get(k) for k in ("camera_id", "from", "to")):
+        abort(400, "ids or a camera_id / from / to filter required")
+
+    result = resolve_parking_events(
+        officer=body.get("officer", "unknown"),
+        notes=body.get("notes", ""),
+        ids=ids,
+        camera_id=body.get("camera_id"),
+        start=_parse_utc(body.get("from"), "from"),
+        end=_parse_utc(body.get("to"), "to"),
+    )
+    return jsonify({"status": "resolved", **result})
+
+
+@bp.route("/api/parking/events/<event_id>/resolve", methods=["POST"])
 def resolve_event(event_id):
     body    = request.get_json(force=True)
     officer = body.get("officer", "unknown")
@@ -215,24 +458,258 @@ def resolve_event(event_id):
     return jsonify({"status": "resolved", "event_id": event_id})
 
 
+def _parking_filter() -> dict:
+    """camera_id / resolved / from / to query arguments → db helper kwargs."""
+    resolved_str = request.args.get("resolved")
+    return {
+        "camera_id": request.args.get("camera_id"),
+        "resolved":  None if resolved_str is None else resolved_str.lower() == "true",
+        "start":     _utc_arg("from"),
+        "end":       _utc_arg("to"),
+    }
+
+
+def _csv_rows(events):
+    buf    = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for e in events:
+        meta = e.get("meta") or {}
+        x1, y1, x2, y2 = e.get("bbox") or ("", "", "", "")
+        writer.writerow((
+            e["id"], e.get("timestamp"), e.get("camera_id"), e.get("label"), e.get("confidence"),
+            x1, y1, x2, y2,
+            meta.get("vehicle_label"), meta.get("dwell_seconds"), meta.get("zone"), meta.get("track_id"),
+            e.get("resolved"), e.get("resolved_at"), e.get("officer"), e.get("notes"),
+            e.get("snapshot"), e.get("clip"),
+        ))
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+# ─── Analytics ────────────────────────────────────────────────────────────────
+
+# Range returned when ?from= is not given, per resolution.
+ANALYTICS_DEFAULT_RANGE = {
+    "minute": timedelta(hours=6),
+    "hour":   timedelta(days=7),
+    "day":    timedelta(days=90),
+}
+
+
+@bp.route("/api/analytics")
+def analytics():
+    """
+    ?resolution=minute|hour|day (default hour), ?camera_id=, ?from= / ?to=
+    as ISO-8601 (UTC unless an offset is given).  Buckets oldest first.
+    """
+    resolution = request.args.get("resolution", "hour")
+    if resolution not in ANALYTICS_DEFAULT_RANGE:
+        abort(400, f"resolution must be one of {', '.join(ANALYTICS_DEFAULT_RANGE)}")
+    end   = _utc_arg("to") or datetime.utcnow()
+    start = _utc_arg("from") or end - ANALYTICS_DEFAULT_RANGE[resolution]
+    if start >= end:
+        abort(400, "'from' must be before 'to'")
+    return jsonify({
+        "resolution": resolution,
+        "from":       start.isoformat(),
+        "to":         end.isoformat(),
+        "buckets":    get_analytics(resolution, request.args.get("camera_id"), start, end),
+    })
+
+
+def _utc_arg(name: str) -> Optional[datetime]:
+    return _parse_utc(request.args.get(name), name)
+
+
+def _parse_utc(value, name: str) -> Optional[datetime]:
+    """ISO-8601 → naive UTC datetime (UTC unless an offset is given); 400 if malformed."""
+    if not value:
+        return None
+    if not isinstance(value, str):
+        abort(400, f"'{name}' must be an ISO-8601 timestamp")
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        abort(400, f"'{name}' must be an ISO-8601 timestamp")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
 # ─── Stats + health ───────────────────────────────────────────────────────────
 
-@app.route("/api/stats")
+@bp.route("/api/stats")
 def stats():
     return jsonify(get_detection_stats())
 
 
-@app.route("/health")
+@bp.route("/health")
 def health():
-    cams = manager.all_stats()
-    return jsonify({
+    return jsonify(health_payload())
+
+
+def health_payload() -> dict:
+    """
+    Liveness (the process is serving) and readiness (models loaded) in one
+    view; shared with the ASGI front-end so both /health answers match.
+    """
+    cams   = manager.all_stats()
+    models = manager.loader.status()
+    return {
         "status":        "ok",
+        "live":          True,
+        "ready":         models["ready"],
+        "models":        models,
         "cameras_total": len(cams),
         "cameras_live":  sum(1 for c in cams if c["connected"]),
-    })
+        "admission":     manager.admission.status(),
+    }
 
 
-# ─── Cleanup on shutdown ──────────────────────────────────────────────────────
+@bp.route("/health/live")
+def health_live():
+    return jsonify({"live": True})
 
-import atexit
-atexit.register(manager.stop_all)
\ No newline at end of file
+
+@bp.route("/health/ready")
+def health_ready():
+    models = manager.loader.status()
+    return jsonify({"ready": models["ready"], "models": models}), (200 if models["ready"] else 503)
+
+
+@bp.route("/metrics")
+def prometheus_metrics():
+    """Prometheus text format; in sharded mode every worker's series are merged in."""
+    groups = [(None, metrics.collect())]
+    if isinstance(manager, ShardedManager):
+        groups += manager.collect_metrics()
+    return Response(
+        metrics.render(metrics.merge(groups)),
+        mimetype="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+# ─── Offline jobs ─────────────────────────────────────────────────────────────
+
+@bp.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify(jobs.all_status())
+
+
+@bp.route("/api/jobs", methods=["POST"])
+def start_job():
+    """
+    Body: {"inputs": [paths under JOB_INPUT_ROOT], "camera_id": ...,
+    "config": {camera field overrides}, "every", "batch_size", "workers",
+    "chunk_seconds", "detectors"} — or {"job_id": ...} to resume one.
+    At most JOB_WORKERS processes per job.
+    """
+    _require_admin()
+    body = request.get_json(force=True)
+    if not isinstance(body, dict):
+        abort(400, "Body must be a JSON object")
+    body = dict(body)
+    job_id = body.pop("job_id", None)
+    try:
+        spec = None
+        workers = body.get("workers")
+        if isinstance(workers, int) and workers > JOB_WORKERS:
+            abort(400, f"workers must be at most {JOB_WORKERS}")
+        if body.get("inputs"):
+            camera_id = body.pop("camera_id", "offline")
+            cfg = registry.get(camera_id) or CameraConfig(camera_id, "file://")
+            cfg = cfg.merged(body.pop("config", None) or {})
+            spec = JobSpec.from_dict({
+                **body,
+                "inputs": [resolve_input(p) for p in body["inputs"]],
+                "camera": cfg.to_dict(),
+            })
+        elif not job_id:
+            abort(400, "inputs (or job_id to resume) required")
+        job = jobs.start(spec, job_id)
+    except FileNotFoundError:
+        abort(404, f"No checkpoint for job '{job_id}'")
+    except RuntimeError as exc:
+        abort(409, str(exc))
+    except (TypeError, ValueError) as exc:
+        abort(400, str(exc))
+    return jsonify(job.status()), 202
+
+
+@bp.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        abort(404, f"Job '{job_id}' not found")
+    return jsonify(job.status())
+
+
+@bp.route("/api/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    _require_admin()
+    job = jobs.get(job_id)
+    if job is None:
+        abort(404, f"Job '{job_id}' not found")
+    job.cancel()
+    return jsonify(job.status())
+
+
+# ─── Admin ────────────────────────────────────────────────────────────────────
+
+def _require_admin():
+    if not ADMIN_TOKEN:
+        abort(403, "Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    token = request.headers.get("X-Admin-Token") or request.headers.get("Authorization", "")
+    token = token.removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):    # bytes: non-ASCII must not raise
+        abort(401, "Admin token required")
+
+
+@bp.route("/api/admin/models/retry", methods=["POST"])
+def admin_retry_models():
+    """Queue every failed model load again (automatic retries are exhausted)."""
+    _require_admin()
+    return jsonify({"retried": manager.loader.retry_failed()}), 202
+
+
+@bp.route("/api/admin/profile", methods=["POST"])
+def admin_profile():
+    """
+    Profile the camera threads for `seconds` (max PROFILE_MAX_SECONDS).
+    mode=sample → folded stacks (text, or JSON with format=json);
+    mode=trace  → Chrome trace JSON of per-frame stage spans.
+    Optional: camera=<id>, interval=<s between samples>.
+    """
+    _require_admin()
+    mode      = request.args.get("mode", "sample")
+    camera_id = request.args.get("camera")
+    try:
+        seconds  = float(request.args.get("seconds", 10))
+        interval = float(request.args.get("interval", profiler.PROFILE_SAMPLE_INTERVAL))
+    except ValueError:
+        abort(400, "seconds and interval must be numbers")
+    if mode not in profiler.MODES:
+        abort(400, f"mode must be one of {', '.join(profiler.MODES)}")
+    if camera_id and manager.get(camera_id) is None:
+        abort(404, f"Camera '{camera_id}' not found")
+
+    try:
+        if isinstance(manager, ShardedManager):
+            results = manager.profile(seconds, mode, camera_id, interval)
+        else:
+            results = [(None, profiler.profile(seconds, mode, camera_id, interval))]
+    except profiler.ProfilerBusy as exc:
+        abort(409, str(exc))
+    except ShardError as exc:
+        abort(502, str(exc))
+
+    result = profiler.merge(results)
+    if mode == "sample" and request.args.get("format") != "json":
+        return Response(
+            profiler.render_folded(result.get("stacks", {})),
+            mimetype="text/plain",
+            headers={"X-Profile-Samples": str(result.get("samples", 0))},
+        )
+    return jsonify(result)
@@ -0,0 +1,310 @@
+"""
+ASGI front-end
+──────────────
+Async alternative to the threaded Flask server for many viewers:
+
+    uvicorn "server.asgi:create_app" --factory --host 0.0.0.0 --port 8000
+
+The streaming and polling endpoints — feed, snapshot, detections, SSE
+annotations, camera stats and health — are served natively on one event
+loop, so an idle or slow MJPEG viewer costs a coroutine instead of an OS
+thread.  Every other route is the Flask blueprint from server/api.py
+mounted through a2wsgi, so the route set is exactly the same.
+
+Each camera that has viewers gets one channel: a single background thread
+blocks on `wait_for_frame()` (which also works for RemoteProcessor in
+sharded mode) and wakes all of that camera's viewers at once.  Viewers
+always jump to the newest frame, and each send awaits the transport's
+flow control, so a slow client simply receives fewer frames — it never
+buffers a backlog or holds up anyone else.  Detection keeps running in
+the processor threads / shard workers.
+
+Requires: pip install starlette uvicorn a2wsgi
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from . import api, metrics
+from .main import create_app as create_flask_app
+from .shards import RemoteProcessor
+
+log = logging.getLogger(__name__)
+
+# Threads that block on wait_for_frame(): one per camera with viewers.
+FEED_POLL_THREADS = int(os.getenv("FEED_POLL_THREADS", "64"))
+FIRST_FRAME_TIMEOUT = 10
+SSE_KEEPALIVE       = 15
+
+Frame = Tuple[int, bytes, dict]     # (channel seq, jpeg, meta)
+
+
+# ─── Per-camera broadcast channel ────────────────────────────────────────────
+
+class _CameraChannel:
+    """Fans one camera's frames out to any number of async viewers."""
+
+    def __init__(self, camera_id: str, executor: ThreadPoolExecutor):
+        self.camera_id = camera_id
+        self.latest: Optional[Frame] = None
+        self.viewers   = 0
+        self._executor = executor
+        self._changed  = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._proc     = None
+        self._seq      = 0      # processor seq last received
+        self._count    = 0      # channel seq: keeps increasing across re-registrations
+
+    def attach(self):
+        self.viewers += 1
+        metrics.viewer_opened(self.camera_id)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._pump())
+
+    def detach(self):
+        self.viewers -= 1
+        metrics.viewer_closed(self.camera_id)
+
+    async def next_frame(self, after_seq: int, timeout: float) -> Optional[Frame]:
+        """Newest frame with seq > after_seq, or None after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        while self.latest is None or self.latest[0] <= after_seq:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            changed = self._changed
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+        return self.latest
+
+    def _wait(self) -> Optional[Frame]:
+        """Runs in the poll pool: block until the camera publishes a new frame."""
+        proc = api.manager.get(self.camera_id)
+        if proc is None:
+            time.sleep(1.0)
+            return None
+        if type(proc) is not type(self._proc) or (
+                not isinstance(proc, RemoteProcessor) and proc is not self._proc):
+            self._proc, self._seq = proc, 0      # camera re-registered: seq restarts
+        frame = proc.wait_for_frame(self._seq, 1.0)
+        if frame is None and not proc.running:
+            time.sleep(1.0)                      # stopping: wait returns at once
+        return frame
+
+    async def _pump(self):
+        loop = asyncio.get_running_loop()
+        while self.viewers > 0:
+            try:
+                frame = await loop.run_in_executor(self._executor, self._wait)
+            except Exception:
+                log.exception("[%s] frame channel error", self.camera_id)
+                await asyncio.sleep(1.0)
+                continue
+            if frame is None:
+                continue
+            self._count += 1
+            self._seq, self.latest = frame[0], (self._count, frame[1], frame[2])
+            # Swap the event before setting it so late waiters block on the next frame.
+            changed, self._changed = self._changed, asyncio.Event()
+            changed.set()
+
+
+class _Channels:
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=FEED_POLL_THREADS, thread_name_prefix="feed-poll",
+        )
+        self._channels: Dict[str, _CameraChannel] = {}
+
+    def get(self, camera_id: str) -> _CameraChannel:
+        chan = self._channels.get(camera_id)
+        if chan is None:
+            chan = self._channels[camera_id] = _CameraChannel(camera_id, self._executor)
+        return chan
+
+    def release(self, camera_id: str, chan: _CameraChannel):
+        """Forget `chan` once its last viewer left (removed cameras leave no channel behind)."""
+        if chan.viewers <= 0 and self._channels.get(camera_id) is chan:
+            del self._channels[camera_id]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_channels: Optional[_Channels] = None
+
+
+# ─── Helpers ─────────────────────────────────────────────────────────────────
+
+async def _blocking(func, *args):
+    """Run a (possibly RPC-backed) manager call off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def _lookup(camera_id: str):
+    proc = await _blocking(api.manager.get, camera_id)
+    if proc is None:
+        return None, PlainTextResponse(f"Camera '{camera_id}' not found", status_code=404)
+    return proc, None
+
+
+# ─── Routes ──────────────────────────────────────────────────────────────────
+
+async def list_cameras(request: Request):
+    return JSONResponse(await _blocking(api.manager.all_stats))
+
+
+async def camera_feed(request: Request):
+    camera_id = request.path_params["camera_id"]
+    proc, error = await _lookup(camera_id)
+    if error:
+        return error
+    chan = _channels.get(camera_id)
+
+    async def generate():
+        chan.attach()
+        try:
+            latest = await chan.next_frame(0, FIRST_FRAME_TIMEOUT)
+            if latest is None:
+                log.error("[%s] No frame available after %ds", camera_id, FIRST_FRAME_TIMEOUT)
+                return
+            seq, frame, meta = latest
+            yield api._mjpeg_part(meta["seq"], frame, meta)
+            while True:
+                latest = await chan.next_frame(seq, 1.0)
+                if latest is None:
+                    if await _blocking(api._viewer_gone, camera_id, proc):
+                        return
+                    continue
+                seq, frame, meta = latest
+                yield api._mjpeg_part(meta["seq"], frame, meta)
+        finally:
+            chan.detach()
+            _channels.release(camera_id, chan)
+
+    return StreamingResponse(generate(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+
+async def camera_snapshot(request: Request):
+    proc, error = await _lookup(request.path_params["camera_id"])
+    if error:
+        return error
+    frame = await _blocking(proc.get_latest_frame)
+    if frame is None:
+        return PlainTextResponse(
+            "No frame available yet — stream may still be connecting", status_code=503,
+        )
+    meta = await _blocking(proc.get_latest_meta)
+    return Response(frame, media_type="image/jpeg", headers={
+        "X-Frame-Seq": str(meta.get("seq", 0)),
+        "X-Annotated": str(int(bool(meta.get("annotated")))),
+    })
+
+
+async def camera_detections(request: Request):
+    proc, error = await _lookup(request.path_params["camera_id"])
+    if error:
+        return error
+    return JSONResponse(await _blocking(proc.get_latest_meta))
+
+
+async def camera_annotations(request: Request):
+    camera_id = request.path_params["camera_id"]
+    proc, error = await _lookup(camera_id)
+    if error:
+        return error
+    chan = _channels.get(camera_id)
+
+    async def generate():
+        chan.attach()
+        try:
+            seq, sent_detection_seq, sent_annotated = 0, -1, None
+            last_write = time.monotonic()
+            while True:
+                latest = await chan.next_frame(seq, 1.0)
+                if latest is None:
+                    if await _blocking(api._viewer_gone, camera_id, proc):
+                        return
+                else:
+                    seq, _, meta = latest
+                    if (meta["detection_seq"] != sent_detection_seq
+                            or meta["annotated"] != sent_annotated):
+                        sent_detection_seq = meta["detection_seq"]
+                        sent_annotated     = meta["annotated"]
+                        last_write = time.monotonic()
+                        yield f"data: {json.dumps(meta)}\n\n"
+                        continue
+                if time.monotonic() - last_write > SSE_KEEPALIVE:
+                    last_write = time.monotonic()
+                    yield ": keep-alive\n\n"
+        finally:
+            chan.detach()
+            _channels.release(camera_id, chan)
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+    })
+
+
+async def health(request: Request):
+    return JSONResponse(await _blocking(api.health_payload))
+
+
+async def health_live(request: Request):
+    return JSONResponse({"live": True})
+
+
+async def health_ready(request: Request):
+    models = await _blocking(api.manager.loader.status)
+    return JSONResponse(
+        {"ready": models["ready"], "models": models},
+        status_code=200 if models["ready"] else 503,
+    )
+
+
+# ─── App factory ─────────────────────────────────────────────────────────────
+
+def create_app(start_cameras: bool = True) -> Starlette:
+    """ASGI app: native async streaming routes + the Flask app for the rest."""
+    flask_app = create_flask_app(start_cameras=False)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        global _channels
+        _channels = _Channels()
+        if start_cameras:
+            await _blocking(api.start)
+        try:
+            yield
+        finally:
+            _channels.shutdown()
+            await _blocking(api.shutdown)
+
+    routes = [
+        Route("/api/cameras",                         list_cameras, methods=["GET"]),
+        Route("/api/cameras/{camera_id}/feed",        camera_feed),
+        Route("/api/cameras/{camera_id}/snapshot",    camera_snapshot),
+        Route("/api/cameras/{camera_id}/detections",  camera_detections),
+        Route("/api/cameras/{camera_id}/annotations", camera_annotations),
+        Route("/health",                              health),
+        Route("/health/live",                         health_live),
+        Route("/health/ready",                        health_ready),
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
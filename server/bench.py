@@ -0,0 +1,295 @@
+"""
+Benchmark harness
+─────────────────
+Replays recorded video files or synthetic frames through the full
+pipeline — ingest, decode, detectors, tracking, annotation, encode and
+persistence — for 1..N cameras, and reports fps, per-stage latency
+percentiles, CPU and RSS as JSON so runs can be compared between commits.
+
+    python -m server.bench --cameras 4 --frames 600
+    python -m server.bench --video clips/street.mp4 --fps 15 --cameras 8 --out after.json
+    python -m server.bench --compare before.json after.json
+
+Persistence goes to an in-memory mongomock database by default
+(pip install mongomock); use --db mongo to write to MONGO_URI instead.
+Models are loaded before the clock starts.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from . import metrics
+from .db import mongo
+from .processor import ANNOTATE_ON_SERVER, DETECTION_INTERVAL, StreamProcessor
+from .registry import CameraConfig, DEFAULT_ZONES, build_detectors
+from .utils import clips, snapshot
+from .utils.sources import SyntheticSource, VideoFileSource
+
+log = logging.getLogger(__name__)
+
+
+class _StageRecorder:
+    """Trace sink (see metrics.set_trace_sink) that keeps only durations per stage."""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = {}
+
+    def append(self, span: tuple):
+        _, stage, start, end, _ = span
+        self.durations.setdefault(stage, []).append(end - start)
+
+    def summary(self) -> dict:
+        out = {}
+        for stage, values in sorted(self.durations.items()):
+            ms = np.asarray(values) * 1000.0
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            out[stage] = {
+                "count":   int(ms.size),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms":  round(float(p50), 3),
+                "p90_ms":  round(float(p90), 3),
+                "p99_ms":  round(float(p99), 3),
+                "max_ms":  round(float(ms.max()), 3),
+            }
+        return out
+
+
+# ─── Process stats ───────────────────────────────────────────────────────────
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    try:
+        import resource
+        # ru_maxrss: KiB on Linux, bytes on macOS — a peak, not current.
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    except ImportError:
+        return None
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ─── Setup ───────────────────────────────────────────────────────────────────
+
+def _use_database(kind: str):
+    if kind == "mongo":
+        mongo.get_db()
+        return
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("--db mock needs mongomock (pip install mongomock), or use --db mongo")
+    mongo.use_database(mongomock.MongoClient()[mongo.DB_NAME])
+
+
+def _make_source(args, index: int):
+    if args.video:
+        path = args.video[index % len(args.video)]
+        return VideoFileSource(path, fps=args.fps, max_frames=args.frames)
+    return SyntheticSource(fps=args.fps, max_frames=args.frames, seed=index)
+
+
+def _make_processor(args, index: int, source) -> StreamProcessor:
+    camera_id = f"bench-{index:02d}"
+    detectors = []
+    if args.detectors == "full":
+        cfg = CameraConfig.from_dict({
+            "camera_id":     camera_id,
+            "stream_url":    "bench://",
+            "parking_zones": DEFAULT_ZONES,
+            "backend":       args.backend,
+            "roi_mode":      args.roi_mode,
+        })
+        detectors = build_detectors(cfg)
+        for det in detectors:
+            det.load()
+    return StreamProcessor(
+        camera_id=camera_id,
+        stream_url=f"bench://{'video' if args.video else 'synthetic'}",
+        detectors=detectors,
+        save_snapshots=args.snapshots,
+        save_clips=args.clips,
+        annotate=args.annotate,
+        detection_interval=args.interval,
+        source=lambda: source,
+    )
+
+
+# ─── Run ─────────────────────────────────────────────────────────────────────
+
+def run(args) -> dict:
+    _use_database(args.db)
+    if args.snapshots:
+        snapshot.SNAPSHOT_DIR = tempfile.mkdtemp(prefix="bench-snapshots-")
+    if args.clips:
+        clips.clip_writer().directory = tempfile.mkdtemp(prefix="bench-clips-")
+
+    sources = [_make_source(args, i) for i in range(args.cameras)]
+    log.info("Loading models for %d camera(s)…", args.cameras)
+    procs = [_make_processor(args, i, src) for i, src in enumerate(sources)]
+
+    recorder = _StageRecorder()
+    rss_peak = _rss_mb() or 0.0
+    metrics.set_trace_sink(recorder)
+    cpu0, t0 = _cpu_seconds(), time.perf_counter()
+    for proc in procs:
+        proc.start()
+    try:
+        while not all(src.exhausted for src in sources):
+            if time.perf_counter() - t0 > args.timeout:
+                log.warning("Timed out after %ds", args.timeout)
+                break
+            time.sleep(0.1)
+            rss_peak = max(rss_peak, _rss_mb() or 0.0)
+        wall = time.perf_counter() - t0
+        cpu  = _cpu_seconds() - cpu0
+    finally:
+        metrics.set_trace_sink(None)
+        for proc in procs:
+            proc.stop()
+        if args.clips:
+            clips.clip_writer().drain()
+
+    frames = {p.camera_id: p.stats.frames_read for p in procs}
+    db     = mongo.get_db()
+    return {
+        "timestamp":    datetime.utcnow().isoformat(timespec="seconds"),
+        "commit":       _git_commit(),
+        "python":       platform.python_version(),
+        "opencv":       cv2.__version__,
+        "machine":      f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+        "config": {
+            "cameras":    args.cameras,
+            "source":     args.video or "synthetic",
+            "frames":     args.frames,
+            "fps_limit":  args.fps,
+            "detectors":  args.detectors,
+            "backend":    args.backend,
+            "roi_mode":   args.roi_mode,
+            "interval":   args.interval,
+            "annotate":   args.annotate,
+            "snapshots":  args.snapshots,
+            "clips":      args.clips,
+            "db":         args.db,
+        },
+        "wall_seconds": round(wall, 3),
+        "frames":       sum(frames.values()),
+        "fps": {
+            "total":      round(sum(frames.values()) / wall, 2),
+            "per_camera": {cam: round(n / wall, 2) for cam, n in frames.items()},
+        },
+        "cpu": {
+            "seconds":    round(cpu, 2),
+            "percent":    round(100.0 * cpu / wall, 1),     # of one core
+        },
+        "rss_mb": {
+            "end":        round(_rss_mb() or 0.0, 1),
+            "peak":       round(rss_peak, 1),
+        },
+        "detections":   sum(p.stats.detections for p in procs),
+        "persisted": {
+            "detections":   db.detections.count_documents({}),
+            "parking_logs": db.parking_logs.count_documents({}),
+        },
+        "stages":       recorder.summary(),
+    }
+
+
+# ─── Compare ─────────────────────────────────────────────────────────────────
+
+def compare(before: dict, after: dict) -> str:
+    """Side-by-side fps / CPU / stage p50 and p99 of two result files."""
+    def row(name, a, b):
+        delta = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+        return f"{name:<28} {a:>10} {b:>10} {delta:>9}"
+
+    lines = [
+        f"{'':<28} {before.get('commit') or 'before':>10} {after.get('commit') or 'after':>10} {'change':>9}",
+        row("fps total", before["fps"]["total"], after["fps"]["total"]),
+        row("cpu %", before["cpu"]["percent"], after["cpu"]["percent"]),
+        row("rss peak MB", before["rss_mb"]["peak"], after["rss_mb"]["peak"]),
+    ]
+    for stage in sorted(set(before["stages"]) | set(after["stages"])):
+        a, b = before["stages"].get(stage), after["stages"].get(stage)
+        if a is None or b is None:
+            continue
+        lines.append(row(f"{stage} p50 ms", a["p50_ms"], b["p50_ms"]))
+        lines.append(row(f"{stage} p99 ms", a["p99_ms"], b["p99_ms"]))
+    return "\n".join(lines)
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m server.bench", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cameras", type=int, default=1)
+    parser.add_argument("--video", nargs="*", default=None,
+                        help="video file(s) to replay, assigned round-robin (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=300, help="frames per camera")
+    parser.add_argument("--fps", type=float, default=0, help="per-camera rate limit, 0 = unbounded")
+    parser.add_argument("--detectors", choices=("full", "none"), default="full")
+    parser.add_argument("--backend", default=None, help="torch | onnx | openvino (default: INFERENCE_BACKEND)")
+    parser.add_argument("--roi-mode", default=None)
+    parser.add_argument("--interval", type=int, default=DETECTION_INTERVAL, help="detection interval")
+    parser.add_argument("--annotate", action=argparse.BooleanOptionalAction, default=ANNOTATE_ON_SERVER)
+    parser.add_argument("--snapshots", action="store_true", help="write evidence snapshots (to a temp dir)")
+    parser.add_argument("--clips", action="store_true", help="buffer frames and write event clips (to a temp dir)")
+    parser.add_argument("--db", choices=("mock", "mongo"), default="mock")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--out", help="write the JSON result here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+
+    if args.compare:
+        with open(args.compare[0]) as a, open(args.compare[1]) as b:
+            print(compare(json.load(a), json.load(b)))
+        return
+
+    result = run(args)
+    text   = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+        log.info("Result written to %s — %.1f fps total", args.out, result["fps"]["total"])
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
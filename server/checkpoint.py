@@ -0,0 +1,118 @@
+"""
+Checkpoints
+───────────
+Parking dwell tracks and event cooldowns only live in memory, so a restart
+or a re-registered camera used to start every parked vehicle's dwell timer
+from zero.  The Checkpointer writes each camera's state to
+CHECKPOINT_DIR/<camera_id>-<hash>.json every CHECKPOINT_SECONDS, when a camera is
+removed and on shutdown, and hands it back when the camera is added again:
+
+  * only if the file is younger than CHECKPOINT_MAX_AGE seconds;
+  * a detector refuses its part when its configuration changed in between
+    (the parking detector compares a hash of its zone rules and dwell).
+
+Times are stored as wall-clock seconds and converted back to the monotonic
+clock on restore, so dwell keeps counting across the downtime.  Files are
+small, local and written atomically; a failed write only costs the next
+restart its head start.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT_DIR     = os.getenv("CHECKPOINT_DIR", "checkpoints")
+CHECKPOINT_SECONDS = float(os.getenv("CHECKPOINT_SECONDS", "30"))     # 0 = disabled
+CHECKPOINT_MAX_AGE = float(os.getenv("CHECKPOINT_MAX_AGE", "900"))
+
+
+class Checkpointer:
+    """Saves and restores the processors returned by `processors()`."""
+
+    def __init__(
+        self,
+        processors: Callable[[], list],
+        directory: str = CHECKPOINT_DIR,
+        interval: float = CHECKPOINT_SECONDS,
+        max_age: float = CHECKPOINT_MAX_AGE,
+    ):
+        self._processors = processors
+        self.directory   = directory
+        self.interval    = interval
+        self.max_age     = max_age
+        self._stop       = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="checkpoint")
+        self._thread.start()
+
+    def stop(self):
+        """Stop the periodic thread; callers save a final checkpoint themselves."""
+        self._stop.set()
+
+    def save(self, proc) -> bool:
+        if not self.enabled:
+            return False
+        path = self._path(proc.camera_id)
+        tmp  = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w") as fh:
+                json.dump(proc.checkpoint(), fh)
+            os.replace(tmp, path)
+        except Exception:
+            log.exception("[%s] Checkpoint write failed", proc.camera_id)
+            return False
+        return True
+
+    def save_all(self):
+        for proc in list(self._processors()):
+            self.save(proc)
+
+    def restore(self, proc) -> bool:
+        """Apply the camera's checkpoint to a processor that has not started yet."""
+        if not self.enabled:
+            return False
+        path = self._path(proc.camera_id)
+        try:
+            with open(path) as fh:
+                state = json.load(fh)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError):
+            log.warning("[%s] Unreadable checkpoint %s — ignored", proc.camera_id, path)
+            return False
+
+        age = time.time() - state.get("saved_at", 0)
+        if age > self.max_age:
+            log.info("[%s] Checkpoint is %.0fs old — starting fresh", proc.camera_id, age)
+            return False
+        restored = proc.restore(state)
+        log.info("[%s] Restored checkpoint from %.0fs ago: %s",
+                 proc.camera_id, age, ", ".join(restored) or "nothing applicable")
+        return bool(restored)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.save_all()
+
+    def _path(self, camera_id: str) -> str:
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", camera_id).lstrip(".") or "unknown"
+        tag  = hashlib.sha256(camera_id.encode()).hexdigest()[:8]     # "cam/1" ≠ "cam_1"
+        return os.path.join(self.directory, f"{name}-{tag}.json")
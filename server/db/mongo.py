@@ -5,6 +5,9 @@ Collections
 ───────────
   detections   — every raw detection event
   parking_logs — enriched illegal-parking events with snapshot path
+  cameras      — persisted camera registry (one config doc per camera)
+  analytics_minute / analytics_hour / analytics_day
+               — per-camera aggregates (see server/analytics.py)
 """
 
 from __future__ import annotations
@@ -12,9 +15,11 @@ from __future__ import annotations
 import logging
 import os
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, List, Optional, Tuple
 
-from pymongo import MongoClient, DESCENDING
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
 from pymongo.collection import Collection
 
 from ..detectors.base import Detection
@@ -40,6 +45,13 @@ def get_db():
     return _db
 
 
+def use_database(db):
+    """Point every helper at `db` instead, e.g. a mongomock stand-in for benchmarks."""
+    global _db
+    _db = db
+    _ensure_indexes()
+
+
 def _ensure_indexes():
     db = _db
     db.detections.create_index([("timestamp", DESCENDING)])
@@ -48,72 +60,203 @@ def _ensure_indexes():
     db.parking_logs.create_index([("timestamp", DESCENDING)])
     db.parking_logs.create_index([("camera_id", 1)])
     db.parking_logs.create_index([("resolved", 1)])
+    db.parking_logs.create_index([("camera_id", 1), ("timestamp", DESCENDING)])
+    db.cameras.create_index([("camera_id", 1)], unique=True)
+    for name in ANALYTICS_COLLECTIONS.values():
+        db[name].create_index([("camera_id", 1), ("t", 1)], unique=True)
+    db.analytics_minute.create_index(
+        [("t", 1)], expireAfterSeconds=ANALYTICS_MINUTE_DAYS * 86400,
+    )
     log.debug("Indexes ensured.")
 
 
 # ─── Public helpers ──────────────────────────────────────────────────────────
 
-def log_detection(detection: Detection, snapshot_path: Optional[str] = None):
+def log_detection(
+    detection: Detection, snapshot_path: Optional[str] = None, clip_path: Optional[str] = None,
+):
     """Insert any detection event into the detections collection."""
     doc = detection.to_dict()
     if snapshot_path:
         doc["snapshot"] = snapshot_path
+    if clip_path:
+        doc["clip"] = clip_path
     get_db().detections.insert_one(doc)
 
 
-def log_parking_event(detection: Detection, snapshot_path: Optional[str] = None):
+def log_parking_event(
+    detection: Detection, snapshot_path: Optional[str] = None, clip_path: Optional[str] = None,
+):
     """
     Insert an illegal-parking event into the dedicated parking_logs collection.
-    Includes a 'resolved' flag for later officer acknowledgement.
+    Includes a 'resolved' flag for later officer acknowledgement, and the
+    path of the event clip (written shortly after the event) if there is one.
+    """
+    result = get_db().parking_logs.insert_one(_parking_doc(detection, snapshot_path, clip_path))
+    log.info("Parking event logged → _id=%s camera=%s", result.inserted_id, detection.camera_id)
+    return str(result.inserted_id)
+
+
+def log_detections_bulk(detections: List[Detection], extra: Optional[dict] = None) -> int:
     """
-    doc = {
+    Write many detections with one insert_many per collection (offline
+    jobs).  Parking events go to parking_logs exactly as log_parking_event
+    would store them; `extra` fields are added to every document.
+    Returns the number of documents written.
+    """
+    extra = extra or {}
+    parking = [
+        {**_parking_doc(d), **extra} for d in detections if d.label == "illegal_parking"
+    ]
+    others = [
+        {**d.to_dict(), **extra} for d in detections if d.label != "illegal_parking"
+    ]
+    db = get_db()
+    if parking:
+        db.parking_logs.insert_many(parking, ordered=False)
+    if others:
+        db.detections.insert_many(others, ordered=False)
+    return len(parking) + len(others)
+
+
+def _parking_doc(
+    detection: Detection, snapshot_path: Optional[str] = None, clip_path: Optional[str] = None,
+) -> dict:
+    return {
         **detection.to_dict(),
         "snapshot":   snapshot_path,
+        "clip":       clip_path,
         "resolved":   False,
         "resolved_at": None,
         "officer":    None,
         "notes":      None,
     }
-    result = get_db().parking_logs.insert_one(doc)
-    log.info("Parking event logged → _id=%s camera=%s", result.inserted_id, detection.camera_id)
-    return str(result.inserted_id)
 
 
 def resolve_parking_event(event_id: str, officer: str, notes: str = "") -> bool:
     """Mark a parking event as resolved."""
-    from bson import ObjectId
-    db     = get_db()
-    result = db.parking_logs.update_one(
-        {"_id": ObjectId(event_id)},
-        {"$set": {
-            "resolved":    True,
-            "resolved_at": datetime.utcnow().isoformat(),
-            "officer":     officer,
-            "notes":       notes,
-        }},
+    oids, _ = _object_ids([event_id])
+    if not oids:
+        return False
+    result = get_db().parking_logs.update_one(
+        {"_id": oids[0], "resolved": False}, _resolution(officer, notes),
     )
     return result.modified_count == 1
 
 
+def resolve_parking_events(
+    officer: str,
+    notes: str = "",
+    ids: Optional[List[str]] = None,
+    camera_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> dict:
+    """
+    Resolve many open parking events with one update_many: those in `ids`,
+    or else every open event matching camera_id / [start, end).  Returns
+    {"resolved": n, "invalid_ids": [...]} — malformed ids are skipped.
+    """
+    query = _parking_query(camera_id, False, start, end)
+    invalid: List[str] = []
+    if ids is not None:
+        oids, invalid = _object_ids(ids)
+        if not oids:
+            return {"resolved": 0, "invalid_ids": invalid}
+        query["_id"] = {"$in": oids}
+    result = get_db().parking_logs.update_many(query, _resolution(officer, notes))
+    log.info("Resolved %d parking event(s) by %s", result.modified_count, officer)
+    return {"resolved": result.modified_count, "invalid_ids": invalid}
+
+
 def get_parking_events(
     camera_id: Optional[str] = None,
     resolved: Optional[bool] = None,
     limit: int = 100,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
 ) -> list:
-    query: dict = {}
-    if camera_id is not None:
-        query["camera_id"] = camera_id
-    if resolved is not None:
-        query["resolved"] = resolved
-
+    """Newest events first; each carries its `id` (for the resolve routes)."""
     cursor = (
         get_db()
         .parking_logs
-        .find(query, {"_id": 0})
+        .find(_parking_query(camera_id, resolved, start, end))
         .sort("timestamp", DESCENDING)
         .limit(limit)
     )
-    return list(cursor)
+    return [_with_id(doc) for doc in cursor]
+
+
+def iter_parking_events(
+    camera_id: Optional[str] = None,
+    resolved: Optional[bool] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = 500,
+) -> Iterator[dict]:
+    """
+    Every matching event, oldest first, for exports: the server-side cursor
+    is read `batch_size` documents at a time, so memory stays flat whatever
+    the range.
+    """
+    cursor = (
+        get_db()
+        .parking_logs
+        .find(_parking_query(camera_id, resolved, start, end))
+        .sort("timestamp", ASCENDING)
+        .batch_size(batch_size)
+    )
+    try:
+        for doc in cursor:
+            yield _with_id(doc)
+    finally:
+        cursor.close()          # client went away mid-export
+
+
+def _parking_query(
+    camera_id: Optional[str],
+    resolved: Optional[bool],
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> dict:
+    query: dict = {}
+    if camera_id is not None:
+        query["camera_id"] = camera_id
+    if resolved is not None:
+        query["resolved"] = resolved
+    if start is not None or end is not None:
+        # timestamps are stored as ISO strings, which sort chronologically
+        query["timestamp"] = {}
+        if start is not None:
+            query["timestamp"]["$gte"] = start.isoformat()
+        if end is not None:
+            query["timestamp"]["$lt"] = end.isoformat()
+    return query
+
+
+def _resolution(officer: str, notes: str) -> dict:
+    return {"$set": {
+        "resolved":    True,
+        "resolved_at": datetime.utcnow().isoformat(),
+        "officer":     officer,
+        "notes":       notes,
+    }}
+
+
+def _object_ids(ids: List[str]) -> Tuple[List[ObjectId], List[str]]:
+    """(valid ObjectIds, the ids that are not ObjectIds)."""
+    oids, invalid = [], []
+    for event_id in ids:
+        try:
+            oids.append(ObjectId(event_id))
+        except (InvalidId, TypeError):
+            invalid.append(event_id)
+    return oids, invalid
+
+
+def _with_id(doc: dict) -> dict:
+    doc["id"] = str(doc.pop("_id"))
+    return doc
 
 
 def get_detection_stats() -> dict:
@@ -124,4 +267,116 @@ def get_detection_stats() -> dict:
     ]
     labels = {r["_id"]: r["count"] for r in db.detections.aggregate(pipeline)}
     total  = db.detections.count_documents({})
-    return {"total": total, "by_label": labels}
\ No newline at end of file
+    return {"total": total, "by_label": labels}
+
+
+# ─── Analytics ───────────────────────────────────────────────────────────────
+
+ANALYTICS_COLLECTIONS = {
+    "minute": "analytics_minute",
+    "hour":   "analytics_hour",
+    "day":    "analytics_day",
+}
+ANALYTICS_MINUTE_DAYS = int(os.getenv("ANALYTICS_MINUTE_DAYS", "14"))
+BUCKET_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+
+
+def write_analytics(minute_docs: List[dict]):
+    """
+    Store closed one-minute buckets and fold them into their hour and day
+    buckets (one insert_many and two bulk_writes, whatever the camera count).
+    """
+    db = get_db()
+    db.analytics_minute.insert_many([dict(d) for d in minute_docs], ordered=False)
+    for resolution, truncate in (
+        ("hour", lambda t: t.replace(minute=0, second=0, microsecond=0)),
+        ("day",  lambda t: t.replace(hour=0, minute=0, second=0, microsecond=0)),
+    ):
+        ops = []
+        for doc in minute_docs:
+            inc = {
+                "frames":     doc["frames"],
+                "ticks":      doc["ticks"],
+                "uptime_s":   doc["uptime_s"],
+                "trash.sum":  doc["trash"]["sum"],
+                "events.trash":   doc["events"]["trash"],
+                "events.parking": doc["events"]["parking"],
+            }
+            top = {"trash.max": doc["trash"]["max"]}
+            for name, z in doc["zones"].items():
+                inc[f"zones.{name}.sum"] = z["sum"]
+                top[f"zones.{name}.max"] = z["max"]
+            ops.append(UpdateOne(
+                {"camera_id": doc["camera_id"], "t": truncate(doc["t"])},
+                {"$inc": inc, "$max": top},
+                upsert=True,
+            ))
+        db[ANALYTICS_COLLECTIONS[resolution]].bulk_write(ops, ordered=False)
+
+
+def get_analytics(
+    resolution: str = "hour",
+    camera_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 10_000,
+) -> List[dict]:
+    """Buckets of `resolution` in [start, end), oldest first, with averages filled in."""
+    query: dict = {}
+    if camera_id is not None:
+        query["camera_id"] = camera_id
+    if start is not None or end is not None:
+        query["t"] = {}
+        if start is not None:
+            query["t"]["$gte"] = start
+        if end is not None:
+            query["t"]["$lt"] = end
+    cursor = (
+        get_db()[ANALYTICS_COLLECTIONS[resolution]]
+        .find(query, {"_id": 0})
+        .sort([("t", 1), ("camera_id", 1)])
+        .limit(limit)
+    )
+    return [_analytics_row(doc, BUCKET_SECONDS[resolution]) for doc in cursor]
+
+
+def _analytics_row(doc: dict, bucket_seconds: int) -> dict:
+    ticks  = doc.get("ticks", 0)
+    uptime = doc.get("uptime_s", 0.0)
+    trash  = doc.get("trash", {})
+    return {
+        "camera_id": doc["camera_id"],
+        "t":         doc["t"].isoformat(),
+        "frames":    doc.get("frames", 0),
+        "fps":       round(doc.get("frames", 0) / uptime, 2) if uptime else 0.0,
+        "uptime":    round(min(1.0, uptime / bucket_seconds), 3),
+        "ticks":     ticks,
+        "trash":     {
+            "avg": round(trash.get("sum", 0) / ticks, 2) if ticks else 0.0,
+            "max": trash.get("max", 0),
+        },
+        "events":    doc.get("events", {}),
+        "zones":     {
+            name: {"avg": round(z.get("sum", 0) / ticks, 2) if ticks else 0.0, "max": z.get("max", 0)}
+            for name, z in doc.get("zones", {}).items()
+        },
+    }
+
+
+# ─── Camera registry ─────────────────────────────────────────────────────────
+
+def load_camera_configs() -> list:
+    """Every persisted camera config document (without _id)."""
+    return list(get_db().cameras.find({}, {"_id": 0}))
+
+
+def save_camera_config(config: dict):
+    """Insert or replace a camera config, keyed by camera_id."""
+    get_db().cameras.replace_one(
+        {"camera_id": config["camera_id"]}, config, upsert=True,
+    )
+
+
+def delete_camera_config(camera_id: str) -> bool:
+    result = get_db().cameras.delete_one({"camera_id": camera_id})
+    return result.deleted_count == 1
@@ -0,0 +1,595 @@
+"""
+Inference backends
+──────────────────
+Detectors ask a backend for raw YOLO boxes instead of talking to
+ultralytics directly, so the runtime can be swapped per detector
+without touching detection logic.
+
+  torch     — ultralytics YOLO on PyTorch (CUDA when available).  Default.
+  onnx      — model exported to ONNX, run on ONNX Runtime (CPU).
+  openvino  — model exported to OpenVINO IR, run on the OpenVINO CPU plugin.
+
+The exported backends convert the .pt weights on first use and cache the
+result in MODEL_CACHE_DIR, so the (slow) export only happens once per
+model / input size / precision.  With int8=True they use a quantized
+variant (dynamic quantization for ONNX, NNCF post-training quantization
+for OpenVINO).
+
+Every backend returns an `InferenceResult` exposing the subset of the
+ultralytics `Results` API the detectors use: `.names` and `.boxes` with
+per-box `cls`, `conf` and `xyxy`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))   # 0 = runtime default
+INFERENCE_INT8    = os.getenv("INFERENCE_INT8", "0") == "1"
+MODEL_CACHE_DIR   = os.getenv("MODEL_CACHE_DIR", "models")
+# Share forward passes between quiet cameras (see detectors/mosaic.py).
+INFERENCE_MOSAIC  = os.getenv("INFERENCE_MOSAIC", "0") == "1"
+# Smaller model detectors switch to under overload (see admission.py).
+LITE_MODEL        = os.getenv("LITE_MODEL", "yolov8n.pt")
+
+IMGSZ          = 640
+NMS_IOU        = 0.7      # ultralytics predict() defaults
+MAX_DETECTIONS = 300
+LETTERBOX_FILL = 114
+
+# Exports write next to the weights and are not safe to run concurrently.
+_export_lock = threading.Lock()
+
+
+# ─── Result types ────────────────────────────────────────────────────────────
+
+class Boxes:
+    """Array-backed stand-in for ultralytics `Boxes` (cls, conf, xyxy)."""
+
+    __slots__ = ("cls", "conf", "xyxy")
+
+    def __init__(self, cls: np.ndarray, conf: np.ndarray, xyxy: np.ndarray):
+        self.cls  = cls
+        self.conf = conf
+        self.xyxy = xyxy
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    def __iter__(self) -> Iterator["Boxes"]:
+        for i in range(len(self.conf)):
+            yield Boxes(self.cls[i:i + 1], self.conf[i:i + 1], self.xyxy[i:i + 1])
+
+
+class InferenceResult:
+    __slots__ = ("names", "boxes")
+
+    def __init__(self, names: Dict[int, str], boxes: Boxes):
+        self.names = names
+        self.boxes = boxes
+
+
+def box_arrays(result) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (class ids int64 (N,), confidences float32 (N,), xyxy float32 (N, 4)) of
+    an InferenceResult or ultralytics Results, converted once for all boxes.
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.empty(0, np.int64), np.empty(0, np.float32), np.empty((0, 4), np.float32)
+    cls, conf, xyxy = boxes.cls, boxes.conf, boxes.xyxy
+    if hasattr(cls, "cpu"):             # torch tensors from ultralytics
+        cls, conf, xyxy = cls.cpu().numpy(), conf.cpu().numpy(), xyxy.cpu().numpy()
+    return (
+        np.asarray(cls).astype(np.int64, copy=False).reshape(-1),
+        np.asarray(conf, dtype=np.float32).reshape(-1),
+        np.asarray(xyxy, dtype=np.float32).reshape(-1, 4),
+    )
+
+
+# ─── Backend interface ───────────────────────────────────────────────────────
+
+class InferenceBackend(ABC):
+    name: str = "base"
+
+    def __init__(
+        self,
+        model_path: str,
+        threads: int = INFERENCE_THREADS,
+        int8: bool = INFERENCE_INT8,
+        imgsz: int = IMGSZ,
+    ):
+        self.model_path = model_path
+        self.threads    = threads
+        self.int8       = int8
+        self.imgsz      = imgsz
+
+    @abstractmethod
+    def predict(self, frame: np.ndarray, conf: float = 0.25):
+        """Run the model on one BGR frame; return a Results-like object."""
+        ...
+
+    def predict_batch(self, frames: List[np.ndarray], conf: float = 0.25) -> list:
+        """One result per frame; backends that can batch override this."""
+        return [self.predict(frame, conf=conf) for frame in frames]
+
+    def close(self) -> None:
+        """Hand back shared resources; a private model is simply dropped."""
+
+    def __repr__(self) -> str:
+        return f"<Backend: {self.name} {self.model_path}>"
+
+
+class TorchBackend(InferenceBackend):
+    name = "torch"
+
+    def __init__(self, model_path: str, **kwargs):
+        super().__init__(model_path, **kwargs)
+        import torch
+        from ultralytics import YOLO
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if self.int8:
+            log.warning("int8 is not supported by the torch backend — ignored")
+
+        log.info("Loading YOLO model: %s", model_path)
+        self._model = YOLO(model_path)
+        if torch.cuda.is_available():
+            self._model.to("cuda")
+            self._device = 0
+            log.info("%s using GPU: %s", model_path, torch.cuda.get_device_name(0))
+        else:
+            self._device = "cpu"
+            log.warning("%s using CPU", model_path)
+
+    def predict(self, frame: np.ndarray, conf: float = 0.25):
+        return self._model.predict(
+            source=frame,
+            device=self._device,
+            conf=conf,
+            verbose=False,
+        )[0]
+
+    def predict_batch(self, frames: List[np.ndarray], conf: float = 0.25) -> list:
+        if not frames:
+            return []
+        return self._model.predict(
+            source=list(frames),
+            device=self._device,
+            conf=conf,
+            verbose=False,
+        )
+
+
+class _ExportedBackend(InferenceBackend):
+    """
+    Shared pre/post-processing for exported YOLOv8 detection models:
+    letterbox → (1, 3, S, S) float blob → (1, 4 + nc, anchors) output →
+    confidence filter → class-aware NMS → boxes in frame coordinates.
+    """
+
+    export_format: str = ""
+
+    def __init__(self, model_path: str, **kwargs):
+        super().__init__(model_path, **kwargs)
+        self._lock = threading.Lock()
+        artifact   = self._resolve_artifact()
+        self.names = _load_names(artifact)
+        log.info("Loading %s model: %s", self.name, artifact)
+        self._load(artifact)
+
+    # ─── Subclass hooks ──────────────────────────────────────────────────
+
+    @abstractmethod
+    def _artifact_path(self) -> str:
+        """Cache location of the exported model for this configuration."""
+        ...
+
+    @abstractmethod
+    def _load(self, artifact: str):
+        ...
+
+    @abstractmethod
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def _store_export(self, exported: str, target: str):
+        """Move the exporter's output to `target`; int8 is applied here or by the export."""
+        ...
+
+    # ─── Export + cache ──────────────────────────────────────────────────
+
+    def _resolve_artifact(self) -> str:
+        if not self.model_path.endswith(".pt"):
+            return self.model_path          # already exported
+
+        target = self._artifact_path()
+        with _export_lock:
+            if os.path.exists(target) and os.path.exists(_names_path(target)):
+                return target
+
+            from ultralytics import YOLO
+
+            os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+            log.info("Exporting %s to %s (one-off)…", self.model_path, self.name)
+            model    = YOLO(self.model_path)
+            quantize = self.int8 and self.export_format == "openvino"
+            exported = model.export(
+                format=self.export_format,
+                imgsz=self.imgsz,
+                int8=quantize,
+                verbose=False,
+            )
+            if os.path.exists(target):
+                shutil.rmtree(target) if os.path.isdir(target) else os.remove(target)
+            self._store_export(exported, target)
+
+            with open(_names_path(target), "w") as fh:
+                json.dump({str(k): v for k, v in model.names.items()}, fh)
+            log.info("Cached %s model → %s", self.name, target)
+        return target
+
+    def _cache_stem(self) -> str:
+        stem = os.path.splitext(os.path.basename(self.model_path))[0]
+        return os.path.join(
+            MODEL_CACHE_DIR, f"{stem}-{self.imgsz}{'-int8' if self.int8 else ''}"
+        )
+
+    # ─── Inference ───────────────────────────────────────────────────────
+
+    def predict(self, frame: np.ndarray, conf: float = 0.25) -> InferenceResult:
+        blob, ratio, (pad_x, pad_y) = self._letterbox(frame)
+        with self._lock:
+            out = self._infer(blob)
+
+        preds  = out[0].T                     # (anchors, 4 + nc)
+        scores = preds[:, 4:]
+        cls    = scores.argmax(axis=1)
+        best   = scores[np.arange(len(cls)), cls]
+        keep   = best >= conf
+        preds, cls, best = preds[keep], cls[keep], best[keep]
+
+        if len(best):
+            cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+            xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+            xyxy[:, [0, 2]] = (xyxy[:, [0, 2]] - pad_x) / ratio
+            xyxy[:, [1, 3]] = (xyxy[:, [1, 3]] - pad_y) / ratio
+            xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, frame.shape[1])
+            xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, frame.shape[0])
+
+            xywh = np.concatenate([xyxy[:, :2], xyxy[:, 2:] - xyxy[:, :2]], axis=1)
+            idx  = cv2.dnn.NMSBoxesBatched(
+                xywh.tolist(), best.tolist(), cls.tolist(), conf, NMS_IOU,
+            )
+            idx  = np.asarray(idx, dtype=np.int64).reshape(-1)[:MAX_DETECTIONS]
+            xyxy, cls, best = xyxy[idx], cls[idx], best[idx]
+        else:
+            xyxy = np.zeros((0, 4), dtype=np.float32)
+
+        return InferenceResult(
+            self.names,
+            Boxes(cls.astype(np.float32), best.astype(np.float32), xyxy.astype(np.float32)),
+        )
+
+    def _letterbox(self, frame: np.ndarray):
+        """Scale to fit imgsz×imgsz keeping aspect, pad centrally (ultralytics style)."""
+        h, w  = frame.shape[:2]
+        ratio = min(self.imgsz / h, self.imgsz / w)
+        nw, nh = int(round(w * ratio)), int(round(h * ratio))
+        img = frame if (nw, nh) == (w, h) else cv2.resize(frame, (nw, nh))
+
+        pad_x, pad_y = (self.imgsz - nw) / 2, (self.imgsz - nh) / 2
+        top, bottom  = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+        left, right  = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+        img = cv2.copyMakeBorder(
+            img, top, bottom, left, right, cv2.BORDER_CONSTANT,
+            value=(LETTERBOX_FILL,) * 3,
+        )
+        blob = cv2.dnn.blobFromImage(img, 1 / 255.0, swapRB=True)
+        return blob, ratio, (left, top)
+
+
+class OnnxBackend(_ExportedBackend):
+    name          = "onnx"
+    export_format = "onnx"
+
+    def _artifact_path(self) -> str:
+        return self._cache_stem() + ".onnx"
+
+    def _load(self, artifact: str):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            opts.intra_op_num_threads = self.threads
+            opts.inter_op_num_threads = 1
+        self._session = ort.InferenceSession(
+            artifact, sess_options=opts, providers=["CPUExecutionProvider"],
+        )
+        self._input = self._session.get_inputs()[0].name
+
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        return self._session.run(None, {self._input: blob})[0]
+
+    def _store_export(self, exported: str, target: str):
+        if not self.int8:
+            shutil.move(exported, target)
+            return
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        log.info("Quantizing %s to int8…", exported)
+        quantize_dynamic(exported, target, weight_type=QuantType.QUInt8)
+        os.remove(exported)
+
+
+class OpenVINOBackend(_ExportedBackend):
+    name          = "openvino"
+    export_format = "openvino"
+
+    def _artifact_path(self) -> str:
+        return self._cache_stem() + "_openvino_model"
+
+    def _store_export(self, exported: str, target: str):
+        shutil.move(exported, target)       # int8 (NNCF) already ran in the export
+
+    def _load(self, artifact: str):
+        import openvino as ov
+
+        xml = artifact
+        if os.path.isdir(artifact):
+            xml = next(
+                os.path.join(artifact, f) for f in os.listdir(artifact) if f.endswith(".xml")
+            )
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if self.threads:
+            config["INFERENCE_NUM_THREADS"] = self.threads
+        core     = ov.Core()
+        compiled = core.compile_model(core.read_model(xml), "CPU", config)
+        self._request = compiled.create_infer_request()
+        self._output  = compiled.output(0)
+
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        return self._request.infer([blob])[self._output]
+
+
+BACKENDS = {
+    TorchBackend.name:    TorchBackend,
+    OnnxBackend.name:     OnnxBackend,
+    OpenVINOBackend.name: OpenVINOBackend,
+}
+
+
+def create_backend(
+    model_path: str,
+    backend: Optional[str] = None,
+    threads: Optional[int] = None,
+    int8: Optional[bool] = None,
+) -> InferenceBackend:
+    """
+    Instantiate a backend by name; None arguments fall back to the env
+    defaults.  With INFERENCE_MOSAIC the caller gets a client of the
+    model's shared mosaic scheduler instead.
+    """
+    name    = backend or INFERENCE_BACKEND
+    threads = INFERENCE_THREADS if threads is None else threads
+    int8    = INFERENCE_INT8 if int8 is None else int8
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name!r}; choose from {sorted(BACKENDS)}")
+    if INFERENCE_MOSAIC:
+        from .mosaic import mosaic_client      # mosaic builds on this module
+        return mosaic_client(model_path, name, threads, int8)
+    return instantiate_backend(name, model_path, threads, int8)
+
+
+def instantiate_backend(name: str, model_path: str, threads: int, int8: bool) -> InferenceBackend:
+    """A new, private model instance (create_backend() without the mosaic)."""
+    return BACKENDS[name](model_path, threads=threads, int8=int8)
+
+
+class _SharedBackend(InferenceBackend):
+    """A pooled backend: one model instance, called by one thread at a time."""
+
+    def __init__(self, inner: InferenceBackend):
+        super().__init__(inner.model_path, threads=inner.threads, int8=inner.int8, imgsz=inner.imgsz)
+        self.name  = inner.name
+        self.inner = inner
+        self._lock = threading.Lock()
+
+    def predict(self, frame: np.ndarray, conf: float = 0.25):
+        with self._lock:
+            return self.inner.predict(frame, conf=conf)
+
+    def predict_batch(self, frames: List[np.ndarray], conf: float = 0.25) -> list:
+        with self._lock:
+            return self.inner.predict_batch(frames, conf=conf)
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def __repr__(self) -> str:
+        return f"<Backend: shared {self.inner!r}>"
+
+
+class _PoolEntry:
+    __slots__ = ("backend", "refs", "lock")
+
+    def __init__(self):
+        self.backend: Optional[_SharedBackend] = None
+        self.refs    = 0
+        self.lock    = threading.Lock()     # held while the model loads
+
+
+class ModelPool:
+    """
+    Backends shared by every detector in the process that asks for the same
+    (model, backend, threads, int8), refcounted: acquire() loads the model
+    on first use, release() drops it when its last user is gone.  Calls into
+    a pooled model are serialized, so the pool suits models that run rarely
+    or quickly (the cascade's screener and heavy stages).
+    """
+
+    def __init__(self):
+        self._entries: Dict[tuple, _PoolEntry] = {}
+        self._lock = threading.Lock()
+
+    def acquire(
+        self,
+        model_path: str,
+        backend: Optional[str] = None,
+        threads: Optional[int] = None,
+        int8: Optional[bool] = None,
+    ) -> InferenceBackend:
+        key = (
+            backend or INFERENCE_BACKEND,
+            model_path,
+            INFERENCE_THREADS if threads is None else threads,
+            INFERENCE_INT8 if int8 is None else int8,
+        )
+        with self._lock:
+            entry = self._entries.setdefault(key, _PoolEntry())
+            entry.refs += 1
+        try:
+            with entry.lock:
+                if entry.backend is None:
+                    name, _, threads, int8 = key
+                    entry.backend = _SharedBackend(create_backend(model_path, name, threads, int8))
+                    log.info("Model pool: loaded %s (%s)", model_path, name)
+                return entry.backend
+        except Exception:
+            self._drop(key, entry)
+            raise
+
+    def release(self, backend: Optional[InferenceBackend]):
+        if backend is None:
+            return
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.backend is backend:
+                    break
+            else:
+                return
+        self._drop(key, entry)
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            return [
+                {"model": key[1], "backend": key[0], "refs": entry.refs, "loaded": entry.backend is not None}
+                for key, entry in self._entries.items()
+            ]
+
+    def _drop(self, key: tuple, entry: _PoolEntry):
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs > 0 or self._entries.get(key) is not entry:
+                return
+            del self._entries[key]
+        if entry.backend is not None:
+            entry.backend.close()
+        log.info("Model pool: released %s (%s)", key[1], key[0])
+
+
+model_pool = ModelPool()
+
+
+class LiteModel:
+    """
+    A detector's stand-in model for overload (admission control).  Taken
+    from the model pool in the background the first time it is enabled, so
+    every detector with the same backend options shares one copy, loaded
+    once; until it is ready, and whenever it is disabled, pick() returns the
+    detector's own backend.  close() hands it back to the pool.
+    """
+
+    def __init__(self, backend_opts: tuple, model_path: str = LITE_MODEL):
+        self.model_path = model_path
+        self.enabled    = False
+        self._opts      = backend_opts
+        self._backend: Optional[InferenceBackend] = None
+        self._loading   = False
+        self._closed    = False
+        self._lock      = threading.Lock()
+
+    def set(self, enabled: bool):
+        self.enabled = enabled
+        if not enabled:
+            return
+        with self._lock:
+            if self._backend is not None or self._loading or self._closed:
+                return
+            self._loading = True
+        threading.Thread(target=self._load, daemon=True, name="lite-model").start()
+
+    def close(self):
+        with self._lock:
+            self._closed  = True
+            self.enabled  = False
+            backend, self._backend = self._backend, None
+        model_pool.release(backend)
+
+    def pick(self, main: InferenceBackend) -> InferenceBackend:
+        backend = self._backend
+        return backend if self.enabled and backend is not None else main
+
+    def _load(self):
+        try:
+            backend = model_pool.acquire(self.model_path, *self._opts)
+        except Exception:
+            log.exception("Failed to load lite model %s", self.model_path)
+            backend = None
+        with self._lock:
+            self._loading = False
+            if not self._closed:
+                self._backend, backend = backend, None
+        model_pool.release(backend)         # closed while loading
+
+
+# ─── Helpers ─────────────────────────────────────────────────────────────────
+
+def _names_path(artifact: str) -> str:
+    return artifact.rstrip("/\\") + ".names.json"
+
+
+def _load_names(artifact: str) -> Dict[int, str]:
+    """Class names written alongside the export (or from ONNX metadata)."""
+    path = _names_path(artifact)
+    if os.path.exists(path):
+        with open(path) as fh:
+            return {int(k): v for k, v in json.load(fh).items()}
+
+    if artifact.endswith(".onnx"):
+        import ast
+        import onnxruntime as ort
+
+        meta = ort.InferenceSession(artifact, providers=["CPUExecutionProvider"])
+        raw  = meta.get_modelmeta().custom_metadata_map.get("names")
+        if raw:
+            return {int(k): v for k, v in ast.literal_eval(raw).items()}
+    raise FileNotFoundError(f"No class names found for {artifact} (expected {path})")
+
+
+BackendSpec = Union[str, Dict[str, str], None]
+
+
+def backend_for(spec: BackendSpec, detector: str) -> Optional[str]:
+    """
+    Resolve a per-camera backend spec for one detector.
+    `spec` is a backend name, or a {detector_name: backend_name} mapping.
+    """
+    if isinstance(spec, dict):
+        return spec.get(detector)
+    return spec
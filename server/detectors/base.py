@@ -1,24 +1,42 @@
 """
 Base detector interface.
 All detectors must inherit from BaseDetector and implement `detect()`.
+Detectors that need a model must not load it in __init__: they override
+`load()` / `ready` so weights are loaded off the request path.
+
+A detector returns one FrameDetections per frame: columns of labels,
+confidences and boxes sharing the frame's timestamp and camera.  Consumers
+filter and draw from the columns; a Detection record is only built for a
+row that is actually persisted (iterating yields them one by one).
 """
 
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence
 import numpy as np
 
 
-@dataclass
 class Detection:
-    label: str
-    confidence: float
-    bbox: List[int]               # [x1, y1, x2, y2]
-    timestamp: datetime = field(default_factory=datetime.utcnow)
-    camera_id: str = "unknown"
-    meta: dict = field(default_factory=dict)
+    """One persisted event."""
+
+    __slots__ = ("label", "confidence", "bbox", "timestamp", "camera_id", "meta")
+
+    def __init__(
+        self,
+        label: str,
+        confidence: float,
+        bbox: List[int],              # [x1, y1, x2, y2]
+        timestamp: Optional[datetime] = None,
+        camera_id: str = "unknown",
+        meta: Optional[dict] = None,
+    ):
+        self.label      = label
+        self.confidence = confidence
+        self.bbox       = bbox
+        self.timestamp  = timestamp or datetime.utcnow()
+        self.camera_id  = camera_id
+        self.meta       = {} if meta is None else meta
 
     def to_dict(self) -> dict:
         return {
@@ -30,14 +48,154 @@ class Detection:
             "meta":       self.meta,
         }
 
+    def __repr__(self) -> str:
+        return f"Detection({self.label!r}, {self.confidence:.2f}, {self.bbox}, camera_id={self.camera_id!r})"
+
+
+class FrameDetections:
+    """
+    Column-oriented detections of one frame.
+
+    labels      : list of N label strings (usually shared, interned objects)
+    confidences : float32 array (N,)
+    boxes       : int32 array (N, 4) — x1, y1, x2, y2
+    meta        : list of N dicts, shared between rows and never mutated;
+                  rows are given a copy when turned into a Detection.
+    """
+
+    __slots__ = ("camera_id", "timestamp", "labels", "confidences", "boxes", "meta")
+
+    def __init__(
+        self,
+        camera_id: str,
+        labels: Sequence[str],
+        confidences: np.ndarray,
+        boxes: np.ndarray,
+        meta: Sequence[dict],
+        timestamp: Optional[datetime] = None,
+    ):
+        self.camera_id   = camera_id
+        self.timestamp   = timestamp or datetime.utcnow()
+        self.labels      = list(labels)
+        self.confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        self.boxes       = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        self.meta        = list(meta)
+
+    @classmethod
+    def empty(cls, camera_id: str = "unknown", timestamp: Optional[datetime] = None) -> "FrameDetections":
+        return cls(camera_id, [], np.empty(0, np.float32), np.empty((0, 4), np.int32), [], timestamp)
+
+    @classmethod
+    def concat(cls, parts: List["FrameDetections"], camera_id: str = "unknown") -> "FrameDetections":
+        """Rows of all `parts`, in order (e.g. one part per detector)."""
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.empty(camera_id)
+        if len(parts) == 1:
+            return parts[0]
+        return cls(
+            parts[0].camera_id,
+            [label for p in parts for label in p.labels],
+            np.concatenate([p.confidences for p in parts]),
+            np.concatenate([p.boxes for p in parts]),
+            [m for p in parts for m in p.meta],
+            parts[0].timestamp,
+        )
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def detection(self, i: int) -> Detection:
+        """Row `i` as a standalone Detection."""
+        return Detection(
+            label=self.labels[i],
+            confidence=float(self.confidences[i]),
+            bbox=self.boxes[i].tolist(),
+            timestamp=self.timestamp,
+            camera_id=self.camera_id,
+            meta=dict(self.meta[i]),
+        )
+
+    def __iter__(self) -> Iterator[Detection]:
+        for i in range(len(self.labels)):
+            yield self.detection(i)
+
+    def to_dicts(self) -> List[dict]:
+        """Detection.to_dict() of every row, without building Detections."""
+        ts = self.timestamp.isoformat()
+        return [
+            {
+                "label":      label,
+                "confidence": round(conf, 4),
+                "bbox":       bbox,
+                "timestamp":  ts,
+                "camera_id":  self.camera_id,
+                "meta":       meta,
+            }
+            for label, conf, bbox, meta in zip(
+                self.labels, self.confidences.tolist(), self.boxes.tolist(), self.meta,
+            )
+        ]
+
 
 class BaseDetector(ABC):
     name: str = "base"
 
+    def load(self) -> None:
+        """Load model weights.  Safe to call more than once."""
+
+    @property
+    def ready(self) -> bool:
+        """True once load() has finished and detect() will not block on it."""
+        return True
+
+    def set_lite(self, enabled: bool) -> None:
+        """Switch live detect() calls to the detector's lite model, if it has one."""
+
+    def close(self) -> None:
+        """Release shared resources (pooled models) once the camera is removed."""
+
+    def checkpoint(self) -> Optional[dict]:
+        """JSON-safe state worth keeping across a restart, or None (stateless)."""
+        return None
+
+    def restore(self, state: dict) -> bool:
+        """Adopt a checkpoint() taken earlier; False if it no longer applies."""
+        return False
+
+    def occupancy(self) -> Optional[Dict[str, int]]:
+        """Objects per zone seen on the last detection tick, for zone-based detectors."""
+        return None
+
+    def cascade_stats(self) -> Optional[dict]:
+        """Per-stage counts of cascade inference, or None when not cascading."""
+        return None
+
     @abstractmethod
-    def detect(self, frame: np.ndarray, camera_id: str = "unknown") -> List[Detection]:
-        """Run inference on a single BGR frame. Return a list of Detection objects."""
+    def detect(
+        self, frame: np.ndarray, camera_id: str = "unknown", ts: Optional[float] = None,
+    ) -> FrameDetections:
+        """
+        Run inference on a single BGR frame and return its detections.
+        ts: when the frame was captured, in seconds on any monotonic timeline
+        (time.monotonic() live, media time on replay); None means now.
+        Detectors with temporal logic must measure time with it, never the
+        wall clock, so recorded footage can run faster than real time.
+        """
         ...
 
+    def detect_batch(
+        self,
+        frames: List[np.ndarray],
+        camera_id: str = "unknown",
+        timestamps: Optional[List[Optional[float]]] = None,
+    ) -> List[FrameDetections]:
+        """
+        detect() over consecutive frames of one camera, in order; returns one
+        result per frame.  Detectors override it to batch their inference.
+        """
+        timestamps = timestamps or [None] * len(frames)
+        return [self.detect(f, camera_id=camera_id, ts=t) for f, t in zip(frames, timestamps)]
+
     def __repr__(self) -> str:
         return f"<Detector: {self.name}>"
\ No newline at end of file
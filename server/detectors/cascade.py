@@ -0,0 +1,99 @@
+"""
+Cascade inference
+─────────────────
+With INFERENCE_CASCADE=1 a small screening model (CASCADE_SCREEN_MODEL)
+runs on every detection tick and the detector's own, heavy model only runs
+when the screener is unsure:
+
+  * uncertain — a relevant candidate (a reported class for the trash
+    detector, a vehicle for the parking detector) scored inside the band
+    [CASCADE_BAND_LOW, CASCADE_BAND_HIGH).  Candidates above the band are
+    taken from the screener as they are; those below it are ignored.
+  * confirm   — (parking) a tracked vehicle is within CASCADE_CONFIRM_SECONDS
+    of its dwell threshold, so the event is confirmed by the heavy model.
+
+Both models come from the process-wide ModelPool, so every camera shares
+one screener and one heavy model per (model, backend) instead of loading its
+own.  Each detector counts its frames per outcome; the screener's hit rate
+(the share of frames it resolved alone) is in the camera stats and in
+smartcity_cascade_frames_total.  Offline batches (jobs, replay) skip the
+screener and run the heavy model.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from ..metrics import CASCADE_FRAMES
+from .backends import InferenceBackend, model_pool
+
+INFERENCE_CASCADE       = os.getenv("INFERENCE_CASCADE", "0") == "1"
+CASCADE_SCREEN_MODEL    = os.getenv("CASCADE_SCREEN_MODEL", "yolov8n.pt")
+CASCADE_BAND_LOW        = float(os.getenv("CASCADE_BAND_LOW", "0.25"))
+CASCADE_BAND_HIGH       = float(os.getenv("CASCADE_BAND_HIGH", "0.60"))
+CASCADE_CONFIRM_SECONDS = float(os.getenv("CASCADE_CONFIRM_SECONDS", "2"))
+
+OUTCOMES = ("resolved", "uncertain", "confirm")
+
+
+class Cascade:
+    """The screening stage of one detector, and its per-outcome counts."""
+
+    def __init__(
+        self,
+        detector: str,
+        backend_opts: tuple,
+        screen_model: str = CASCADE_SCREEN_MODEL,
+        band: tuple = (CASCADE_BAND_LOW, CASCADE_BAND_HIGH),
+    ):
+        self.screen_model = screen_model
+        self.low, self.high = band
+        self.screener: Optional[InferenceBackend] = None
+        self._opts   = backend_opts
+        self._counts: Dict[str, int] = dict.fromkeys(OUTCOMES, 0)
+        self._m      = {o: CASCADE_FRAMES.labels(detector, o) for o in OUTCOMES}
+        self._lock   = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self.screener is None:
+                self.screener = model_pool.acquire(self.screen_model, *self._opts)
+
+    def close(self):
+        with self._lock:
+            model_pool.release(self.screener)
+            self.screener = None
+
+    def screen(self, frame: np.ndarray):
+        return self.screener.predict(frame, conf=self.low)
+
+    def uncertain(self, conf: np.ndarray) -> bool:
+        """True if any of these candidate confidences is inside the band."""
+        return bool(((conf >= self.low) & (conf < self.high)).any())
+
+    def record(self, outcome: str):
+        self._counts[outcome] += 1
+        self._m[outcome].inc()
+
+    def stats(self) -> dict:
+        counts    = dict(self._counts)
+        frames    = sum(counts.values())
+        escalated = frames - counts["resolved"]
+        return {
+            "screen_model": self.screen_model,
+            "frames":       frames,
+            "screen": {
+                "resolved": counts["resolved"],
+                "hit_rate": round(counts["resolved"] / frames, 3) if frames else None,
+            },
+            "heavy": {
+                "runs":      escalated,
+                "uncertain": counts["uncertain"],
+                "confirm":   counts["confirm"],
+                "rate":      round(escalated / frames, 3) if frames else None,
+            },
+        }
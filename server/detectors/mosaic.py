@@ -0,0 +1,225 @@
+"""
+Mosaic inference
+────────────────
+With INFERENCE_MOSAIC=1 the inference requests of quiet cameras share
+forward passes: frames (or the ROI crops the parking detector asks for)
+from up to MOSAIC_GRID² requests are letterboxed into the tiles of one
+image the size of the model input, the model runs once, and every box is
+mapped back to the tile — and so the camera and coordinates — it came from.
+Detectors see an ordinary backend and filter / track as usual.
+
+  * One MosaicScheduler per (backend, model, threads, int8) owns the only
+    model instance and a worker thread; each detector gets a MosaicClient.
+    Schedulers are refcounted by their clients: closing the last client
+    stops the worker thread and drops the model.
+  * Requests are collected for at most MOSAIC_WAIT_MS after the first one.
+    Under load they also pile up while the previous pass runs, which is
+    exactly when sharing pays off.  A lone request runs at full size.
+  * A camera whose recent results average more than MOSAIC_MAX_BOXES boxes
+    is busy (small objects matter, tiles are 1/MOSAIC_GRID the resolution)
+    and gets full-size passes of its own until it quiets down.  Those run
+    on the worker thread too, so the shared model is only ever called
+    from one thread.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..metrics import MOSAIC_PASSES, MOSAIC_REQUESTS
+from .backends import (
+    LETTERBOX_FILL, Boxes, InferenceBackend, InferenceResult, box_arrays, instantiate_backend,
+)
+
+log = logging.getLogger(__name__)
+
+MOSAIC_GRID      = int(os.getenv("MOSAIC_GRID", "2"))          # tiles per side
+MOSAIC_WAIT_MS   = float(os.getenv("MOSAIC_WAIT_MS", "10"))
+MOSAIC_MAX_BOXES = float(os.getenv("MOSAIC_MAX_BOXES", "4"))   # busier cameras run alone
+ACTIVITY_DECAY   = 0.8                                          # EMA weight of the past
+
+
+class _Request:
+    __slots__ = ("frame", "conf", "solo", "future")
+
+    def __init__(self, frame: np.ndarray, conf: float, solo: bool):
+        self.frame  = frame
+        self.conf   = conf
+        self.solo   = solo              # full-size pass, never tiled
+        self.future: Future = Future()
+
+
+class MosaicScheduler:
+    """Batches predict() calls for one model into mosaic forward passes."""
+
+    def __init__(self, backend: InferenceBackend, grid: int = MOSAIC_GRID, wait_ms: float = MOSAIC_WAIT_MS):
+        self.backend = backend
+        self.grid    = max(1, grid)
+        self.tile    = backend.imgsz // self.grid
+        self._wait   = wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self.passes  = 0                # forward passes run
+        self.served  = 0                # requests answered
+        self.refs    = 0                # open clients, see mosaic_client()
+        model = os.path.basename(backend.model_path)
+        self._m_mosaic   = MOSAIC_PASSES.labels(model, "mosaic")
+        self._m_single   = MOSAIC_PASSES.labels(model, "single")
+        self._m_requests = MOSAIC_REQUESTS.labels(model)
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"mosaic-{backend.name}")
+        self._thread.start()
+
+    def predict(self, frame: np.ndarray, conf: float, solo: bool = False) -> InferenceResult:
+        req = _Request(frame, conf, solo)
+        self._queue.put(req)
+        return req.future.result()
+
+    def stop(self):
+        """End the worker thread once queued requests are answered."""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    # ─── Worker ──────────────────────────────────────────────────────────
+
+    def _run(self):
+        slots = self.grid * self.grid
+        while True:
+            first = self._queue.get()
+            if first is None:           # stop()
+                self.backend.close()
+                return
+            tiles, solos = ([], [first]) if first.solo else ([first], [])
+            deadline = time.monotonic() + self._wait
+            while tiles and len(tiles) < slots:
+                try:
+                    req = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if req is None:         # stop() only follows the last client
+                    self._queue.put(None)
+                    break
+                (solos if req.solo else tiles).append(req)
+            for batch in [[req] for req in solos] + ([tiles] if tiles else []):
+                try:
+                    results = self._infer(batch)
+                except Exception as exc:
+                    for req in batch:
+                        req.future.set_exception(exc)
+                else:
+                    for req, res in zip(batch, results):
+                        req.future.set_result(res)
+                self.passes += 1
+                self.served += len(batch)
+                (self._m_mosaic if len(batch) > 1 else self._m_single).inc()
+                self._m_requests.inc(len(batch))
+
+    def _infer(self, batch: List[_Request]) -> List[InferenceResult]:
+        conf = min(req.conf for req in batch)
+        if len(batch) == 1:
+            return [self.backend.predict(batch[0].frame, conf=conf)]
+
+        t      = self.tile
+        canvas = np.full((t * self.grid, t * self.grid, 3), LETTERBOX_FILL, dtype=np.uint8)
+        places: List[Tuple[int, int, int, int, float]] = []   # x0, y0, w, h, scale
+        for i, req in enumerate(batch):
+            h, w  = req.frame.shape[:2]
+            scale = min(t / w, t / h)
+            nw, nh = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+            x0 = (i % self.grid) * t + (t - nw) // 2
+            y0 = (i // self.grid) * t + (t - nh) // 2
+            canvas[y0:y0 + nh, x0:x0 + nw] = cv2.resize(req.frame, (nw, nh), interpolation=cv2.INTER_AREA)
+            places.append((x0, y0, nw, nh, scale))
+
+        result = self.backend.predict(canvas, conf=conf)
+        return self._split(result, places)
+
+    def _split(self, result, places: List[tuple]) -> List[InferenceResult]:
+        """Assign boxes to tiles by centre, clip to the tile image, undo the scaling."""
+        cls, conf, xyxy = box_arrays(result)
+        cx = (xyxy[:, 0] + xyxy[:, 2]) / 2
+        cy = (xyxy[:, 1] + xyxy[:, 3]) / 2
+
+        out = []
+        for x0, y0, w, h, scale in places:
+            inside = (cx >= x0) & (cx < x0 + w) & (cy >= y0) & (cy < y0 + h)
+            boxes  = xyxy[inside] - np.array([x0, y0, x0, y0], dtype=np.float32)
+            boxes  = np.clip(boxes, 0, [w, h, w, h]) / scale
+            out.append(InferenceResult(result.names, Boxes(cls[inside], conf[inside], boxes)))
+        return out
+
+
+class MosaicClient(InferenceBackend):
+    """One detector's view of a shared MosaicScheduler."""
+
+    name = "mosaic"
+
+    def __init__(self, scheduler: MosaicScheduler, max_boxes: float = MOSAIC_MAX_BOXES):
+        backend = scheduler.backend
+        super().__init__(backend.model_path, threads=backend.threads, int8=backend.int8, imgsz=backend.imgsz)
+        self.scheduler = scheduler
+        self.max_boxes = max_boxes
+        self.activity  = 0.0            # EMA of boxes per result
+        self._closed   = False
+
+    def predict(self, frame: np.ndarray, conf: float = 0.25):
+        result = self.scheduler.predict(frame, conf, solo=self.activity > self.max_boxes)
+        n = len(result.boxes) if result.boxes is not None else 0
+        self.activity = ACTIVITY_DECAY * self.activity + (1 - ACTIVITY_DECAY) * n
+        return result
+
+    def predict_batch(self, frames: List[np.ndarray], conf: float = 0.25) -> list:
+        # Offline batches are already full-size batches of one camera, and
+        # job processes run their detectors from a single thread.
+        return self.scheduler.backend.predict_batch(frames, conf=conf)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            _release(self.scheduler)
+
+    def __repr__(self) -> str:
+        return f"<Backend: mosaic over {self.scheduler.backend!r}>"
+
+
+_schedulers: Dict[tuple, MosaicScheduler] = {}
+_lock = threading.Lock()
+
+
+def mosaic_client(model_path: str, backend: str, threads: int, int8: bool) -> MosaicClient:
+    """
+    A client of the scheduler for this model, loading the model on first
+    use; close() the client to hand the scheduler back.
+    """
+    key = (backend, model_path, threads, int8)
+    with _lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = _schedulers[key] = MosaicScheduler(
+                instantiate_backend(backend, model_path, threads, int8),
+            )
+            log.info("Mosaic inference for %s: %dx%d tiles of %dpx",
+                     model_path, scheduler.grid, scheduler.grid, scheduler.tile)
+        scheduler.refs += 1
+    return MosaicClient(scheduler)
+
+
+def _release(scheduler: MosaicScheduler):
+    """Drop a client's reference; the last one stops the scheduler."""
+    with _lock:
+        scheduler.refs -= 1
+        if scheduler.refs > 0:
+            return
+        for key, s in list(_schedulers.items()):
+            if s is scheduler:
+                del _schedulers[key]
+    scheduler.stop()
+    log.info("Mosaic inference for %s stopped", scheduler.backend.model_path)
+
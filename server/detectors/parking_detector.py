@@ -5,25 +5,47 @@ Detects vehicles parked in restricted zones using YOLOv8.
 Algorithm
 ─────────
 1.  Detect all vehicle bounding boxes in the frame.
-2.  Check whether each vehicle's bottom-centre point falls inside any
-    pre-defined "no-parking" polygon.
-3.  A vehicle that stays in a zone for >= DWELL_SECONDS is flagged as
-    illegally parked.
+2.  Look up which "no-parking" zones each vehicle's bottom-centre point is
+    in, and which of those enforce its class right now (zones.py: per-zone
+    dwell limits, schedules and class filters).
+3.  A vehicle that stays in an enforcing zone for at least that zone's
+    dwell limit (default DWELL_SECONDS) is flagged as illegally parked.
+    Dwell is measured on the frame timestamps given to detect(), so
+    recorded clips replay faster than real time with the same result
+    (server/replay.py).  Schedules follow the wall clock.
 4.  Once flagged, the event is not re-raised until the vehicle disappears
     and re-enters (simple cooldown).
+
+ROI mode
+────────
+Zones often cover a thin strip of the frame, so inference can be limited
+to the zones' neighbourhood:
+
+  "off"   — run on the whole frame (default).
+  "crop"  — run once on the padded bounding rectangle of all zones.
+  "tiles" — run once per padded zone rectangle (overlapping rectangles are
+            merged).  Best for small, distant zones: YOLO upscales each
+            tile to its input size, so small vehicles get more pixels.
+
+Boxes are mapped back to frame coordinates before the zone test.
 """
 
 from __future__ import annotations
 
+import os
+import threading
 import time
 import logging
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 import cv2
 import numpy as np
-from ultralytics import YOLO
 
-from .base import BaseDetector, Detection
+from .backends import InferenceBackend, LiteModel, box_arrays, create_backend, model_pool
+from .base import BaseDetector, FrameDetections
+from .cascade import CASCADE_CONFIRM_SECONDS, INFERENCE_CASCADE, Cascade
+from ..metrics import ZONE_OCCUPANCY
+from .zones import ZoneRules
 
 log = logging.getLogger(__name__)
 
@@ -32,13 +54,48 @@ CONFIDENCE_THRESHOLD = 0.50
 DWELL_SECONDS        = 10      # seconds before raising an event
 IOU_MATCH_THRESHOLD  = 0.35    # overlap to consider same vehicle across frames
 
+ROI_MODES   = ("off", "crop", "tiles")
+ROI_MODE    = os.getenv("PARKING_ROI_MODE", "off")
+ROI_PADDING = 32               # px added around zone rectangles
+ROI_MAX_COVERAGE = 0.85        # fall back to the full frame above this area ratio
+
+Rect = Tuple[int, int, int, int]   # x1, y1, x2, y2
+
+
+class _RawBoxes:
+    """One frame's model output in frame coordinates, as arrays."""
+
+    __slots__ = ("names", "cls", "conf", "boxes")
+
+    def __init__(self, names: Dict[int, str], cls: np.ndarray, conf: np.ndarray, boxes: np.ndarray):
+        self.names = names
+        self.cls   = cls
+        self.conf  = conf
+        self.boxes = boxes              # int32 (N, 4)
+
 
 @dataclass
 class _VehicleTrack:
     """Internal tracking record for a vehicle in a no-park zone."""
     bbox:       List[int]
-    first_seen: float = field(default_factory=time.monotonic)
+    first_seen: float                # frame timestamp (see BaseDetector.detect)
     alerted:    bool  = False
+    limit:      Optional[float] = None   # dwell limit of its zone(s) at the last tick
+
+
+@dataclass
+class _ZoneConfig:
+    """
+    Everything configure() can change, swapped as one object so a detection
+    tick never sees half of an update.
+    """
+    zones:       List[np.ndarray]      # polygons of rules, for ROI / drawing
+    rules:       ZoneRules
+    dwell:       float
+    confidence:  float
+    roi_mode:    str
+    roi_padding: int
+    roi_cache:   Dict[Tuple[int, int], List[Rect]] = field(default_factory=dict)   # (w, h) → rects
 
 
 def _iou(a: List[int], b: List[int]) -> float:
@@ -55,18 +112,55 @@ def _iou(a: List[int], b: List[int]) -> float:
     return inter / (area_a + area_b - inter)
 
 
-def _point_in_polygon(px: int, py: int, polygon: np.ndarray) -> bool:
-    return cv2.pointPolygonTest(polygon, (px, py), False) >= 0
+def _pad_rect(zone: np.ndarray, padding: int, width: int, height: int) -> Rect:
+    """
+    Padded bounding rectangle of a zone, clipped to the frame.
+    A vehicle whose ground point is in the zone extends upward out of it,
+    so the rectangle also grows by its own height above the zone.
+    """
+    x, y, w, h = cv2.boundingRect(zone)
+    return (
+        max(0, x - padding),
+        max(0, y - h - padding),
+        min(width,  x + w + padding),
+        min(height, y + h + padding),
+    )
+
+
+def _merge_rects(rects: List[Rect]) -> List[Rect]:
+    """Union overlapping rectangles until none overlap."""
+    merged = list(rects)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    merged[i] = (min(a[0], b[0]), min(a[1], b[1]),
+                                 max(a[2], b[2]), max(a[3], b[3]))
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
 
 
 class IllegalParkingDetector(BaseDetector):
     """
     Parameters
     ──────────
-    zones : list of polygons.  Each polygon is a list of (x, y) pixel
-            coordinates defining a no-parking region in the *frame*.
+    zones : list of polygons or zone rules (see zones.py).  A polygon is
+            a list of (x, y) pixel coordinates defining a no-parking
+            region in the *frame*.
             Example (entire lower-half of a 640×480 frame):
                 zones=[[(0,240),(640,240),(640,480),(0,480)]]
+    confidence  : minimum vehicle confidence.
+    roi_mode    : "off" | "crop" | "tiles" — see module docstring.
+    roi_padding : pixels added around each zone rectangle in ROI mode.
+    backend, threads, int8 : inference backend options, see backends.py.
+    cascade     : screen with a small model first, see cascade.py.
     """
 
     name = "illegal_parking"
@@ -74,67 +168,229 @@ class IllegalParkingDetector(BaseDetector):
     def __init__(
         self,
         model_path: str = "yolov8m.pt",
-        zones: Optional[List[List[Tuple[int, int]]]] = None,
+        zones: Optional[list] = None,
         dwell_seconds: float = DWELL_SECONDS,
+        confidence: float = CONFIDENCE_THRESHOLD,
+        roi_mode: str = ROI_MODE,
+        roi_padding: int = ROI_PADDING,
+        backend: Optional[str] = None,
+        threads: Optional[int] = None,
+        int8: Optional[bool] = None,
+        cascade: bool = INFERENCE_CASCADE,
     ):
-        self._model        = YOLO(model_path)
-        self._zones        = [
-            np.array(z, dtype=np.int32) for z in (zones or [])
-        ]
-        self._dwell        = dwell_seconds
+        if roi_mode not in ROI_MODES:
+            raise ValueError(f"roi_mode must be one of {ROI_MODES}, got {roi_mode!r}")
+
+        self._model_path   = model_path
+        self._backend_opts = (backend, threads, int8)
+        self._backend: Optional[InferenceBackend] = None   # set by load()
+        self._lite         = LiteModel(self._backend_opts)
+        self._cascade      = Cascade(self.name, self._backend_opts) if cascade else None
+        self._load_lock    = threading.Lock()
+        rules = ZoneRules.from_specs(zones or [], VEHICLE_LABELS)
+        self._cfg          = _ZoneConfig(
+            zones=rules.polygons,
+            rules=rules,
+            dwell=dwell_seconds,
+            confidence=confidence,
+            roi_mode=roi_mode,
+            roi_padding=roi_padding,
+        )
         self._tracks: Dict[int, _VehicleTrack] = {}   # track_id → track
         self._next_id      = 0
+        self._occupancy: Dict[str, int] = {}
+        self._vehicle_ids: Dict[int, Tuple[dict, np.ndarray]] = {}   # id(names) → (names, ids)
 
     # ─── Public API ───────────────────────────────────────────────────────
 
-    def detect(self, frame: np.ndarray, camera_id: str = "unknown") -> List[Detection]:
-        if not self._zones:
+    def load(self) -> None:
+        with self._load_lock:
+            if self._backend is None:
+                if self._cascade is not None:
+                    self._cascade.load()
+                    self._backend = model_pool.acquire(self._model_path, *self._backend_opts)
+                else:
+                    self._backend = create_backend(self._model_path, *self._backend_opts)
+
+    def close(self) -> None:
+        self._lite.close()
+        if self._cascade is not None:
+            self._cascade.close()
+        with self._load_lock:
+            if self._cascade is not None:
+                model_pool.release(self._backend)
+            elif self._backend is not None:
+                self._backend.close()           # a mosaic client hands back its scheduler
+            self._backend = None
+
+    def cascade_stats(self) -> Optional[dict]:
+        return self._cascade.stats() if self._cascade is not None else None
+
+    def occupancy(self) -> Optional[Dict[str, int]]:
+        return self._occupancy
+
+    @property
+    def ready(self) -> bool:
+        return self._backend is not None
+
+    def configure(
+        self,
+        zones: Optional[list] = None,
+        dwell_seconds: Optional[float] = None,
+        confidence: Optional[float] = None,
+        roi_mode: Optional[str] = None,
+    ):
+        """
+        Hot-swap zones / thresholds without reloading the model.
+        Existing tracks keep their first_seen, so dwell timers carry on;
+        vehicles no longer inside any zone are pruned on the next tick.
+        """
+        if roi_mode is not None and roi_mode not in ROI_MODES:
+            raise ValueError(f"roi_mode must be one of {ROI_MODES}, got {roi_mode!r}")
+        old   = self._cfg
+        rules = old.rules if zones is None else ZoneRules.from_specs(zones, VEHICLE_LABELS)
+        self._cfg = _ZoneConfig(
+            zones=rules.polygons,
+            rules=rules,
+            dwell=old.dwell if dwell_seconds is None else dwell_seconds,
+            confidence=old.confidence if confidence is None else confidence,
+            roi_mode=old.roi_mode if roi_mode is None else roi_mode,
+            roi_padding=old.roi_padding,
+        )
+
+    def set_lite(self, enabled: bool) -> None:
+        self._lite.set(enabled)
+
+    def detect(
+        self, frame: np.ndarray, camera_id: str = "unknown", ts: Optional[float] = None,
+    ) -> FrameDetections:
+        cfg = self._cfg
+        now = time.monotonic() if ts is None else ts
+        if not cfg.zones:
             log.warning("No no-parking zones configured — skipping.")
-            return []
+            return FrameDetections.empty(camera_id)
 
-        results   = self._model(frame, verbose=False)[0]
-        events: List[Detection] = []
-        current_bboxes: List[List[int]] = []
-
-        for box in results.boxes:
-            label = results.names[int(box.cls[0])]
-            conf  = float(box.conf[0])
-            if label.lower() not in VEHICLE_LABELS or conf < CONFIDENCE_THRESHOLD:
-                continue
+        if self._backend is None:
+            self.load()
+        return self._track(self._infer(frame, cfg, now), cfg, camera_id, now)
 
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            cx = (x1 + x2) // 2
-            cy = y2   # bottom-centre — ground contact point
+    def detect_batch(
+        self,
+        frames: List[np.ndarray],
+        camera_id: str = "unknown",
+        timestamps: Optional[List[Optional[float]]] = None,
+    ) -> List[FrameDetections]:
+        """
+        Inference for all frames (and ROI rects) in one batch; tracking then
+        runs frame by frame in order, exactly as detect() would.
+        """
+        cfg = self._cfg
+        if not cfg.zones or not frames:
+            return [FrameDetections.empty(camera_id) for _ in frames]
+        if self._backend is None:
+            self.load()
+        timestamps = timestamps or [None] * len(frames)
+        return [
+            self._track(raw, cfg, camera_id, time.monotonic() if ts is None else ts)
+            for raw, ts in zip(self._infer_batch(frames, cfg), timestamps)
+        ]
 
-            in_zone = any(
-                _point_in_polygon(cx, cy, z) for z in self._zones
+    def reset(self):
+        """Forget every track, e.g. at a discontinuity in recorded footage."""
+        self._tracks.clear()
+
+    def checkpoint(self) -> Optional[dict]:
+        """
+        Tracks with first_seen as wall-clock time (monotonic time does not
+        survive a restart), tagged with a hash of the zone rules and dwell
+        they were timed against.
+        """
+        offset = time.time() - time.monotonic()
+        return {
+            "zones":   self._cfg.rules.spec_hash(self._cfg.dwell),
+            "next_id": self._next_id,
+            "tracks":  [
+                {"id": tid, "bbox": t.bbox, "first_seen": t.first_seen + offset, "alerted": t.alerted}
+                for tid, t in list(self._tracks.items())
+            ],
+        }
+
+    def restore(self, state: dict) -> bool:
+        """Take over checkpointed tracks, unless the zone rules have changed since."""
+        if state.get("zones") != self._cfg.rules.spec_hash(self._cfg.dwell):
+            return False
+        offset = time.time() - time.monotonic()
+        self._tracks = {
+            int(t["id"]): _VehicleTrack(
+                bbox=[int(v) for v in t["bbox"]],
+                first_seen=t["first_seen"] - offset,
+                alerted=bool(t["alerted"]),
             )
-            if not in_zone:
+            for t in state.get("tracks", [])
+        }
+        self._next_id = max([int(state.get("next_id", 0))] + [tid + 1 for tid in self._tracks])
+        return True
+
+    # ─── Zone rendering helper (for annotated preview) ───────────────────
+
+    def draw_zones(self, frame: np.ndarray) -> np.ndarray:
+        overlay = frame.copy()
+        for zone in self._cfg.zones:
+            cv2.fillPoly(overlay, [zone], (0, 0, 200))
+        return cv2.addWeighted(overlay, 0.25, frame, 0.75, 0)
+
+    # ─── Internal helpers ────────────────────────────────────────────────
+
+    def _track(
+        self,
+        raw: _RawBoxes,
+        cfg: _ZoneConfig,
+        camera_id: str,
+        now: float,
+    ) -> FrameDetections:
+        """Zone test, track matching and dwell check for one frame's boxes."""
+        # Class, confidence and zone filtering over all boxes at once; only
+        # vehicles in an enforcing zone are tracked one by one.
+        rules = cfg.rules
+        keep  = np.isin(raw.cls, self._vehicles(raw.names)) & (raw.conf >= cfg.confidence)
+        idx   = np.flatnonzero(keep)
+        vehicle_boxes = raw.boxes[idx]
+        zone_bits = rules.lookup(
+            (vehicle_boxes[:, 0] + vehicle_boxes[:, 2]) // 2,
+            vehicle_boxes[:, 3],              # bottom-centre — ground contact point
+        )
+        enforced = zone_bits & rules.class_bits(raw.names)[raw.cls[idx]] & rules.active_bits()
+        self._publish_occupancy(rules.occupancy(zone_bits), camera_id)
+
+        labels, confs, boxes, meta = [], [], [], []
+        current_bboxes: List[List[int]] = []
+
+        for i, bbox, bits in zip(idx.tolist(), vehicle_boxes.tolist(), enforced.tolist()):
+            if not bits:
                 continue
 
-            bbox = [x1, y1, x2, y2]
             current_bboxes.append(bbox)
 
-            track_id = self._match_or_create(bbox)
+            track_id = self._match_or_create(bbox, now)
             track    = self._tracks[track_id]
-            dwell    = time.monotonic() - track.first_seen
+            dwell    = now - track.first_seen
+            limit, zone = rules.limit(bits, cfg.dwell)
+            track.limit = limit
 
-            if dwell >= self._dwell and not track.alerted:
+            if dwell >= limit and not track.alerted:
                 track.alerted = True
-                events.append(
-                    Detection(
-                        label="illegal_parking",
-                        confidence=conf,
-                        bbox=bbox,
-                        camera_id=camera_id,
-                        meta={
-                            "vehicle_label": label,
-                            "dwell_seconds": round(dwell, 1),
-                            "detector":      self.name,
-                            "track_id":      track_id,
-                        },
-                    )
-                )
+                label = raw.names[int(raw.cls[i])]
+                labels.append("illegal_parking")
+                confs.append(raw.conf[i])
+                boxes.append(bbox)
+                meta.append({
+                    "vehicle_label": label,
+                    "dwell_seconds": round(dwell, 1),
+                    "zone":          rules.names[zone],
+                    "dwell_limit":   limit,
+                    "detector":      self.name,
+                    "track_id":      track_id,
+                })
                 log.info(
                     "[%s] Illegal parking — %s dwell=%.1fs bbox=%s",
                     camera_id, label, dwell, bbox,
@@ -142,19 +398,110 @@ class IllegalParkingDetector(BaseDetector):
 
         # Prune stale tracks
         self._prune_tracks(current_bboxes)
-        return events
-
-    # ─── Zone rendering helper (for annotated preview) ───────────────────
-
-    def draw_zones(self, frame: np.ndarray) -> np.ndarray:
-        overlay = frame.copy()
-        for zone in self._zones:
-            cv2.fillPoly(overlay, [zone], (0, 0, 200))
-        return cv2.addWeighted(overlay, 0.25, frame, 0.75, 0)
-
-    # ─── Internal helpers ────────────────────────────────────────────────
-
-    def _match_or_create(self, bbox: List[int]) -> int:
+        if not labels:
+            return FrameDetections.empty(camera_id)
+        return FrameDetections(camera_id, labels, confs, boxes, meta)
+
+    def _publish_occupancy(self, occupancy: Dict[str, int], camera_id: str):
+        if occupancy != self._occupancy:
+            for zone, count in occupancy.items():
+                ZONE_OCCUPANCY.labels(camera_id, zone).set(count)
+            self._occupancy = occupancy
+
+    def _vehicles(self, names: Dict[int, str]) -> np.ndarray:
+        """Class ids in VEHICLE_LABELS for this model's names (cached)."""
+        cached_names, ids = self._vehicle_ids.get(id(names), (None, None))
+        if cached_names is not names:
+            ids = np.array(
+                [cid for cid, label in names.items() if label.lower() in VEHICLE_LABELS],
+                dtype=np.int64,
+            )
+            self._vehicle_ids[id(names)] = (names, ids)
+        return ids
+
+    def _infer(self, frame: np.ndarray, cfg: _ZoneConfig, now: float) -> _RawBoxes:
+        """Run the model (on the ROI rects, if enabled) → boxes in frame coords."""
+        rects   = self._roi_rects(frame, cfg)
+        heavy   = self._lite.pick(self._backend)
+        cascade = self._cascade
+        if cascade is not None:
+            raw = self._offset_boxes([
+                (cascade.screen(frame[y0:y1, x0:x1]), x0, y0) for x0, y0, x1, y1 in rects
+            ])
+            vehicles = np.isin(raw.cls, self._vehicles(raw.names))
+            if cascade.uncertain(raw.conf[vehicles]):
+                cascade.record("uncertain")
+            elif self._confirm_due(cfg, now):
+                cascade.record("confirm")
+            else:
+                cascade.record("resolved")
+                return raw
+        return self._offset_boxes([
+            (heavy.predict(frame[y0:y1, x0:x1]), x0, y0) for x0, y0, x1, y1 in rects
+        ])
+
+    def _confirm_due(self, cfg: _ZoneConfig, now: float) -> bool:
+        """True if a tracked vehicle is about to reach its zone's dwell limit."""
+        return any(
+            not t.alerted
+            and now - t.first_seen >= (cfg.dwell if t.limit is None else t.limit) - CASCADE_CONFIRM_SECONDS
+            for t in list(self._tracks.values())
+        )
+
+    def _infer_batch(self, frames: List[np.ndarray], cfg: _ZoneConfig) -> List[_RawBoxes]:
+        """_infer() for several frames with a single predict_batch() call."""
+        crops, owners = [], []
+        for i, frame in enumerate(frames):
+            for x0, y0, x1, y1 in self._roi_rects(frame, cfg):
+                crops.append(frame[y0:y1, x0:x1])
+                owners.append((i, x0, y0))
+        parts: List[list] = [[] for _ in frames]
+        for results, (i, x0, y0) in zip(self._backend.predict_batch(crops), owners):
+            parts[i].append((results, x0, y0))
+        return [self._offset_boxes(p) for p in parts]
+
+    @staticmethod
+    def _offset_boxes(parts: List[tuple]) -> _RawBoxes:
+        """Concatenate (results, x0, y0) of one frame's rects, shifted to frame coords."""
+        names: Dict[int, str] = {}
+        cls, conf, boxes = [], [], []
+        for results, x0, y0 in parts:
+            c, p, xyxy = box_arrays(results)
+            names = results.names
+            cls.append(c)
+            conf.append(p)
+            boxes.append(xyxy.astype(np.int32) + np.array([x0, y0, x0, y0], dtype=np.int32))
+        if not parts:
+            return _RawBoxes(names, np.empty(0, np.int64), np.empty(0, np.float32), np.empty((0, 4), np.int32))
+        return _RawBoxes(names, np.concatenate(cls), np.concatenate(conf), np.concatenate(boxes))
+
+    @staticmethod
+    def _roi_rects(frame: np.ndarray, cfg: _ZoneConfig) -> List[Rect]:
+        """Rectangles to run inference on; cached per frame size."""
+        height, width = frame.shape[:2]
+        full = [(0, 0, width, height)]
+        if cfg.roi_mode == "off":
+            return full
+
+        rects = cfg.roi_cache.get((width, height))
+        if rects is None:
+            rects = [_pad_rect(z, cfg.roi_padding, width, height) for z in cfg.zones]
+            if cfg.roi_mode == "crop":
+                rects = [(
+                    min(r[0] for r in rects), min(r[1] for r in rects),
+                    max(r[2] for r in rects), max(r[3] for r in rects),
+                )]
+            else:
+                rects = _merge_rects(rects)
+            rects = [r for r in rects if r[2] > r[0] and r[3] > r[1]]
+
+            area = sum((r[2] - r[0]) * (r[3] - r[1]) for r in rects)
+            if not rects or area >= ROI_MAX_COVERAGE * width * height:
+                rects = full
+            cfg.roi_cache[(width, height)] = rects
+        return rects
+
+    def _match_or_create(self, bbox: List[int], now: float) -> int:
         best_id:  Optional[int] = None
         best_iou: float         = IOU_MATCH_THRESHOLD
 
@@ -169,7 +516,7 @@ class IllegalParkingDetector(BaseDetector):
             return best_id
 
         new_id = self._next_id
-        self._tracks[new_id] = _VehicleTrack(bbox=bbox)
+        self._tracks[new_id] = _VehicleTrack(bbox=bbox, first_seen=now)
         self._next_id += 1
         return new_id
 
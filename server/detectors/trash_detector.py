@@ -4,19 +4,26 @@ Trash / Litter Detector (COCO-based proxy) with full object detection.
 Detects all objects from the YOLO model.
 For classes that are likely litter (see TRASH_PROXY_LABELS), the label
 is set to "trash_proxy" and the original class is stored in meta.
-For all other classes, the original COCO label is used.
+Classes in TRASH_IGNORED_LABELS are dropped; for all other classes the
+original COCO label is used.
+
+The decision is made once per class id: a lookup table built from the
+model's names maps every id to its category, output label and meta, and
+each frame's boxes are filtered and relabelled with array indexing.
 """
 
 from __future__ import annotations
 
 import logging
-from typing import List
+import os
+import threading
+from typing import Dict, List, Optional
 
 import numpy as np
-import torch
-from ultralytics import YOLO
 
-from .base import BaseDetector, Detection
+from .backends import InferenceBackend, LiteModel, box_arrays, create_backend, model_pool
+from .base import BaseDetector, FrameDetections
+from .cascade import INFERENCE_CASCADE, Cascade
 
 log = logging.getLogger(__name__)
 
@@ -41,94 +48,199 @@ TRASH_PROXY_LABELS = {
     "spoon",
 }
 
+# COCO classes never reported by this detector (comma-separated env)
+TRASH_IGNORED_LABELS = frozenset(
+    s.strip().lower() for s in os.getenv("TRASH_IGNORED_LABELS", "").split(",") if s.strip()
+)
+
 # Confidence threshold (adjust as needed)
 CONFIDENCE_THRESHOLD = 0.35
 
+# Lookup-table categories
+DROP, KEEP, PROXY = 0, 1, 2
+
+
+class _ClassTable:
+    """Per-class-id category, output label and meta for one names mapping."""
+
+    __slots__ = ("names", "category", "labels", "meta")
+
+    def __init__(self, names: Dict[int, str], detector: str):
+        size = max(names, default=-1) + 1
+        self.names    = names
+        self.category = np.full(size, DROP, dtype=np.int8)
+        self.labels   = np.empty(size, dtype=object)
+        self.meta     = np.empty(size, dtype=object)
+        shared = {"detector": detector}
+        for class_id, label in names.items():
+            key = label.lower()
+            if key in TRASH_IGNORED_LABELS:
+                continue
+            if key in TRASH_PROXY_LABELS:
+                self.category[class_id] = PROXY
+                self.labels[class_id]   = "trash_proxy"
+                self.meta[class_id]     = {"original_label": label, "detector": detector}
+            else:
+                self.category[class_id] = KEEP
+                self.labels[class_id]   = label
+                self.meta[class_id]     = shared
+
 
 class TrashDetector(BaseDetector):
     name = "trash"
 
-    def __init__(self, model_path: str = "yolov8l.pt"):
-        log.info("Loading YOLO model: %s", model_path)
-
-        try:
-            self._model = YOLO(model_path)
-        except Exception as e:
-            log.exception("Failed to load YOLO model")
-            raise
-
-        if torch.cuda.is_available():
-            self._model.to("cuda")
-            self._device = 0
-            log.info("TrashDetector using GPU: %s",
-                     torch.cuda.get_device_name(0))
-        else:
-            self._device = "cpu"
-            log.warning("TrashDetector using CPU")
-
-    def detect(self, frame: np.ndarray, camera_id: str = "unknown") -> List[Detection]:
+    def __init__(
+        self,
+        model_path: str = "yolov8l.pt",
+        confidence: float = CONFIDENCE_THRESHOLD,
+        backend: Optional[str] = None,
+        threads: Optional[int] = None,
+        int8: Optional[bool] = None,
+        cascade: bool = INFERENCE_CASCADE,
+    ):
+        """
+        backend/threads/int8: see detectors/backends.py (None = env defaults).
+        cascade: screen frames with a small model first (detectors/cascade.py).
+        The model is not loaded until load() (or the first detect()).
+        """
+        self._model_path   = model_path
+        self._confidence   = confidence
+        self._backend_opts = (backend, threads, int8)
+        self._backend: Optional[InferenceBackend] = None
+        self._lite         = LiteModel(self._backend_opts)
+        self._cascade      = Cascade(self.name, self._backend_opts) if cascade else None
+        self._load_lock    = threading.Lock()
+        self._tables: Dict[int, _ClassTable] = {}      # id(names) → table
+
+    def load(self) -> None:
+        with self._load_lock:
+            if self._backend is not None:
+                return
+            try:
+                if self._cascade is not None:
+                    self._cascade.load()
+                    self._backend = model_pool.acquire(self._model_path, *self._backend_opts)
+                else:
+                    self._backend = create_backend(self._model_path, *self._backend_opts)
+            except Exception as e:
+                log.exception("Failed to load YOLO model")
+                raise
+            log.info("TrashDetector backend: %s", self._backend.name)
+
+    def close(self) -> None:
+        self._lite.close()
+        if self._cascade is not None:
+            self._cascade.close()
+        with self._load_lock:
+            if self._cascade is not None:
+                model_pool.release(self._backend)
+            elif self._backend is not None:
+                self._backend.close()           # a mosaic client hands back its scheduler
+            self._backend = None
+
+    def cascade_stats(self) -> Optional[dict]:
+        return self._cascade.stats() if self._cascade is not None else None
+
+    @property
+    def ready(self) -> bool:
+        return self._backend is not None
+
+    def configure(self, confidence: Optional[float] = None):
+        """Hot-swap the confidence threshold without reloading the model."""
+        if confidence is not None:
+            self._confidence = confidence
+
+    def set_lite(self, enabled: bool) -> None:
+        self._lite.set(enabled)
+
+    def detect(
+        self, frame: np.ndarray, camera_id: str = "unknown", ts: Optional[float] = None,
+    ) -> FrameDetections:
         if frame is None:
-            return []
+            return FrameDetections.empty(camera_id)
+
+        if self._backend is None:
+            self.load()
 
         if frame.dtype != np.uint8:
             frame = np.clip(frame, 0, 255).astype(np.uint8)
 
         try:
-            results = self._model.predict(
-                source=frame,
-                device=self._device,
-                conf=CONFIDENCE_THRESHOLD,
-                verbose=False,
-            )[0]
+            results = self._predict(frame)
         except Exception as e:
             log.exception("YOLO inference failed")
-            return []
-
-        detections: List[Detection] = []
-
-        if results.boxes is None:
-            return []
-
-        for box in results.boxes:
-            class_id = int(box.cls[0])
-            label = results.names[class_id]
-            conf = float(box.conf[0])
-
-            log.debug(
-                "[%s] RAW DETECTION → %s (%.2f)",
-                camera_id,
-                label,
-                conf,
-            )
-
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-
-            # Determine final label:
-            # - If the class is a trash proxy, mark it as "trash_proxy"
-            # - Otherwise keep the original COCO class name
-            if label.lower() in TRASH_PROXY_LABELS:
-                detection_label = "trash_proxy"
-                meta = {
-                    "original_label": label,
-                    "detector": self.name,
-                }
-            else:
-                detection_label = label
-                meta = {
-                    "detector": self.name,
-                }
-
-            detections.append(
-                Detection(
-                    label=detection_label,
-                    confidence=conf,
-                    bbox=[x1, y1, x2, y2],
-                    camera_id=camera_id,
-                    meta=meta,
-                )
-            )
+            return FrameDetections.empty(camera_id)
 
+        detections = self._to_detections(results, camera_id)
         if detections:
             log.info("[%s] Detections: %d", camera_id, len(detections))
 
-        return detections
\ No newline at end of file
+        return detections
+
+    def detect_batch(
+        self,
+        frames: List[np.ndarray],
+        camera_id: str = "unknown",
+        timestamps: Optional[List[Optional[float]]] = None,
+    ) -> List[FrameDetections]:
+        """One batched forward pass over `frames` (offline jobs)."""
+        if self._backend is None:
+            self.load()
+        frames = [
+            f if f.dtype == np.uint8 else np.clip(f, 0, 255).astype(np.uint8)
+            for f in frames
+        ]
+        try:
+            results = self._backend.predict_batch(frames, conf=self._confidence)
+        except Exception:
+            log.exception("YOLO batch inference failed")
+            return [FrameDetections.empty(camera_id) for _ in frames]
+        return [self._to_detections(r, camera_id) for r in results]
+
+    def _predict(self, frame: np.ndarray):
+        """Model output for one frame — the screener's, unless it is unsure."""
+        heavy   = self._lite.pick(self._backend)
+        cascade = self._cascade
+        if cascade is None:
+            return heavy.predict(frame, conf=self._confidence)
+
+        screened = cascade.screen(frame)
+        cls, conf, _ = box_arrays(screened)
+        table = self._class_table(screened.names)
+        known = (cls >= 0) & (cls < len(table.category))
+        candidates = known & (table.category[np.where(known, cls, 0)] != DROP)
+        if cascade.uncertain(conf[candidates]):
+            cascade.record("uncertain")
+            return heavy.predict(frame, conf=self._confidence)
+        cascade.record("resolved")
+        return screened
+
+    def _class_table(self, names: Dict[int, str]) -> _ClassTable:
+        table = self._tables.get(id(names))
+        if table is None or table.names is not names:
+            table = self._tables[id(names)] = _ClassTable(names, self.name)
+        return table
+
+    def _to_detections(self, results, camera_id: str) -> FrameDetections:
+        cls, conf, xyxy = box_arrays(results)
+        if not len(cls):
+            return FrameDetections.empty(camera_id)
+        table = self._class_table(results.names)
+
+        in_table = (cls >= 0) & (cls < len(table.category))
+        ids      = np.where(in_table, cls, 0)
+        keep     = in_table & (table.category[ids] != DROP) & (conf >= self._confidence)
+        ids      = ids[keep]
+
+        if log.isEnabledFor(logging.DEBUG):
+            for class_id, score in zip(cls.tolist(), conf.tolist()):
+                log.debug("[%s] RAW DETECTION → %s (%.2f)",
+                          camera_id, results.names.get(class_id, class_id), score)
+
+        return FrameDetections(
+            camera_id,
+            table.labels[ids].tolist(),
+            conf[keep],
+            xyxy[keep],
+            table.meta[ids].tolist(),
+        )
@@ -0,0 +1,246 @@
+"""
+Zone rules
+──────────
+A camera's parking zones, compiled once into a lookup structure the
+parking detector evaluates per detection tick.  Each entry of
+`parking_zones` is either a bare polygon (as before) or a rule:
+
+    {
+      "name":          "loading-bay",
+      "polygon":       [[100, 300], [540, 300], [540, 480], [100, 480]],
+      "dwell_seconds": 900,                       # default: the camera's
+      "classes":       ["truck"],                 # default: every vehicle
+      "schedule":      [{"days": ["mon", "tue", "wed", "thu", "fri"],
+                         "start": "08:00", "end": "18:00"}]   # default: always
+    }
+
+Times are HH:MM, 00:00–23:59.  Windows whose end is before their start run
+past midnight (end "00:00" = until midnight); start == end is the whole day.
+Schedules use the server's local wall clock.
+
+Compiled form:
+
+  * raster  — every zone filled into one integer image of the zones' extent;
+    bit i of a pixel is set when the pixel is in zone i.  All boxes of a
+    tick are looked up with one fancy-indexing read, instead of a polygon
+    test per box and zone.
+  * class bits — per class id of the model, the zones that enforce it.
+  * active bits — zones whose schedule covers now; computed once per tick.
+
+A box is enforced in (zone bits & class bits & active bits); its dwell limit
+is the smallest limit among those zones.  Occupancy (vehicles per zone,
+schedule or not) falls out of the same zone bits.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+MAX_ZONES = 64
+
+Window = Tuple[Optional[FrozenSet[int]], int, int]     # weekdays (None = all), start, end minute
+
+
+class Zone:
+    __slots__ = ("name", "polygon", "dwell", "classes", "windows")
+
+    def __init__(
+        self,
+        name: str,
+        polygon: np.ndarray,
+        dwell: Optional[float] = None,
+        classes: Optional[FrozenSet[str]] = None,
+        windows: Optional[List[Window]] = None,
+    ):
+        self.name    = name
+        self.polygon = polygon
+        self.dwell   = dwell                 # None → the detector's dwell_seconds
+        self.classes = classes               # None → every vehicle class
+        self.windows = windows or []         # empty → always active
+
+    def active(self, now: datetime) -> bool:
+        if not self.windows:
+            return True
+        minute = now.hour * 60 + now.minute
+        day    = now.weekday()
+        for days, start, end in self.windows:
+            if start == end:                 # whole day
+                if days is None or day in days:
+                    return True
+            elif start < end:
+                if (days is None or day in days) and start <= minute < end:
+                    return True
+            else:                            # past midnight: the tail belongs to the previous day
+                if (days is None or day in days) and minute >= start:
+                    return True
+                if (days is None or (day - 1) % 7 in days) and minute < end:
+                    return True
+        return False
+
+
+def parse_zone(spec, index: int, vehicle_labels: Sequence[str]) -> Zone:
+    """One `parking_zones` entry → Zone; raises ValueError when malformed."""
+    if not isinstance(spec, dict):
+        spec = {"polygon": spec}
+    unknown = set(spec) - {"name", "polygon", "dwell_seconds", "classes", "schedule"}
+    if unknown:
+        raise ValueError(f"zone {index}: unknown fields {', '.join(sorted(unknown))}")
+
+    name    = str(spec.get("name") or f"zone-{index}")
+    polygon = spec.get("polygon")
+    if (not isinstance(polygon, (list, tuple)) or len(polygon) < 3
+            or any(not isinstance(p, (list, tuple)) or len(p) != 2 for p in polygon)):
+        raise ValueError(f"zone {name}: polygon needs at least 3 [x, y] points")
+    try:
+        polygon = np.array(polygon, dtype=np.int32)
+    except (TypeError, ValueError):
+        raise ValueError(f"zone {name}: polygon points must be numbers") from None
+    if (polygon < 0).any():
+        raise ValueError(f"zone {name}: polygon points must be non-negative pixels")
+
+    dwell = spec.get("dwell_seconds")
+    if dwell is not None and (not isinstance(dwell, (int, float)) or dwell < 0):
+        raise ValueError(f"zone {name}: dwell_seconds must be a non-negative number")
+
+    classes = spec.get("classes")
+    if classes is not None:
+        if not isinstance(classes, list) or not classes:
+            raise ValueError(f"zone {name}: classes must be a non-empty list")
+        classes = frozenset(str(c).lower() for c in classes)
+        bad = classes - set(vehicle_labels)
+        if bad:
+            raise ValueError(f"zone {name}: classes must be among {', '.join(sorted(vehicle_labels))}")
+
+    return Zone(name, polygon, dwell, classes, _parse_schedule(spec.get("schedule"), name))
+
+
+def _parse_schedule(schedule, name: str) -> List[Window]:
+    if schedule is None:
+        return []
+    if not isinstance(schedule, list):
+        raise ValueError(f"zone {name}: schedule must be a list of windows")
+    windows = []
+    for w in schedule:
+        if not isinstance(w, dict):
+            raise ValueError(f"zone {name}: schedule windows need start and end")
+        days = w.get("days")
+        if days is not None:
+            if not isinstance(days, list) or any(str(d).lower()[:3] not in DAYS for d in days):
+                raise ValueError(f"zone {name}: days must be names like {', '.join(DAYS)}")
+            days = frozenset(DAYS.index(str(d).lower()[:3]) for d in days)
+        windows.append((days, _minute(w.get("start"), name), _minute(w.get("end"), name)))
+    return windows
+
+
+def _minute(value, name: str) -> int:
+    try:
+        hours, minutes = (int(part) for part in str(value).split(":"))
+    except ValueError:
+        raise ValueError(f"zone {name}: times must be HH:MM, got {value!r}") from None
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+        raise ValueError(f"zone {name}: time out of range (00:00–23:59): {value!r}")
+    return hours * 60 + minutes
+
+
+class ZoneRules:
+    """The compiled zones of one camera; immutable once built."""
+
+    def __init__(self, zones: List[Zone]):
+        if len(zones) > MAX_ZONES:
+            raise ValueError(f"at most {MAX_ZONES} zones per camera")
+        self.zones    = zones
+        self.polygons = [z.polygon for z in zones]
+        self.names    = [z.name for z in zones]
+        self._dwell   = np.array([np.nan if z.dwell is None else z.dwell for z in zones], dtype=np.float64)
+        self._bits    = np.uint64(1) << np.arange(len(zones), dtype=np.uint64)
+        self.raster   = self._rasterize()
+        self._class_bits: Dict[int, Tuple[dict, np.ndarray]] = {}   # id(names) → (names, bits)
+        self._always  = all(not z.windows for z in zones)
+
+    @classmethod
+    def from_specs(cls, specs: list, vehicle_labels: Sequence[str]) -> "ZoneRules":
+        return cls([parse_zone(s, i, vehicle_labels) for i, s in enumerate(specs)])
+
+    def spec_hash(self, default_dwell: float) -> str:
+        """
+        Identifies the compiled zones — polygons, dwell limits, classes and
+        windows — under the camera's default dwell, e.g. to validate
+        checkpoints: tracks timed against other rules must not be taken over.
+        """
+        spec = [
+            [
+                z.polygon.tolist(),
+                z.dwell,
+                sorted(z.classes) if z.classes is not None else None,
+                [[sorted(days) if days is not None else None, start, end] for days, start, end in z.windows],
+            ]
+            for z in self.zones
+        ]
+        return hashlib.sha256(json.dumps([default_dwell, spec]).encode()).hexdigest()[:16]
+
+    def _rasterize(self) -> np.ndarray:
+        n = len(self.zones)
+        dtype = np.uint8 if n <= 8 else np.uint16 if n <= 16 else np.uint32 if n <= 32 else np.uint64
+        if not n:
+            return np.zeros((1, 1), dtype)
+        height = max(int(p[:, 1].max()) for p in self.polygons) + 1
+        width  = max(int(p[:, 0].max()) for p in self.polygons) + 1
+        raster = np.zeros((height, width), dtype)
+        layer  = np.zeros((height, width), np.uint8)
+        for i, polygon in enumerate(self.polygons):
+            layer[:] = 0
+            cv2.fillPoly(layer, [polygon], 1)
+            raster |= layer.astype(dtype) << dtype(i)
+        return raster
+
+    # ─── Per-tick evaluation ─────────────────────────────────────────────
+
+    def lookup(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Zone bits (uint64) of each point; points off the raster are in no zone."""
+        h, w   = self.raster.shape
+        inside = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+        bits   = np.zeros(len(x), np.uint64)
+        bits[inside] = self.raster[y[inside], x[inside]]
+        return bits
+
+    def active_bits(self, now: Optional[datetime] = None) -> np.uint64:
+        """Zones whose schedule covers `now` (default: local time now)."""
+        if self._always:
+            return np.uint64(self._bits.sum())
+        now = now or datetime.now()
+        return np.uint64(sum(int(b) for z, b in zip(self.zones, self._bits) if z.active(now)))
+
+    def class_bits(self, names: Dict[int, str]) -> np.ndarray:
+        """Per class id, the zones enforcing it (cached per names mapping)."""
+        cached_names, bits = self._class_bits.get(id(names), (None, None))
+        if cached_names is not names:
+            bits = np.zeros(max(names, default=-1) + 1, np.uint64)
+            for class_id, label in names.items():
+                label = label.lower()
+                bits[class_id] = sum(
+                    int(b) for z, b in zip(self.zones, self._bits)
+                    if z.classes is None or label in z.classes
+                )
+            self._class_bits[id(names)] = (names, bits)
+        return bits
+
+    def limit(self, bits: int, default: float) -> Tuple[float, int]:
+        """(dwell limit, zone index) — the strictest zone among `bits`."""
+        idx   = np.flatnonzero(np.uint64(bits) & self._bits)
+        dwell = np.where(np.isnan(self._dwell[idx]), default, self._dwell[idx])
+        best  = int(np.argmin(dwell))
+        return float(dwell[best]), int(idx[best])
+
+    def occupancy(self, bits: np.ndarray) -> Dict[str, int]:
+        """Vehicles per zone name, from the zone bits of this tick's vehicles."""
+        if not len(self.zones):
+            return {}
+        counts = ((bits[:, None] & self._bits[None, :]) != 0).sum(axis=0)
+        return dict(zip(self.names, counts.tolist()))
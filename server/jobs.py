@@ -0,0 +1,519 @@
+"""
+Offline analysis jobs
+─────────────────────
+Runs the camera detectors over archived footage — after an incident, or to
+backfill a new camera — much faster than the live loop:
+
+    python -m server.jobs footage/2025-03-01/ --camera pi-cam-01 --workers 4
+    python -m server.jobs --job-id 3f2a9c1b7d4e            # resume after a crash
+
+or POST /api/jobs (inputs relative to JOB_INPUT_ROOT).
+
+Each file is split into chunks of JOB_CHUNK_SECONDS that run in a process
+pool, one set of models per worker.  In a chunk every Nth frame is decoded
+(the rest are only grabbed) and inferred in batches of JOB_BATCH_SIZE via
+detect_batch(); detections are written with log_detections_bulk().  Every
+finished chunk is recorded in a checkpoint under JOB_CHECKPOINT_DIR, so a
+job started again with the same id only runs what is left.
+
+Parking dwell needs continuity across chunk boundaries: each chunk starts
+`dwell` seconds (plus two samples) early.  Vehicles that straddle the
+boundary are still caught, and events raised inside that warm-up belong
+to the previous chunk and are dropped.
+
+Event timestamps are recording time: the file's modification time minus
+its duration, plus the frame offset.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import multiprocessing as mp
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import cv2
+
+from .processor import DETECTION_INTERVAL, FRAME_RESIZE
+
+log = logging.getLogger(__name__)
+
+JOB_WORKERS        = int(os.getenv("JOB_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+JOB_BATCH_SIZE     = int(os.getenv("JOB_BATCH_SIZE", "8"))
+JOB_CHUNK_SECONDS  = float(os.getenv("JOB_CHUNK_SECONDS", "300"))
+JOB_CHECKPOINT_DIR = os.getenv("JOB_CHECKPOINT_DIR", "jobs")
+JOB_INPUT_ROOT     = os.getenv("JOB_INPUT_ROOT", "footage")
+
+# Job ids name checkpoint files: no separators, no dots.
+JOB_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mkv", ".mov", ".m4v", ".mjpeg", ".mjpg", ".h264", ".ts"}
+DEFAULT_DETECTORS = ["trash", "illegal_parking"]
+
+
+@dataclass
+class JobSpec:
+    inputs:        List[str]                  # files and/or directories
+    camera:        dict                       # CameraConfig.to_dict() of the source camera
+    every:         int = DETECTION_INTERVAL   # analyze every Nth frame
+    batch_size:    int = JOB_BATCH_SIZE
+    chunk_seconds: float = JOB_CHUNK_SECONDS
+    workers:       int = JOB_WORKERS
+    detectors:     List[str] = field(default_factory=lambda: list(DEFAULT_DETECTORS))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "JobSpec":
+        """Build and validate a spec; raises ValueError on bad input."""
+        from .registry import CameraConfig
+
+        known   = set(cls.__dataclass_fields__)
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        spec = cls(**data)
+        if not spec.inputs or not isinstance(spec.inputs, list):
+            raise ValueError("inputs must be a non-empty list of paths")
+        CameraConfig.from_dict(spec.camera)
+        for name in ("every", "batch_size", "workers"):
+            if not isinstance(getattr(spec, name), int) or getattr(spec, name) < 1:
+                raise ValueError(f"{name} must be a positive integer")
+        if spec.workers > (os.cpu_count() or 1):
+            raise ValueError(f"workers must be at most {os.cpu_count() or 1} (CPU count)")
+        if not isinstance(spec.chunk_seconds, (int, float)) or spec.chunk_seconds <= 0:
+            raise ValueError("chunk_seconds must be a positive number")
+        bad = set(spec.detectors) - set(DEFAULT_DETECTORS)
+        if bad or not spec.detectors:
+            raise ValueError(f"detectors must be a subset of {', '.join(DEFAULT_DETECTORS)}")
+        return spec
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# ─── Planning ────────────────────────────────────────────────────────────────
+
+def expand_inputs(inputs: List[str]) -> List[str]:
+    """Files as given, directories walked for video files; sorted, no duplicates."""
+    files: List[str] = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, n) for n in names
+                    if os.path.splitext(n)[1].lower() in VIDEO_EXTENSIONS
+                )
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise ValueError(f"No such file or directory: {path}")
+    return sorted(set(os.path.abspath(f) for f in files))
+
+
+def plan_chunks(files: List[str], chunk_seconds: float, warmup_seconds: float, every: int) -> List[dict]:
+    """
+    Split every file into frame-range chunks (see module docstring).
+    `warmup_seconds` is the dwell of the parking detector, 0 without it.
+    """
+    chunks = []
+    for path in files:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            log.error("Skipping unreadable video %s", path)
+            continue
+        fps   = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        cap.release()
+
+        started = os.path.getmtime(path) - (count / fps if count else 0)
+        size    = max(every, int(chunk_seconds * fps) // every * every)
+        warmup  = 0
+        if warmup_seconds > 0:                  # + two samples of slack
+            warmup = (int(math.ceil(warmup_seconds * fps / every)) + 2) * every
+        bounds  = range(0, count, size) if count > 0 else [0]
+        for start in bounds:
+            end = min(start + size, count) if count > 0 else None
+            chunks.append({
+                "key":          f"{path}@{start}",
+                "path":         path,
+                "start":        start,
+                "end":          end,
+                "warmup_start": max(0, start - warmup),
+                "fps":          fps,
+                "file_start":   started,
+            })
+    return chunks
+
+
+# ─── Worker process ──────────────────────────────────────────────────────────
+
+_detectors: list = []
+_camera_id = "offline"
+
+
+def _init_worker(camera: dict, names: List[str]):
+    # Spawned workers start from a clean interpreter: .env and logging again.
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s [%(levelname)s] job-worker-{os.getpid()} %(name)s - %(message)s",
+    )
+    from .registry import CameraConfig, build_detectors
+
+    global _detectors, _camera_id
+    cfg        = CameraConfig.from_dict(camera)
+    _camera_id = cfg.camera_id
+    _detectors = [d for d in build_detectors(cfg) if d.name in names]
+    for det in _detectors:
+        det.load()
+
+
+def _run_chunk(chunk: dict, every: int, batch_size: int, job_id: str) -> dict:
+    started = time.perf_counter()
+    for det in _detectors:
+        if hasattr(det, "reset"):       # tracks must not leak between chunks
+            det.reset()
+
+    cap = cv2.VideoCapture(chunk["path"])
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open {chunk['path']}")
+    index = chunk["warmup_start"]
+    if index:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+    counts  = {"frames_read": 0, "frames_analyzed": 0, "detections": 0}
+    pending = []                        # (frame index, media time, frame)
+    try:
+        while chunk["end"] is None or index < chunk["end"]:
+            if index % every:
+                if not cap.grab():
+                    break
+            else:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                if (frame.shape[1], frame.shape[0]) != FRAME_RESIZE:
+                    frame = cv2.resize(frame, FRAME_RESIZE)
+                pending.append((index, index / chunk["fps"], frame))
+                if len(pending) >= batch_size:
+                    counts["detections"] += _flush(pending, chunk, job_id)
+                    counts["frames_analyzed"] += len(pending)
+                    pending = []
+            if index >= chunk["start"]:
+                counts["frames_read"] += 1
+            index += 1
+        if pending:
+            counts["detections"] += _flush(pending, chunk, job_id)
+            counts["frames_analyzed"] += len(pending)
+    finally:
+        cap.release()
+
+    counts["seconds"] = round(time.perf_counter() - started, 3)
+    return counts
+
+
+def _flush(pending: list, chunk: dict, job_id: str) -> int:
+    from .db.mongo import log_detections_bulk
+
+    found = []
+    for det in _detectors:
+        # Stateless detectors skip the warm-up frames; trackers need them.
+        stateful = hasattr(det, "reset")
+        batch    = pending if stateful else [p for p in pending if p[0] >= chunk["start"]]
+        if not batch:
+            continue
+        results = det.detect_batch(
+            [p[2] for p in batch], camera_id=_camera_id, timestamps=[p[1] for p in batch],
+        )
+        for (index, media_t, _), events in zip(batch, results):
+            if index < chunk["start"]:  # raised during warm-up: previous chunk's event
+                continue
+            for ev in events:
+                ev.timestamp = datetime.utcfromtimestamp(chunk["file_start"] + media_t)
+                ev.meta.update({"source": chunk["path"], "offset": round(media_t, 2)})
+                found.append(ev)
+    if not found:
+        return 0
+    return log_detections_bulk(found, extra={"job_id": job_id})
+
+
+# ─── Job (parent side) ───────────────────────────────────────────────────────
+
+class Job:
+    """One offline run; `run()` blocks, `status()` / `cancel()` are thread-safe."""
+
+    def __init__(self, spec: JobSpec, job_id: Optional[str] = None):
+        if job_id is not None:
+            _checkpoint_path(job_id)    # validates
+        self.id     = job_id or uuid.uuid4().hex[:12]
+        self.spec   = spec
+        self.state  = "queued"
+        self.error: Optional[str] = None
+        self._done: Dict[str, dict] = {}
+        self._total      = 0
+        self._failed     = 0
+        self._run_frames = 0            # analyzed frames in this run (throughput)
+        self._run_video  = 0.0          # seconds of video covered in this run
+        self._resumed    = 0            # chunks already done when this run started
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._cancel  = threading.Event()
+        self._futures: list = []
+        self._lock    = threading.Lock()
+
+    @property
+    def checkpoint_path(self) -> str:
+        return _checkpoint_path(self.id)
+
+    @classmethod
+    def resume(cls, job_id: str) -> "Job":
+        """Rebuild a job from its checkpoint (raises FileNotFoundError / ValueError)."""
+        with open(_checkpoint_path(job_id)) as fh:
+            data = json.load(fh)
+        return cls(JobSpec.from_dict(data["spec"]), job_id)
+
+    def run(self):
+        self.state    = "running"
+        self._started = time.monotonic()
+        try:
+            self._run()
+        except Exception as exc:
+            log.exception("[job %s] failed", self.id)
+            self.state, self.error = "failed", str(exc)
+        else:
+            if self._cancel.is_set():
+                self.state = "cancelled"
+            elif self._failed:
+                self.state = "failed"
+                self.error = f"{self._failed} chunk(s) failed — run the job again to retry them"
+            else:
+                self.state = "done"
+        self._finished = time.monotonic()
+        log.info("[job %s] %s — %s", self.id, self.state, self._summary())
+
+    def cancel(self):
+        self._cancel.set()
+        for future in list(self._futures):
+            future.cancel()
+
+    def status(self) -> dict:
+        with self._lock:
+            done = list(self._done.values())
+        end     = self._finished or time.monotonic()
+        elapsed = end - self._started if self._started else 0.0
+        fps     = self._run_frames / elapsed if elapsed else 0.0
+        left    = self._total - len(done)
+        per     = elapsed / max(1, len(done) - self._resumed) if self._started else 0.0
+        return {
+            "job_id":          self.id,
+            "state":           self.state,
+            "error":           self.error,
+            "camera_id":       self.spec.camera.get("camera_id"),
+            "inputs":          self.spec.inputs,
+            "chunks_total":    self._total,
+            "chunks_done":     len(done),
+            "chunks_failed":   self._failed,
+            "progress":        round(len(done) / self._total, 4) if self._total else 0.0,
+            "frames_read":     sum(d["frames_read"] for d in done),
+            "frames_analyzed": sum(d["frames_analyzed"] for d in done),
+            "detections":      sum(d["detections"] for d in done),
+            "elapsed_seconds": round(elapsed, 1),
+            "fps":             round(fps, 2),                     # analyzed frames / s
+            "realtime_factor": round(self._run_video / elapsed, 2) if elapsed else 0.0,
+            "eta_seconds":     round(per * left, 1) if self.state == "running" and left else None,
+            "checkpoint":      self.checkpoint_path,
+        }
+
+    # ─── Internal helpers ────────────────────────────────────────────────
+
+    def _run(self):
+        from .registry import CameraConfig
+
+        spec   = self.spec
+        dwell  = 0.0
+        if "illegal_parking" in spec.detectors:
+            dwell = CameraConfig.from_dict(spec.camera).effective()["dwell_seconds"]
+        files  = expand_inputs(spec.inputs)
+        chunks = plan_chunks(files, spec.chunk_seconds, dwell, spec.every)
+        self._total = len(chunks)
+        self._load_checkpoint({c["key"] for c in chunks})
+        self._resumed = len(self._done)
+        todo = [c for c in chunks if c["key"] not in self._done]
+        log.info(
+            "[job %s] %d file(s), %d chunk(s), %d to do, %d worker(s)",
+            self.id, len(files), len(chunks), len(todo), spec.workers,
+        )
+        if not todo:
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(spec.workers, len(todo)),
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(spec.camera, spec.detectors),
+        ) as pool:
+            futures = {
+                pool.submit(_run_chunk, c, spec.every, spec.batch_size, self.id): c for c in todo
+            }
+            self._futures = list(futures)
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    result = future.result()
+                except CancelledError:
+                    continue
+                except Exception:
+                    log.exception("[job %s] chunk %s failed", self.id, chunk["key"])
+                    self._failed += 1
+                    continue
+                with self._lock:
+                    self._done[chunk["key"]] = result
+                self._run_frames += result["frames_analyzed"]
+                self._run_video  += result["frames_read"] / chunk["fps"]
+                self._save_checkpoint()
+                log.info("[job %s] %s", self.id, self._summary())
+
+    def _summary(self) -> str:
+        s = self.status()
+        return (
+            f"{s['chunks_done']}/{s['chunks_total']} chunks, {s['frames_analyzed']} frames analyzed, "
+            f"{s['detections']} detections, {s['fps']} fps, {s['realtime_factor']}x real time"
+        )
+
+    def _load_checkpoint(self, keys: set):
+        try:
+            with open(self.checkpoint_path) as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return
+        self._done = {k: v for k, v in data.get("done", {}).items() if k in keys}
+        if self._done:
+            log.info("[job %s] resuming: %d chunk(s) already done", self.id, len(self._done))
+
+    def _save_checkpoint(self):
+        os.makedirs(JOB_CHECKPOINT_DIR, exist_ok=True)
+        with self._lock:
+            data = {
+                "job_id":  self.id,
+                "spec":    self.spec.to_dict(),
+                "done":    dict(self._done),
+                "updated": datetime.utcnow().isoformat(timespec="seconds"),
+            }
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump(data, fh)
+        os.replace(tmp, self.checkpoint_path)       # never leave a torn checkpoint
+
+
+class JobManager:
+    """Runs jobs in background threads for the API."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def start(self, spec: Optional[JobSpec] = None, job_id: Optional[str] = None) -> Job:
+        """Start a new job, or resume `job_id` (its checkpointed spec if `spec` is None)."""
+        with self._lock:
+            running = self._jobs.get(job_id) if job_id else None
+            if running is not None and running.state in ("queued", "running"):
+                raise RuntimeError(f"Job {job_id} is already running")
+            job = Job(spec, job_id) if spec is not None else Job.resume(job_id)
+            self._jobs[job.id] = job
+        threading.Thread(target=job.run, name=f"job-{job.id}", daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def all_status(self) -> List[dict]:
+        return [job.status() for job in list(self._jobs.values())]
+
+    def cancel_all(self):
+        for job in list(self._jobs.values()):
+            job.cancel()
+
+
+def _checkpoint_path(job_id: str) -> str:
+    """Checkpoint file of `job_id`; raises ValueError for ids that are not plain names."""
+    if not isinstance(job_id, str) or not JOB_ID_PATTERN.fullmatch(job_id):
+        raise ValueError(f"job id must match {JOB_ID_PATTERN.pattern}, got {job_id!r}")
+    return os.path.join(JOB_CHECKPOINT_DIR, f"{job_id}.json")
+
+
+def resolve_input(path: str) -> str:
+    """Map an API-supplied path into JOB_INPUT_ROOT; raises ValueError if it escapes."""
+    root = os.path.realpath(JOB_INPUT_ROOT)
+    full = os.path.realpath(os.path.join(root, path))
+    if full != root and not full.startswith(root + os.sep):
+        raise ValueError(f"{path} is outside JOB_INPUT_ROOT")
+    return full
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m server.jobs", description=__doc__.split("\n\n")[0])
+    parser.add_argument("inputs", nargs="*", help="video files or directories")
+    parser.add_argument("--job-id", help="resume this job (inputs optional) or name a new one")
+    parser.add_argument("--camera", help="use this registered camera's zones / thresholds")
+    parser.add_argument("--camera-id", default="offline", help="camera_id for an unregistered source")
+    parser.add_argument("--zones", help="JSON polygons / zone rules overriding the camera's zones")
+    parser.add_argument("--every", type=int, default=DETECTION_INTERVAL)
+    parser.add_argument("--batch", type=int, default=JOB_BATCH_SIZE)
+    parser.add_argument("--chunk-seconds", type=float, default=JOB_CHUNK_SECONDS)
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS)
+    parser.add_argument("--detectors", default=",".join(DEFAULT_DETECTORS))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+
+    if not args.inputs:
+        if not args.job_id:
+            parser.error("give input paths, or --job-id to resume")
+        job = Job.resume(args.job_id)
+    else:
+        from .registry import CameraConfig, stored_config
+
+        if args.camera:
+            cfg = stored_config(args.camera)
+            if cfg is None:
+                parser.error(f"camera '{args.camera}' is not in the registry")
+        else:
+            cfg = CameraConfig(args.camera_id, "file://")
+        if args.zones:
+            cfg = cfg.merged({"parking_zones": json.loads(args.zones)})
+        spec = JobSpec.from_dict({
+            "inputs":        args.inputs,
+            "camera":        cfg.to_dict(),
+            "every":         args.every,
+            "batch_size":    args.batch,
+            "chunk_seconds": args.chunk_seconds,
+            "workers":       args.workers,
+            "detectors":     [d.strip() for d in args.detectors.split(",") if d.strip()],
+        })
+        job = Job(spec, args.job_id)
+
+    log.info("Job %s (checkpoint: %s)", job.id, job.checkpoint_path)
+    try:
+        job.run()
+    except KeyboardInterrupt:
+        job.cancel()
+    print(json.dumps(job.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
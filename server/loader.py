@@ -0,0 +1,165 @@
+"""
+Background model loader.
+
+Detectors are constructed without weights; the loader calls `load()` on
+them from a small worker pool so cameras can start streaming (without
+detection) straight away, and so /health can report readiness.
+
+A failed load is retried MODEL_LOAD_RETRIES times, MODEL_LOAD_RETRY_SECONDS
+× attempt apart (a model file still being copied, a full disk); after that
+it stays failed until retry_failed() — POST /api/admin/models/retry.  The
+process is not ready while any model is failed.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .detectors.base import BaseDetector
+from .metrics import MODELS, QUEUE_DEPTH
+
+log = logging.getLogger(__name__)
+
+# Loading several YOLO models at once mostly contends for disk and RAM.
+MODEL_LOAD_WORKERS = int(os.getenv("MODEL_LOAD_WORKERS", "1"))
+MODEL_LOAD_RETRIES       = int(os.getenv("MODEL_LOAD_RETRIES", "3"))
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "30"))
+
+
+class ModelLoader:
+    """Loads detector models off the request path and tracks their state."""
+
+    PENDING = "pending"
+    LOADING = "loading"
+    READY   = "ready"
+    FAILED  = "failed"
+
+    def __init__(self, workers: int = MODEL_LOAD_WORKERS):
+        self._workers  = workers
+        self._executor: Optional[ThreadPoolExecutor] = None   # created on first submit
+        self._lock     = threading.Lock()
+        self._state: Dict[int, dict] = {}                     # id(detector) → record
+
+    def submit(self, detectors: List[BaseDetector], camera_id: str = "unknown"):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="model-loader",
+                )
+            for det in detectors:
+                if id(det) in self._state:
+                    continue
+                self._state[id(det)] = {
+                    "camera_id": camera_id,
+                    "detector":  det.name,
+                    "state":     self.READY if det.ready else self.PENDING,
+                    "error":     None,
+                    "attempts":  0,
+                    "det":       det,
+                }
+                if not det.ready:
+                    self._executor.submit(self._load, det)
+        self._publish_metrics()
+
+    def forget(self, detectors: List[BaseDetector]):
+        """Drop state for detectors whose camera was removed."""
+        with self._lock:
+            for det in detectors:
+                self._state.pop(id(det), None)
+        self._publish_metrics()
+
+    def retry_failed(self) -> int:
+        """Queue every failed detector for another load; returns how many."""
+        with self._lock:
+            failed = [r["det"] for r in self._state.values() if r["state"] == self.FAILED]
+            for rec in self._state.values():
+                if rec["state"] == self.FAILED:
+                    rec["attempts"] = 0
+        for det in failed:
+            self._resubmit(det)
+        return len(failed)
+
+    def status(self) -> dict:
+        records, counts = self._counts()
+        return {
+            "ready":   not (counts[self.PENDING] or counts[self.LOADING] or counts[self.FAILED]),
+            "degraded": counts[self.FAILED] > 0,
+            "pending": counts[self.PENDING],
+            "loading": counts[self.LOADING],
+            "loaded":  counts[self.READY],
+            "failed":  counts[self.FAILED],
+            "errors":  [
+                {k: r[k] for k in ("camera_id", "detector", "error", "attempts")}
+                for r in records if r["state"] == self.FAILED
+            ],
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ─── Internal helpers ────────────────────────────────────────────────
+
+    def _counts(self):
+        with self._lock:
+            records = list(self._state.values())
+        counts = {s: 0 for s in (self.PENDING, self.LOADING, self.READY, self.FAILED)}
+        for rec in records:
+            counts[rec["state"]] += 1
+        return records, counts
+
+    def _publish_metrics(self):
+        _, counts = self._counts()
+        for state, n in counts.items():
+            MODELS.labels(state).set(n)
+        QUEUE_DEPTH.labels("model_load").set(counts[self.PENDING])
+
+    def _set(self, det: BaseDetector, state: str, error: Optional[str] = None):
+        with self._lock:
+            rec = self._state.get(id(det))
+            if rec is not None:
+                rec["state"], rec["error"] = state, error
+        self._publish_metrics()
+
+    def _resubmit(self, det: BaseDetector):
+        with self._lock:
+            rec = self._state.get(id(det))
+            if rec is None or self._executor is None:   # camera removed / shutting down
+                return
+            if rec["state"] != self.FAILED:             # already queued again
+                return
+            rec["state"] = self.PENDING
+            self._executor.submit(self._load, det)
+        self._publish_metrics()
+
+    def _load(self, det: BaseDetector):
+        with self._lock:
+            rec = self._state.get(id(det))
+            if rec is None:             # camera removed while queued
+                return
+            camera_id = rec["camera_id"]
+            rec["attempts"] += 1
+            attempts = rec["attempts"]
+        self._set(det, self.LOADING)
+        try:
+            det.load()
+        except Exception as exc:
+            self._set(det, self.FAILED, str(exc))
+            if attempts <= MODEL_LOAD_RETRIES:
+                delay = MODEL_LOAD_RETRY_SECONDS * attempts
+                log.warning("[%s] Loading detector %s failed (%s) — retrying in %.0fs",
+                            camera_id, det.name, exc, delay)
+                timer = threading.Timer(delay, self._resubmit, args=(det,))
+                timer.daemon = True
+                timer.start()
+            else:
+                log.exception("[%s] Loading detector %s failed for good", camera_id, det.name)
+            return
+        self._set(det, self.READY)
+        log.info("[%s] Detector %s ready", camera_id, det.name)
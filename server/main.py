@@ -5,10 +5,12 @@ Development:
     python -m server.main
 
 Production:
-    gunicorn "server.main:app" -w 1 --threads 8 -b 0.0.0.0:8000
+    gunicorn "server.main:create_app()" -w 1 --threads 8 -b 0.0.0.0:8000
 
-On startup the server will automatically connect to all cameras defined
-in PI_CAMERAS inside server/api.py — no manual curl registration needed.
+Importing this module does no work.  `create_app()` builds the app and
+connects to all cameras defined in PI_CAMERAS inside server/api.py — no
+manual curl registration needed.  Streams come up immediately; YOLO
+models load in the background (see /health "ready").
 """
 
 from __future__ import annotations
@@ -23,23 +25,48 @@ try:
 except ImportError:
     pass
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
-)
-log = logging.getLogger(__name__)
+from flask import Flask, send_from_directory
 
-# api.py auto-registers all PI_CAMERAS when imported
-from .api import app, manager, PI_CAMERAS
-from flask import send_from_directory
+from . import api
+from .api import PI_CAMERAS
 
-# ─── Serve dashboard at / ────────────────────────────────────────────────────
+log = logging.getLogger(__name__)
 
 DASHBOARD_DIR = os.path.join(os.path.dirname(__file__), "..", "dashboard")
 
-@app.route("/")
-def dashboard():
-    return send_from_directory(os.path.abspath(DASHBOARD_DIR), "index.html")
+
+def _configure_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+    )
+
+
+def create_app(start_cameras: bool = True) -> Flask:
+    """Build the API app, serve the dashboard at / and start the cameras."""
+    _configure_logging()
+    app = api.create_app(start_cameras=start_cameras)
+
+    # ─── Serve dashboard at / ────────────────────────────────────────────
+    @app.route("/")
+    def dashboard():
+        return send_from_directory(os.path.abspath(DASHBOARD_DIR), "index.html")
+
+    return app
+
+
+_app = None
+
+
+def __getattr__(name: str):
+    # Keeps the old `gunicorn "server.main:app"` target working: the app is
+    # only built when something actually asks for it.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ─── Dev runner ──────────────────────────────────────────────────────────────
@@ -48,13 +75,15 @@ if __name__ == "__main__":
     port  = int(os.getenv("SERVER_PORT", 8000))
     debug = os.getenv("FLASK_DEBUG", "0") == "1"
 
+    app = create_app()
+
     log.info("=" * 55)
     log.info("  Smart City Surveillance Server")
     log.info("  Dashboard -> http://localhost:%d/", port)
     log.info("  Health    -> http://localhost:%d/health", port)
-    log.info("  Cameras   -> %d auto-registered", len(PI_CAMERAS))
+    log.info("  Cameras   -> %d auto-registered (models loading in background)", len(PI_CAMERAS))
     for cam in PI_CAMERAS:
         log.info("    [%s] %s", cam["camera_id"], cam["stream_url"])
     log.info("=" * 55)
 
-    app.run(host="0.0.0.0", port=port, debug=debug, threaded=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=port, debug=debug, threaded=True)
@@ -0,0 +1,343 @@
+"""
+Metrics
+───────
+Minimal Prometheus-style instrumentation (no client library needed) served
+as text exposition format on GET /metrics.
+
+Cheap enough to leave on at every frame: a processor resolves its labelled
+children once (CameraMetrics) and each observation is then a
+perf_counter() call, a bisect and a few integer adds, without locks.
+Each child is written by one thread (its camera's), so updates are not
+lost; scrapes may see a histogram a single observation out of date.
+
+In sharded mode every worker collects its own families and the front-end
+merges them, adding a `shard` label.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+perf_counter = time.perf_counter
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+Labels  = Tuple[Tuple[str, str], ...]
+Sample  = Tuple[str, Labels, float]                 # (name, labels, value)
+Family  = Tuple[str, str, str, List[Sample]]        # (name, type, help, samples)
+
+
+# ─── Metric types ────────────────────────────────────────────────────────────
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)     # last slot = +Inf
+        self.sum    = 0.0
+        self.count  = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum   += value
+        self.count += 1
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock      = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values: str):
+        key   = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove_matching(self, label: str, value: str):
+        """Drop every child whose `label` equals `value` (e.g. a removed camera)."""
+        idx = self.labelnames.index(label)
+        with self._lock:
+            for key in [k for k in self._children if k[idx] == value]:
+                del self._children[key]
+
+    @abstractmethod
+    def _new_child(self):
+        ...
+
+    def _items(self) -> List[Tuple[Labels, object]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(tuple(zip(self.labelnames, k)), c) for k, c in items]
+
+    @abstractmethod
+    def collect(self) -> Family:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def collect(self) -> Family:
+        return (self.name, self.kind, self.help,
+                [(self.name, lbl, c.value) for lbl, c in self._items()])
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def collect(self) -> Family:
+        return (self.name, self.kind, self.help,
+                [(self.name, lbl, c.value) for lbl, c in self._items()])
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def collect(self) -> Family:
+        samples: List[Sample] = []
+        for lbl, c in self._items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), list(c.counts)):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((self.name + "_bucket", lbl + (("le", le),), cumulative))
+            samples.append((self.name + "_sum", lbl, c.sum))
+            samples.append((self.name + "_count", lbl, c.count))
+        return (self.name, self.kind, self.help, samples)
+
+
+REGISTRY: List[_Metric] = []
+
+
+# ─── Pipeline metrics ────────────────────────────────────────────────────────
+
+STAGE_SECONDS = Histogram(
+    "smartcity_stage_seconds",
+    "Per-frame pipeline stage latency (decode, resize, annotate, encode, db_write, snapshot_write)",
+    ("camera", "stage"),
+)
+INFERENCE_SECONDS = Histogram(
+    "smartcity_inference_seconds", "Detector inference latency per call", ("camera", "detector"),
+)
+FRAMES = Counter("smartcity_frames_total", "Frames read from the camera", ("camera",))
+PASSTHROUGH_FRAMES = Counter(
+    "smartcity_passthrough_frames_total", "Frames served without decode/re-encode", ("camera",),
+)
+DROPPED_FRAMES = Counter(
+    "smartcity_dropped_frames_total", "Frames read but never served (decode/encode failures)", ("camera",),
+)
+RECONNECTS = Counter("smartcity_reconnects_total", "Stream (re)connection attempts", ("camera",))
+EVENTS = Counter("smartcity_events_total", "Detections persisted", ("camera", "label"))
+VIEWERS = Gauge("smartcity_viewers", "Open MJPEG / SSE viewer connections", ("camera",))
+MODELS = Gauge("smartcity_models", "Detector models by load state", ("state",))
+QUEUE_DEPTH = Gauge("smartcity_queue_depth", "Items waiting in background work queues", ("queue",))
+STREAM_BREAKER = Gauge(
+    "smartcity_stream_breaker", "Stream circuit breaker: 0 closed, 1 half-open, 2 open", ("camera",),
+)
+ZONE_OCCUPANCY = Gauge(
+    "smartcity_zone_occupancy", "Vehicles in each parking zone on the last detection tick", ("camera", "zone"),
+)
+DEGRADED_STEPS = Gauge(
+    "smartcity_degraded_steps", "Admission-control degradation steps applied to the camera", ("camera",),
+)
+ADMISSION_LEVEL = Gauge("smartcity_admission_level", "Rungs of the admission-control degradation ladder applied")
+MOSAIC_PASSES = Counter(
+    "smartcity_mosaic_passes_total", "Forward passes run by a mosaic scheduler", ("model", "kind"),
+)
+MOSAIC_REQUESTS = Counter(
+    "smartcity_mosaic_requests_total", "Inference requests answered by a mosaic scheduler", ("model",),
+)
+CASCADE_FRAMES = Counter(
+    "smartcity_cascade_frames_total",
+    "Frames per cascade outcome: resolved by the screener or escalated (by reason)",
+    ("detector", "outcome"),
+)
+
+_CAMERA_METRICS = (
+    STAGE_SECONDS, INFERENCE_SECONDS, FRAMES, PASSTHROUGH_FRAMES,
+    DROPPED_FRAMES, RECONNECTS, EVENTS, DEGRADED_STEPS, STREAM_BREAKER, ZONE_OCCUPANCY,
+)
+
+
+# Span sink of a running trace (server/profiler.py); None when not tracing.
+_trace_sink: Optional[list] = None
+
+
+def set_trace_sink(sink: Optional[list]):
+    """Start (list) or stop (None) recording (camera, stage, start, end, thread) spans."""
+    global _trace_sink
+    _trace_sink = sink
+
+
+class CameraMetrics:
+    """Pre-resolved metric children for one camera's hot path."""
+
+    STAGES = ("decode", "resize", "annotate", "encode", "db_write", "snapshot_write")
+
+    def __init__(self, camera_id: str):
+        self.camera_id   = camera_id
+        self._stages     = {s: STAGE_SECONDS.labels(camera_id, s) for s in self.STAGES}
+        self._inference: Dict[str, _HistogramChild] = {}
+        self.frames      = FRAMES.labels(camera_id)
+        self.passthrough = PASSTHROUGH_FRAMES.labels(camera_id)
+        self.dropped     = DROPPED_FRAMES.labels(camera_id)
+        self.reconnects  = RECONNECTS.labels(camera_id)
+        self.degraded    = DEGRADED_STEPS.labels(camera_id)
+        self.breaker     = STREAM_BREAKER.labels(camera_id)
+
+    def observe(self, stage: str, started: float) -> float:
+        """Record `stage` as having run from `started` until now; returns now."""
+        now = perf_counter()
+        self._stages[stage].observe(now - started)
+        if _trace_sink is not None:
+            _trace_sink.append((self.camera_id, stage, started, now, threading.get_ident()))
+        return now
+
+    def observe_inference(self, detector: str, started: float) -> float:
+        now   = perf_counter()
+        child = self._inference.get(detector)
+        if child is None:
+            child = self._inference[detector] = INFERENCE_SECONDS.labels(self.camera_id, detector)
+        child.observe(now - started)
+        if _trace_sink is not None:
+            _trace_sink.append((self.camera_id, f"inference:{detector}", started, now,
+                                threading.get_ident()))
+        return now
+
+    def span(self, name: str, started: float) -> float:
+        """Trace-only span (no histogram), e.g. the whole frame or the read wait."""
+        now = perf_counter()
+        if _trace_sink is not None:
+            _trace_sink.append((self.camera_id, name, started, now, threading.get_ident()))
+        return now
+
+    def event(self, label: str):
+        EVENTS.labels(self.camera_id, label).inc()
+
+
+def viewer_opened(camera_id: str):
+    with VIEWERS._lock:
+        VIEWERS._children.setdefault((camera_id,), VIEWERS._new_child()).inc()
+
+
+def viewer_closed(camera_id: str):
+    with VIEWERS._lock:
+        child = VIEWERS._children.get((camera_id,))
+        if child is not None:
+            child.dec()
+            if child.value <= 0:        # no idle series for cameras nobody watches
+                del VIEWERS._children[(camera_id,)]
+
+
+@contextmanager
+def viewer(camera_id: str):
+    """Count an open viewer connection for the duration of the block."""
+    viewer_opened(camera_id)
+    try:
+        yield
+    finally:
+        viewer_closed(camera_id)
+
+
+def forget_camera(camera_id: str):
+    """Drop a removed camera's series so /metrics does not grow forever."""
+    for metric in _CAMERA_METRICS:
+        metric.remove_matching("camera", camera_id)
+
+
+# ─── Exposition ──────────────────────────────────────────────────────────────
+
+def collect() -> List[Family]:
+    return [m.collect() for m in REGISTRY]
+
+
+def merge(groups: Iterable[Tuple[Optional[str], List[Family]]]) -> List[Family]:
+    """
+    Merge families from several processes.  `groups` yields
+    (shard label or None, families); samples of a shard get shard="<n>".
+    """
+    merged: Dict[str, Family] = {}
+    for shard, families in groups:
+        for name, kind, help, samples in families:
+            if shard is not None:
+                samples = [(n, lbl + (("shard", shard),), v) for n, lbl, v in samples]
+            if name in merged:
+                merged[name][3].extend(samples)
+            else:
+                merged[name] = (name, kind, help, list(samples))
+    return list(merged.values())
+
+
+def render(families: Iterable[Family]) -> str:
+    """Prometheus text exposition format 0.0.4."""
+    lines: List[str] = []
+    for name, kind, help, samples in families:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample_name, labels, value in samples:
+            if labels:
+                body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{sample_name}{{{body}}} {_fmt(value)}")
+            else:
+                lines.append(f"{sample_name} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
@@ -4,39 +4,74 @@ Stream Processor
 Connects to a Pi MJPEG stream, pulls frames in a background thread,
 runs all registered detectors, logs events, and exposes the latest
 annotated frame as a JPEG byte-string for the Flask API to serve.
+
+When nothing needs drawing the camera's own JPEG bytes are served
+as-is (pass-through) and the frame is only decoded on detection ticks.
+Detections are also published as JSON metadata so clients can draw
+boxes themselves.
 """
 
 from __future__ import annotations
 
 import logging
+import os
 import threading
 import time
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 
-from .detectors.base import BaseDetector, Detection
+from .admission import DEFAULT_PRIORITY, PRIORITIES, AdmissionController
+from .analytics import TRASH_LABEL, AnalyticsWriter, MinuteRecorder
+from .checkpoint import Checkpointer
+from .detectors.base import BaseDetector, Detection, FrameDetections
 from .db.mongo import log_detection, log_parking_event
+from .loader import ModelLoader
+from .metrics import CameraMetrics, forget_camera, perf_counter
+from .supervisor import BREAKER_STATES, StreamSupervisor
+from .utils.frames import FrameDecoder, jpeg_size
+from .utils.clips import CLIP_LABELS, FrameRing, clip_writer
+from .utils.mjpeg import MJPEGReader
 from .utils.snapshot import save_snapshot
 
 log = logging.getLogger(__name__)
 
 # Maximum time (s) to wait for a fresh frame before retrying the stream.
+# Reconnect pacing (backoff, probes, circuit breaker) is in supervisor.py.
 READ_TIMEOUT  = 5
-RETRY_DELAY   = 3
 FRAME_RESIZE  = (640, 480)
 
 # Run detectors only every N frames to keep stream fluid.
 DETECTION_INTERVAL = 15   # <-- increased from 5
 
+# Smoothing of the detection latency admission control watches.
+LATENCY_EMA = 0.3
+
+# Seconds before the same object (label + centre) is logged again.
+COOLDOWN_SECONDS = 5
+
+# Draw boxes into the served JPEG.  With 0 frames are always passed
+# through untouched and clients draw from the detection metadata.
+ANNOTATE_ON_SERVER = os.getenv("ANNOTATE_ON_SERVER", "1") == "1"
+JPEG_QUALITY       = 75
+
+# Keep the last few seconds of served JPEGs and write a clip around events
+# whose label is in CLIP_LABELS (see utils/clips.py).
+SAVE_CLIPS = os.getenv("SAVE_CLIPS", "1") == "1"
+
+# Degradation applied by admission control (see admission.py).
+DEGRADED_INTERVAL_FACTOR = int(os.getenv("DEGRADED_INTERVAL_FACTOR", "3"))
+VIEWER_FPS_DIVISOR       = int(os.getenv("VIEWER_FPS_DIVISOR", "2"))
+
 
 @dataclass
 class CameraStats:
     camera_id:    str
     stream_url:   str
     frames_read:  int = 0
+    frames_passthrough: int = 0
     detections:   int = 0
     errors:       int = 0
     fps:          float = 0.0
@@ -64,25 +99,61 @@ class StreamProcessor:
         stream_url: str,
         detectors:  Optional[List[BaseDetector]] = None,
         save_snapshots: bool = True,
+        save_clips: bool = SAVE_CLIPS,
+        annotate: bool = ANNOTATE_ON_SERVER,
+        detection_interval: int = DETECTION_INTERVAL,
+        cooldown_seconds: float = COOLDOWN_SECONDS,
+        source: Optional[Callable[[], object]] = None,
+        priority: str = DEFAULT_PRIORITY,
     ):
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {PRIORITIES}, got {priority!r}")
         self.camera_id      = camera_id
         self.stream_url     = stream_url
         self.detectors      = detectors or []
         self.save_snapshots = save_snapshots
+        self.annotate       = annotate
+        self.detection_interval = detection_interval
+        self.priority       = priority
+        # Factory for a non-network frame source (recorded video, synthetic
+        # frames — see utils/sources.py); replaces opening stream_url.
+        self._source_factory = source
 
         self.stats     = CameraStats(camera_id=camera_id, stream_url=stream_url)
         self._lock     = threading.Lock()
-        self._latest   : Optional[bytes] = None   # JPEG bytes of last annotated frame
+        self._frame_cond = threading.Condition(self._lock)
+        self._latest   : Optional[bytes] = None   # JPEG bytes of last served frame
+        self._latest_meta: dict = {}              # metadata describing _latest
+        self._seq      = 0                        # bumped on every served frame
         self._raw_frame: Optional[np.ndarray] = None
+        self._decoder  = FrameDecoder(FRAME_RESIZE)
+        self.metrics   = CameraMetrics(camera_id)
+        self.supervisor = StreamSupervisor(
+            camera_id, on_state=lambda state: self.metrics.breaker.set(BREAKER_STATES.index(state)),
+        )
+        self._clip_ring: Optional[FrameRing] = FrameRing() if save_clips else None
+        self.analytics = MinuteRecorder()
         self._running  = False
+        self._reconnect = False
         self._thread   : Optional[threading.Thread] = None
 
         # Store last detection results for drawing on skipped frames
-        self._last_detections: List[Detection] = []
+        self._last_detections = FrameDetections.empty(camera_id)
+        self._detection_seq = 0                   # bumped on every detector run
+        self._detection_payload: List[dict] = []  # JSON form of _last_detections
 
         # Cooldown for duplicate events
         self._last_event_time = {}          # key: (label, cx, cy) -> timestamp
-        self._cooldown_seconds = 5          # seconds to wait before logging same object again
+        self._cooldown_seconds = cooldown_seconds   # seconds to wait before logging same object again
+
+        # Admission control: steps applied to this camera and the
+        # capture → detectors-done latency it decides on (EMA, seconds).
+        self.detect_latency  = 0.0
+        self._degraded: frozenset = frozenset()
+        self._interval_factor = 1
+        self._annotate_paused = False
+        self._publish_every   = 1
+        self._publish_count   = 0
 
     # ─── Public API ───────────────────────────────────────────────────────
 
@@ -90,39 +161,166 @@ class StreamProcessor:
         if self._running:
             return
         self._running = True
-        self._thread  = threading.Thread(target=self._loop, daemon=True)
+        self._thread  = threading.Thread(
+            target=self._loop, daemon=True, name=f"processor-{self.camera_id}",
+        )
         self._thread.start()
         log.info("[%s] Processor started → %s", self.camera_id, self.stream_url)
 
+    @property
+    def running(self) -> bool:
+        return self._running
+
     def stop(self):
         self._running = False
+        self.supervisor.wake()
+        with self._frame_cond:
+            self._frame_cond.notify_all()
         if self._thread:
             self._thread.join(timeout=10)
+        if self._clip_ring is not None:
+            clip_writer().release(self._clip_ring)
+
+    def configure(
+        self,
+        detection_interval: Optional[int] = None,
+        cooldown_seconds: Optional[float] = None,
+        stream_url: Optional[str] = None,
+        priority: Optional[str] = None,
+    ):
+        """
+        Apply settings to the running processor.  Interval, cooldown and
+        priority take effect on the next frame (priority: on the next
+        admission tick); a new stream_url reconnects the stream but keeps
+        detectors (and their tracks) as they are.
+        """
+        if priority is not None:
+            if priority not in PRIORITIES:
+                raise ValueError(f"priority must be one of {PRIORITIES}, got {priority!r}")
+            self.priority = priority
+        if detection_interval is not None:
+            self.detection_interval = max(1, int(detection_interval))
+        if cooldown_seconds is not None:
+            self._cooldown_seconds = cooldown_seconds
+        if stream_url is not None and stream_url != self.stream_url:
+            self.stream_url = self.stats.stream_url = stream_url
+            self._reconnect = True
+            self.supervisor.reset()
+
+    def apply_degradation(self, steps: frozenset):
+        """Apply the admission-control steps for this camera (see admission.py)."""
+        if steps == self._degraded:
+            return
+        self._interval_factor = DEGRADED_INTERVAL_FACTOR if "detection_rate" in steps else 1
+        for detector in self.detectors:
+            detector.set_lite("lite_model" in steps)
+        self._annotate_paused = "annotation" in steps
+        self._publish_every   = VIEWER_FPS_DIVISOR if "viewer_fps" in steps else 1
+        log.info("[%s] Degradation (%s): %s", self.camera_id, self.priority,
+                 ", ".join(sorted(steps)) or "none")
+        self._degraded = steps
+        self.metrics.degraded.set(len(steps))
+
+    def checkpoint(self) -> dict:
+        """State to carry over a restart: live cooldowns and detector state."""
+        now = time.time()
+        cooldowns = [
+            [label, cx, cy, ts] for (label, cx, cy), ts in list(self._last_event_time.items())
+            if now - ts < self._cooldown_seconds
+        ]
+        detectors = {}
+        for detector in self.detectors:
+            state = detector.checkpoint()
+            if state is not None:
+                detectors[detector.name] = state
+        return {"camera_id": self.camera_id, "saved_at": now, "cooldowns": cooldowns, "detectors": detectors}
+
+    def restore(self, state: dict) -> List[str]:
+        """Apply a checkpoint() before start(); returns the parts that were taken."""
+        restored = []
+        cooldowns = state.get("cooldowns") or []
+        for label, cx, cy, ts in cooldowns:
+            self._last_event_time[(label, cx, cy)] = ts
+        if cooldowns:
+            restored.append("cooldowns")
+        saved = state.get("detectors") or {}
+        for detector in self.detectors:
+            if detector.name not in saved:
+                continue
+            if detector.restore(saved[detector.name]):
+                restored.append(detector.name)
+            else:
+                log.info("[%s] Checkpoint for %s no longer applies (config changed)",
+                         self.camera_id, detector.name)
+        return restored
 
     def get_latest_frame(self) -> Optional[bytes]:
-        """Return the latest JPEG-encoded annotated frame (thread-safe)."""
+        """Return the latest JPEG frame served to viewers (thread-safe)."""
         with self._lock:
             return self._latest
 
+    def get_latest_meta(self) -> dict:
+        """Return the metadata (seq, size, detections) of the latest frame."""
+        with self._lock:
+            return self._latest_meta
+
+    def wait_for_frame(
+        self, after_seq: int = 0, timeout: float = 1.0,
+    ) -> Optional[Tuple[int, bytes, dict]]:
+        """
+        Block until a frame newer than `after_seq` is available.
+        Returns (seq, jpeg, meta), or None on timeout / shutdown.
+        """
+        deadline = time.monotonic() + timeout
+        with self._frame_cond:
+            while self._seq <= after_seq or self._latest is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._frame_cond.wait(remaining)
+            return self._seq, self._latest, self._latest_meta
+
     def get_stats(self) -> dict:
         s = self.stats
         return {
             "camera_id":   s.camera_id,
             "stream_url":  s.stream_url,
             "frames_read": s.frames_read,
+            "frames_passthrough": s.frames_passthrough,
             "detections":  s.detections,
             "errors":      s.errors,
             "fps":         round(s.fps, 2),
             "connected":   s.connected,
+            "link":        self.supervisor.status(),
+            "models_ready": all(d.ready for d in self.detectors),
+            "clip_buffer": self._clip_ring.stats() if self._clip_ring is not None else None,
+            "priority":    self.priority,
+            "detect_latency_ms": round(self.detect_latency * 1000, 1),
+            "degraded":    sorted(self._degraded),
+            "cascade":     self._cascade_stats(),
+            "occupancy":   self._occupancy(),
         }
 
+    def _occupancy(self) -> Optional[dict]:
+        counts = [d.occupancy() for d in self.detectors]
+        return next((c for c in counts if c is not None), None)
+
+    def _cascade_stats(self) -> Optional[dict]:
+        stats = {d.name: d.cascade_stats() for d in self.detectors}
+        return {name: st for name, st in stats.items() if st is not None} or None
+
     # ─── Main loop ───────────────────────────────────────────────────────
 
     def _loop(self):
+        m = self.metrics
         while self._running:
-            cap = self._open_stream()
-            if cap is None:
-                time.sleep(RETRY_DELAY)
+            self._reconnect = False
+            source = self.supervisor.connect(
+                self._counted_open, self.stream_url,
+                probe_first=self._source_factory is None,
+                cancelled=lambda: not self._running or self._reconnect,
+            )
+            if source is None:
                 continue
 
             self.stats.connected = True
@@ -130,15 +328,18 @@ class StreamProcessor:
             fps_frames = 0
             frame_count = 0   # counter for detection interval
 
-            while self._running:
-                ret, frame = cap.read()
-                if not ret:
+            while self._running and not self._reconnect:
+                t_read = perf_counter()
+                jpeg, frame = self._read(source)
+                if jpeg is None and frame is None:
                     log.warning("[%s] Frame read failed — reconnecting", self.camera_id)
                     self.stats.errors += 1
                     break
+                t_frame = m.span("read", t_read)
+                frame_ts = time.monotonic()       # capture time, used for dwell
 
-                frame = cv2.resize(frame, FRAME_RESIZE)
                 self.stats.frames_read += 1
+                m.frames.inc()
                 fps_frames += 1
                 frame_count += 1
 
@@ -149,95 +350,216 @@ class StreamProcessor:
                     fps_frames = 0
                     fps_timer  = time.monotonic()
 
-                # Run detectors only every DETECTION_INTERVAL frames
-                if frame_count % DETECTION_INTERVAL == 0:
+                interval = self.detection_interval * self._interval_factor
+                run_detection = frame_count % interval == 0
+                annotate = self.annotate and not self._annotate_paused
+                draw = annotate and bool(self._last_detections)
+
+                # Pass-through: nothing to detect or draw, serve camera bytes —
+                # only when they are already at FRAME_RESIZE; others are fitted.
+                passthrough = jpeg is not None and jpeg_size(jpeg) == FRAME_RESIZE
+                if passthrough and not run_detection and not draw:
+                    self.stats.detections += len(self._last_detections)
+                    self._publish(jpeg, FRAME_RESIZE, annotated=False)
+                    self.stats.frames_passthrough += 1
+                    m.passthrough.inc()
+                    m.span("frame", t_frame)
+                    continue
+
+                # Decode at (or near) FRAME_RESIZE; no resize when sizes match.
+                t = perf_counter()
+                if frame is None:
+                    frame = self._decoder.imdecode(jpeg)
+                    if frame is None:
+                        log.warning("[%s] Could not decode JPEG frame", self.camera_id)
+                        self.stats.errors += 1
+                        m.dropped.inc()
+                        continue
+                    t = m.observe("decode", t)
+                frame = self._decoder.fit(frame)
+                m.observe("resize", t)
+
+                # Run detectors only every detection_interval frames
+                if run_detection:
                     # Full detection run
-                    detections = self._run_detectors(frame)
-                    self._last_detections = detections   # store for later
+                    detections = self._run_detectors(frame, frame_ts)
+                    self._set_detections(detections)
+                    self.analytics.tick(detections.labels.count(TRASH_LABEL), self._occupancy())
+                    latency = time.monotonic() - frame_ts
+                    self.detect_latency += LATENCY_EMA * (latency - self.detect_latency)
                 else:
                     detections = self._last_detections   # reuse previous results
+                self.stats.detections += len(detections)
+
+                if passthrough and not (annotate and detections):
+                    self._publish(jpeg, FRAME_RESIZE, annotated=False)
+                    self.stats.frames_passthrough += 1
+                    m.passthrough.inc()
+                    m.span("frame", t_frame)
+                    continue
 
                 # Annotate frame using the available detections
-                annotated = self._draw_detections(frame, detections)
-                self.stats.detections += len(detections)
+                t = perf_counter()
+                if annotate:
+                    frame = self._draw_detections(frame, detections)
+                    t = m.observe("annotate", t)
 
-                ok, buf = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, 75])
+                ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                m.observe("encode", t)
                 if ok:
-                    with self._lock:
-                        self._latest = buf.tobytes()
+                    self._publish(buf.tobytes(), FRAME_RESIZE, annotated=annotate)
+                else:
+                    m.dropped.inc()
+                m.span("frame", t_frame)
 
-            cap.release()
+            source.release()
             self.stats.connected = False
-            log.warning("[%s] Reconnecting in %ds…", self.camera_id, RETRY_DELAY)
-            time.sleep(RETRY_DELAY)
+            if self._reconnect:
+                log.info("[%s] Stream URL changed — reconnecting", self.camera_id)
+                continue
+            self.supervisor.disconnected()
+
+    def _counted_open(self):
+        self.metrics.reconnects.inc()
+        return self._open_stream()
+
+    def _open_stream(self):
+        """
+        Open the camera source.  HTTP MJPEG feeds are read part-by-part so
+        the raw JPEG bytes stay available; anything else goes to OpenCV.
+        """
+        if self._source_factory is not None:
+            source = self._source_factory()
+            return source if source.isOpened() else None
+
+        log.debug("[%s] Connecting to stream…", self.camera_id)
+        if self.stream_url.startswith(("http://", "https://")):
+            reader = MJPEGReader(self.stream_url, timeout=READ_TIMEOUT)
+            if reader.open():
+                log.info("[%s] MJPEG stream opened (pass-through enabled).", self.camera_id)
+                return reader
 
-    def _open_stream(self) -> Optional[cv2.VideoCapture]:
-        log.info("[%s] Connecting to stream…", self.camera_id)
         cap = cv2.VideoCapture(self.stream_url, cv2.CAP_FFMPEG)
         if not cap.isOpened():
-            log.error("[%s] Cannot open stream %s", self.camera_id, self.stream_url)
+            log.debug("[%s] Cannot open stream %s", self.camera_id, self.stream_url)
             self.stats.errors += 1
             return None
         log.info("[%s] Stream opened.", self.camera_id)
         return cap
 
-    def _run_detectors(self, frame: np.ndarray) -> List[Detection]:
-        """Run all detectors on a fresh frame and persist events."""
-        all_events: List[Detection] = []
+    @staticmethod
+    def _read(source) -> Tuple[Optional[bytes], Optional[np.ndarray]]:
+        """Return (jpeg, None) for MJPEG sources and (None, frame) for OpenCV ones."""
+        if getattr(source, "yields_jpeg", False):
+            return source.read(), None
+        ret, frame = source.read()
+        return None, (frame if ret else None)
+
+    def _publish(self, jpeg: bytes, frame_size: Tuple[int, int], annotated: bool):
+        """Swap in a new served frame and wake any waiting viewers."""
+        if self._clip_ring is not None:
+            self._clip_ring.push(jpeg)
+        # Viewer fps degradation: clips keep every frame, viewers get 1/N.
+        self._publish_count += 1
+        if self._publish_count % self._publish_every:
+            return
+        with self._frame_cond:
+            self._seq += 1
+            self._latest = jpeg
+            self._latest_meta = {
+                "camera_id":     self.camera_id,
+                "seq":           self._seq,
+                "detection_seq": self._detection_seq,
+                "frame_size":    list(frame_size),
+                "annotated":     annotated,
+                "detections":    self._detection_payload,
+            }
+            self._frame_cond.notify_all()
+
+    def _set_detections(self, detections: FrameDetections):
+        self._last_detections   = detections
+        self._detection_payload = detections.to_dicts()
+        self._detection_seq    += 1
+
+    def _run_detectors(self, frame: np.ndarray, ts: Optional[float] = None) -> FrameDetections:
+        """Run all detectors on a fresh frame (captured at `ts`) and persist events."""
+        parts: List[FrameDetections] = []
 
         for detector in self.detectors:
+            if not detector.ready:      # still warming up in the ModelLoader
+                continue
+            t = perf_counter()
             try:
-                events = detector.detect(frame, camera_id=self.camera_id)
+                events = detector.detect(frame, camera_id=self.camera_id, ts=ts)
             except Exception as exc:
                 log.exception("[%s] Detector %s raised: %s", self.camera_id, detector.name, exc)
                 continue
+            finally:
+                self.metrics.observe_inference(detector.name, t)
 
-            for det in events:
-                all_events.append(det)
-                self._persist(frame, det)   # <-- now includes cooldown
+            if len(events):
+                self._persist_new(frame, events)   # <-- now includes cooldown
+                parts.append(events)
 
-        return all_events
+        return FrameDetections.concat(parts, self.camera_id)
 
-    def _draw_detections(self, frame: np.ndarray, detections: List[Detection]) -> np.ndarray:
+    def _draw_detections(self, frame: np.ndarray, detections: FrameDetections) -> np.ndarray:
         """Draw bounding boxes for the given detections onto a copy of the frame."""
         annotated = frame.copy()
-        for det in detections:
-            x1, y1, x2, y2 = det.bbox
-            color = (0, 0, 255) if det.label == "illegal_parking" else (0, 200, 50)
+        for label, conf, (x1, y1, x2, y2) in zip(
+            detections.labels, detections.confidences.tolist(), detections.boxes.tolist(),
+        ):
+            color = (0, 0, 255) if label == "illegal_parking" else (0, 200, 50)
             cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
-            text = f"{det.label} {det.confidence:.0%}"
+            text = f"{label} {conf:.0%}"
             cv2.putText(annotated, text, (x1, y1 - 6),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.55, color, 2)
         return annotated
 
-    def _persist(self, raw_frame: np.ndarray, det: Detection):
-        """Save snapshot and log event, with cooldown to avoid duplicates."""
+    def _persist_new(self, raw_frame: np.ndarray, events: FrameDetections):
+        """Persist the rows of `events` not logged within the cooldown."""
         # Cooldown check: skip if same object was logged recently
-        now = time.time()
-        cx = (det.bbox[0] + det.bbox[2]) // 2
-        cy = (det.bbox[1] + det.bbox[3]) // 2
-        key = (det.label, cx, cy)
-        last = self._last_event_time.get(key, 0)
-        if now - last < self._cooldown_seconds:
-            return
-        self._last_event_time[key] = now
+        now     = time.time()
+        centres = (events.boxes[:, :2] + events.boxes[:, 2:]) // 2
+        for i, (label, (cx, cy)) in enumerate(zip(events.labels, centres.tolist())):
+            key  = (label, cx, cy)
+            last = self._last_event_time.get(key, 0)
+            if now - last < self._cooldown_seconds:
+                continue
+            self._last_event_time[key] = now
+            self._persist(raw_frame, events.detection(i))
+
+    def _persist(self, raw_frame: np.ndarray, det: Detection):
+        """Save snapshot and log event."""
+        m = self.metrics
+        m.event(det.label)
+        self.analytics.event(det.label)
 
         snapshot_path: Optional[str] = None
         if self.save_snapshots:
+            t = perf_counter()
             try:
                 snapshot_path = save_snapshot(
                     raw_frame, det.label, self.camera_id, det.bbox
                 )
             except Exception:
                 log.exception("Snapshot save failed")
+            m.observe("snapshot_write", t)
+
+        # The clip itself is written later, once the post-event frames are in.
+        clip_path: Optional[str] = None
+        if self._clip_ring is not None and det.label in CLIP_LABELS:
+            clip_path = clip_writer().submit(self._clip_ring, self.camera_id, det.label)
 
+        t = perf_counter()
         try:
             if det.label == "illegal_parking":
-                log_parking_event(det, snapshot_path)
+                log_parking_event(det, snapshot_path, clip_path)
             else:
-                log_detection(det, snapshot_path)
+                log_detection(det, snapshot_path, clip_path)
         except Exception:
             log.exception("DB write failed for detection %s", det.label)
+        m.observe("db_write", t)
 
 
 # ─── Multi-camera manager ────────────────────────────────────────────────────
@@ -245,17 +567,41 @@ class StreamProcessor:
 class ProcessorManager:
     """Manages a pool of StreamProcessor instances."""
 
-    def __init__(self):
+    def __init__(self, loader: Optional[ModelLoader] = None):
         self._processors: Dict[str, StreamProcessor] = {}
+        self.loader = loader or ModelLoader()
+        self.admission = AdmissionController(lambda: list(self._processors.values()))
+        self.checkpoints = Checkpointer(lambda: list(self._processors.values()))
+        self.analytics_writer = AnalyticsWriter(lambda: list(self._processors.values()))
 
     def add(self, processor: StreamProcessor):
+        self.checkpoints.restore(processor)
         self._processors[processor.camera_id] = processor
-        processor.start()
+        self.admission.start()
+        self.checkpoints.start()
+        self.analytics_writer.start()
+        processor.start()       # streams immediately; detection starts once models load
+        self.loader.submit(processor.detectors, processor.camera_id)
+
+    def add_camera(self, cfg) -> None:
+        """Build and start a processor from a registry CameraConfig."""
+        from .registry import build_processor   # registry imports this module
+        self.add(build_processor(cfg))
+
+    def reconfigure(self, camera_id: str, old, new) -> List[str]:
+        """Apply a config change to a live camera; returns the changed fields."""
+        from .registry import apply_config
+        return apply_config(self._processors[camera_id], old, new)
 
     def remove(self, camera_id: str):
         proc = self._processors.pop(camera_id, None)
         if proc:
             proc.stop()
+            self.checkpoints.save(proc)
+            self.loader.forget(proc.detectors)
+            for detector in proc.detectors:
+                detector.close()
+            forget_camera(camera_id)
 
     def get(self, camera_id: str) -> Optional[StreamProcessor]:
         return self._processors.get(camera_id)
@@ -264,6 +610,13 @@ class ProcessorManager:
         return [p.get_stats() for p in self._processors.values()]
 
     def stop_all(self):
+        self.admission.stop()
+        self.checkpoints.stop()
+        self.analytics_writer.stop()
+        self.loader.shutdown()
         for proc in self._processors.values():
             proc.stop()
-        self._processors.clear()
\ No newline at end of file
+        self.checkpoints.save_all()
+        self._processors.clear()
+        if not clip_writer().drain():
+            log.warning("Shutting down with event clips still being written")
@@ -0,0 +1,190 @@
+"""
+On-demand profiler
+──────────────────
+Diagnoses a slow camera on a running server, without restarts or external
+tools (POST /api/admin/profile).  One session runs at a time, for a bounded
+number of seconds, in one of two modes:
+
+  sample   The request thread snapshots the Python stacks of every
+           StreamProcessor thread (sys._current_frames) at a fixed interval
+           and counts them as folded stacks — the input format of
+           flamegraph.pl, speedscope and inferno.
+  trace    Every pipeline stage the metrics already time (read, decode,
+           resize, inference per detector, annotate, encode, db/snapshot
+           writes, the whole frame) is recorded as a span and returned as
+           Chrome trace JSON (chrome://tracing, Perfetto).
+
+Outside a session neither mode costs anything beyond a None check.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+PROFILE_MAX_SECONDS     = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROCESSOR_THREAD_PREFIX = "processor-"
+MODES = ("sample", "trace")
+
+_session = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profiling session is already running in this process."""
+
+
+def profile(
+    seconds: float,
+    mode: str = "sample",
+    camera_id: Optional[str] = None,
+    interval: float = PROFILE_SAMPLE_INTERVAL,
+) -> dict:
+    """
+    Profile this process's camera threads for `seconds` (blocking).
+    Returns {"stacks": {folded: count}, "samples": n} in sample mode and a
+    Chrome trace ({"traceEvents": [...]}) in trace mode.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    seconds = clamp_seconds(seconds)
+    with session():
+        log.info("Profiling (%s) for %.1fs%s", mode, seconds,
+                 f" — camera {camera_id}" if camera_id else "")
+        if mode == "sample":
+            return _sample(seconds, camera_id, max(interval, 0.001))
+        return _trace(seconds, camera_id)
+
+
+def clamp_seconds(seconds: float) -> float:
+    return min(max(float(seconds), 0.1), PROFILE_MAX_SECONDS)
+
+
+@contextmanager
+def session():
+    """Hold this process's single profiling slot; raises ProfilerBusy if taken."""
+    if not _session.acquire(blocking=False):
+        raise ProfilerBusy("a profiling session is already running")
+    try:
+        yield
+    finally:
+        _session.release()
+
+
+# ─── Sampling ────────────────────────────────────────────────────────────────
+
+def _sample(seconds: float, camera_id: Optional[str], interval: float) -> dict:
+    wanted = PROCESSOR_THREAD_PREFIX + camera_id if camera_id else None
+    stacks: Dict[str, int] = {}
+    labels: Dict[tuple, str] = {}            # code object key → frame label cache
+    samples  = 0
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        names = {
+            t.ident: t.name for t in threading.enumerate()
+            if t.name.startswith(PROCESSOR_THREAD_PREFIX) and (wanted is None or t.name == wanted)
+        }
+        frames = sys._current_frames()
+        for ident, name in names.items():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            parts: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                key  = (code.co_filename, code.co_name, code.co_firstlineno)
+                label = labels.get(key)
+                if label is None:
+                    label = labels[key] = (
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                parts.append(label)
+                frame = frame.f_back
+            parts.append(name)
+            folded = ";".join(reversed(parts))
+            stacks[folded] = stacks.get(folded, 0) + 1
+        del frames
+        samples += 1
+        time.sleep(interval)
+
+    return {"mode": "sample", "samples": samples, "interval": interval, "stacks": stacks}
+
+
+def render_folded(stacks: Dict[str, int]) -> str:
+    """`stack;frames count` lines, heaviest first."""
+    lines = sorted(stacks.items(), key=lambda kv: kv[1], reverse=True)
+    return "".join(f"{stack} {count}\n" for stack, count in lines)
+
+
+# ─── Tracing ─────────────────────────────────────────────────────────────────
+
+def _trace(seconds: float, camera_id: Optional[str]) -> dict:
+    sink: list = []
+    metrics.set_trace_sink(sink)
+    try:
+        time.sleep(seconds)
+    finally:
+        metrics.set_trace_sink(None)
+
+    pid     = os.getpid()
+    threads = {}
+    events  = []
+    for cam, name, start, end, tid in sink:
+        if camera_id and cam != camera_id:
+            continue
+        threads[tid] = cam
+        events.append({
+            "name": name, "cat": "pipeline", "ph": "X",
+            "ts":   start * 1e6, "dur": (end - start) * 1e6,
+            "pid":  pid, "tid": tid, "args": {"camera": cam},
+        })
+    for tid, cam in threads.items():
+        events.append({
+            "name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+            "args": {"name": PROCESSOR_THREAD_PREFIX + cam},
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+# ─── Combining results from several processes ───────────────────────────────
+
+def merge(results: List[tuple]) -> dict:
+    """
+    Combine (shard label or None, result) pairs of the same mode.  Folded
+    stacks get the shard as their root frame; trace events already carry
+    each worker's pid.
+    """
+    if not results:
+        return {"traceEvents": [], "displayTimeUnit": "ms"}
+    if "stacks" in results[0][1]:
+        stacks: Dict[str, int] = {}
+        for shard, res in results:
+            for stack, count in res["stacks"].items():
+                key = f"shard-{shard};{stack}" if shard is not None else stack
+                stacks[key] = stacks.get(key, 0) + count
+        return {
+            "mode":     "sample",
+            "samples":  sum(res["samples"] for _, res in results),
+            "interval": results[0][1]["interval"],
+            "stacks":   stacks,
+        }
+    events = []
+    for shard, res in results:
+        if shard is not None and res["traceEvents"]:
+            events.append({
+                "name": "process_name", "ph": "M",
+                "pid":  res["traceEvents"][0]["pid"],
+                "args": {"name": f"shard-{shard}"},
+            })
+        events.extend(res["traceEvents"])
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
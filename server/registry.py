@@ -0,0 +1,295 @@
+"""
+Camera registry
+───────────────
+Camera configs (stream URL, zones, thresholds, intervals) persisted in the
+MongoDB `cameras` collection, so cameras registered at runtime survive a
+restart.  The hardcoded PI_CAMERAS only seed the registry: once a camera
+has a stored config, the stored version wins.
+
+Most fields can be changed on a live camera with `apply_config()` —
+zones, thresholds, intervals and priority are swapped in place on the running
+StreamProcessor and IllegalParkingDetector, so the stream stays up, the
+models stay loaded and in-flight dwell tracks are kept.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional
+
+from .admission import DEFAULT_PRIORITY, PRIORITIES
+from .db.mongo import delete_camera_config, load_camera_configs, save_camera_config
+from .detectors import parking_detector, trash_detector
+from .detectors.backends import BACKENDS, BackendSpec, backend_for
+from .detectors.parking_detector import VEHICLE_LABELS, IllegalParkingDetector, ROI_MODES
+from .detectors.zones import ZoneRules
+from .detectors.trash_detector import TrashDetector
+from .processor import COOLDOWN_SECONDS, DETECTION_INTERVAL, StreamProcessor
+
+log = logging.getLogger(__name__)
+
+# Bottom third of the 640x480 frame.
+DEFAULT_ZONES = [[(0, 320), (640, 320), (640, 480), (0, 480)]]
+
+# Fields PATCH may change on a running camera.  Anything else needs the
+# camera to be removed and registered again (e.g. a different backend).
+HOT_FIELDS = {
+    "stream_url",
+    "parking_zones",
+    "roi_mode",
+    "dwell_seconds",
+    "parking_confidence",
+    "trash_confidence",
+    "detection_interval",
+    "cooldown_seconds",
+    "priority",
+}
+
+
+@dataclass
+class CameraConfig:
+    camera_id:          str
+    stream_url:         str
+    parking_zones:      Optional[list] = None     # None → DEFAULT_ZONES
+    roi_mode:           Optional[str] = None      # None → PARKING_ROI_MODE
+    backend:            BackendSpec = None        # None → INFERENCE_BACKEND
+    dwell_seconds:      Optional[float] = None
+    parking_confidence: Optional[float] = None
+    trash_confidence:   Optional[float] = None
+    detection_interval: Optional[int] = None
+    cooldown_seconds:   Optional[float] = None
+    priority:           Optional[str] = None      # None → "normal" (see admission.py)
+    enabled:            bool = True               # False = deleted seed camera
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CameraConfig":
+        """Build and validate a config; raises ValueError on bad input."""
+        known   = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown camera fields: {', '.join(sorted(unknown))}")
+        if not data.get("camera_id") or not data.get("stream_url"):
+            raise ValueError("camera_id and stream_url are required")
+        cfg = cls(**copy.deepcopy(data))
+        cfg.validate()
+        return cfg
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def merged(self, patch: dict) -> "CameraConfig":
+        """A new config with `patch` applied on top of this one."""
+        if "camera_id" in patch and patch["camera_id"] != self.camera_id:
+            raise ValueError("camera_id cannot be changed")
+        return CameraConfig.from_dict({**self.to_dict(), **patch})
+
+    def validate(self):
+        if self.parking_zones is not None:
+            if not isinstance(self.parking_zones, list):
+                raise ValueError("parking_zones must be a list of polygons or zone rules")
+            ZoneRules.from_specs(self.parking_zones, VEHICLE_LABELS)     # raises ValueError
+        if self.roi_mode is not None and self.roi_mode not in ROI_MODES:
+            raise ValueError(f"roi_mode must be one of {', '.join(ROI_MODES)}")
+        names = self.backend.values() if isinstance(self.backend, dict) else [self.backend]
+        if any(n is not None and n not in BACKENDS for n in names):
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+        for name in ("dwell_seconds", "cooldown_seconds"):
+            value = getattr(self, name)
+            if value is not None and (not isinstance(value, (int, float)) or value < 0):
+                raise ValueError(f"{name} must be a non-negative number")
+        for name in ("parking_confidence", "trash_confidence"):
+            value = getattr(self, name)
+            if value is not None and (not isinstance(value, (int, float)) or not 0 <= value <= 1):
+                raise ValueError(f"{name} must be between 0 and 1")
+        if self.detection_interval is not None and (
+                not isinstance(self.detection_interval, int) or self.detection_interval < 1):
+            raise ValueError("detection_interval must be a positive integer")
+        if self.priority is not None and self.priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+
+    def effective(self) -> dict:
+        """Config with every None replaced by the module default it stands for."""
+        return {
+            "stream_url":         self.stream_url,
+            "parking_zones":      self.parking_zones or DEFAULT_ZONES,
+            "roi_mode":           self.roi_mode or parking_detector.ROI_MODE,
+            "dwell_seconds":      _default(self.dwell_seconds, parking_detector.DWELL_SECONDS),
+            "parking_confidence": _default(self.parking_confidence, parking_detector.CONFIDENCE_THRESHOLD),
+            "trash_confidence":   _default(self.trash_confidence, trash_detector.CONFIDENCE_THRESHOLD),
+            "detection_interval": _default(self.detection_interval, DETECTION_INTERVAL),
+            "cooldown_seconds":   _default(self.cooldown_seconds, COOLDOWN_SECONDS),
+            "priority":           self.priority or DEFAULT_PRIORITY,
+        }
+
+
+def _default(value, fallback):
+    return fallback if value is None else value
+
+
+# ─── Processor construction + live updates ───────────────────────────────────
+
+def build_detectors(cfg: CameraConfig) -> list:
+    """Build the (unloaded) detector stack for a camera."""
+    eff = cfg.effective()
+    return [
+        TrashDetector(
+            confidence=eff["trash_confidence"],
+            backend=backend_for(cfg.backend, TrashDetector.name),
+        ),
+        IllegalParkingDetector(
+            zones=eff["parking_zones"],
+            dwell_seconds=eff["dwell_seconds"],
+            confidence=eff["parking_confidence"],
+            roi_mode=eff["roi_mode"],
+            backend=backend_for(cfg.backend, IllegalParkingDetector.name),
+        ),
+    ]
+
+
+def build_processor(cfg: CameraConfig) -> StreamProcessor:
+    eff = cfg.effective()
+    return StreamProcessor(
+        camera_id=cfg.camera_id,
+        stream_url=cfg.stream_url,
+        detectors=build_detectors(cfg),
+        detection_interval=eff["detection_interval"],
+        cooldown_seconds=eff["cooldown_seconds"],
+        priority=eff["priority"],
+    )
+
+
+def apply_config(proc: StreamProcessor, old: CameraConfig, new: CameraConfig) -> List[str]:
+    """
+    Push the differences between `old` and `new` into a running processor.
+    Returns the names of the fields that changed.
+    """
+    changed = [
+        f for f in HOT_FIELDS if getattr(old, f) != getattr(new, f)
+    ]
+    cold = [
+        f.name for f in fields(CameraConfig)
+        if f.name not in HOT_FIELDS and getattr(old, f.name) != getattr(new, f.name)
+    ]
+    if cold:
+        raise ValueError(f"{', '.join(cold)} cannot be changed on a live camera — re-register it")
+    if not changed:
+        return []
+
+    eff = new.effective()
+    for det in proc.detectors:
+        if isinstance(det, IllegalParkingDetector):
+            det.configure(
+                zones=eff["parking_zones"] if "parking_zones" in changed else None,
+                dwell_seconds=eff["dwell_seconds"] if "dwell_seconds" in changed else None,
+                confidence=eff["parking_confidence"] if "parking_confidence" in changed else None,
+                roi_mode=eff["roi_mode"] if "roi_mode" in changed else None,
+            )
+        elif isinstance(det, TrashDetector) and "trash_confidence" in changed:
+            det.configure(confidence=eff["trash_confidence"])
+
+    proc.configure(
+        detection_interval=eff["detection_interval"] if "detection_interval" in changed else None,
+        cooldown_seconds=eff["cooldown_seconds"] if "cooldown_seconds" in changed else None,
+        stream_url=eff["stream_url"] if "stream_url" in changed else None,
+        priority=eff["priority"] if "priority" in changed else None,
+    )
+    log.info("[%s] Config updated live: %s", new.camera_id, ", ".join(sorted(changed)))
+    return sorted(changed)
+
+
+# ─── Persistent registry ─────────────────────────────────────────────────────
+
+def stored_config(camera_id: str) -> Optional[CameraConfig]:
+    """Read one camera's stored config straight from MongoDB (offline tools)."""
+    for doc in load_camera_configs():
+        if doc.get("camera_id") == camera_id:
+            return CameraConfig.from_dict(doc)
+    return None
+
+
+class CameraRegistry:
+    """
+    In-memory view of the camera configs, written through to MongoDB.
+    Storage errors are logged and reported, never raised: a camera keeps
+    running even if its config could not be saved.
+    """
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._configs: Dict[str, CameraConfig] = {}
+        self._seeded: set = set()
+
+    def load(self, seed: List[dict]) -> List[CameraConfig]:
+        """
+        Read stored configs, add any seed camera that has never been stored,
+        and return the enabled ones.  Falls back to the seed list when the
+        database is unreachable.
+        """
+        stored: Dict[str, CameraConfig] = {}
+        try:
+            for doc in load_camera_configs():
+                try:
+                    cfg = CameraConfig.from_dict(doc)
+                except ValueError as exc:
+                    log.error("Ignoring invalid stored camera %s: %s", doc.get("camera_id"), exc)
+                    continue
+                stored[cfg.camera_id] = cfg
+            db_ok = True
+        except Exception:
+            log.exception("Camera registry unavailable — using built-in camera list only")
+            db_ok = False
+
+        with self._lock:
+            self._configs = dict(stored)
+            for raw in seed:
+                self._seeded.add(raw["camera_id"])
+                if raw["camera_id"] in self._configs:
+                    continue
+                cfg = CameraConfig.from_dict(raw)
+                self._configs[cfg.camera_id] = cfg
+                if db_ok:
+                    self._save(cfg)
+            return [c for c in self._configs.values() if c.enabled]
+
+    def get(self, camera_id: str) -> Optional[CameraConfig]:
+        with self._lock:
+            cfg = self._configs.get(camera_id)
+        return cfg if cfg is not None and cfg.enabled else None
+
+    def put(self, cfg: CameraConfig) -> bool:
+        """Store a config; returns False if it could not be persisted."""
+        with self._lock:
+            self._configs[cfg.camera_id] = cfg
+        return self._save(cfg)
+
+    def delete(self, camera_id: str) -> bool:
+        """
+        Forget a camera.  Seed cameras are kept as disabled tombstones so
+        they are not re-created from PI_CAMERAS on the next start.
+        """
+        with self._lock:
+            cfg = self._configs.pop(camera_id, None)
+            seeded = camera_id in self._seeded
+        try:
+            if seeded and cfg is not None:
+                cfg.enabled = False
+                with self._lock:
+                    self._configs[camera_id] = cfg
+                save_camera_config(cfg.to_dict())
+            else:
+                delete_camera_config(camera_id)
+            return True
+        except Exception:
+            log.exception("[%s] Could not delete stored camera config", camera_id)
+            return False
+
+    def _save(self, cfg: CameraConfig) -> bool:
+        try:
+            save_camera_config(cfg.to_dict())
+            return True
+        except Exception:
+            log.exception("[%s] Could not persist camera config", cfg.camera_id)
+            return False
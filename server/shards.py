@@ -0,0 +1,498 @@
+"""
+Sharded worker mode
+───────────────────
+Runs cameras in N worker processes instead of inside the Flask process,
+so Python work (decode, detection, tracking) is spread across cores.
+
+  front-end (Flask)                      worker processes
+  ─────────────────                      ────────────────
+  ShardedManager ── local IPC (unix socket) ──▶ ProcessorManager × N
+  RemoteProcessor proxies                 StreamProcessor threads
+
+Cameras are placed on workers by consistent hashing of camera_id, so
+adding or removing a camera never moves the others.  The front-end keeps
+the camera registry and routes feed / snapshot / stats calls to the owning
+worker; ShardedManager and RemoteProcessor expose the same methods the API
+uses on ProcessorManager and StreamProcessor, so the routes are unchanged.
+
+Enable with SHARD_WORKERS=N (0 = everything in-process, the default).
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import logging
+import multiprocessing as mp
+import os
+import queue
+import secrets
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+SHARD_WORKERS  = int(os.getenv("SHARD_WORKERS", "0"))
+RING_REPLICAS  = 64          # virtual nodes per worker on the hash ring
+CONNECT_TIMEOUT = 15         # seconds to wait for a worker to start listening
+IDLE_CONNECTIONS = 8         # per worker, kept open for reuse
+
+_FAMILY = "AF_UNIX" if sys.platform != "win32" else "AF_INET"
+
+
+# ─── Consistent hashing ──────────────────────────────────────────────────────
+
+class HashRing:
+    """Maps keys to node indices; adding a node only moves ~1/N of the keys."""
+
+    def __init__(self, nodes: int, replicas: int = RING_REPLICAS):
+        self._ring: List[Tuple[int, int]] = sorted(
+            (_hash(f"{node}:{r}"), node)
+            for node in range(nodes) for r in range(replicas)
+        )
+        self._keys = [h for h, _ in self._ring]
+
+    def node_for(self, key: str) -> int:
+        idx = bisect.bisect(self._keys, _hash(key)) % len(self._ring)
+        return self._ring[idx][1]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+# ─── Worker process ──────────────────────────────────────────────────────────
+
+class _ShardWorker:
+    """RPC endpoint wrapping a ProcessorManager inside a worker process."""
+
+    def __init__(self, index: int):
+        from .processor import ProcessorManager
+
+        self.index   = index
+        self.manager = ProcessorManager()
+        self.configs: Dict[str, object] = {}
+        self.stopped = threading.Event()
+
+    # ─── RPC methods ─────────────────────────────────────────────────────
+
+    def ping(self) -> int:
+        return self.index
+
+    def add_camera(self, cfg_dict: dict):
+        from .registry import CameraConfig
+
+        cfg = CameraConfig.from_dict(cfg_dict)
+        self.manager.add_camera(cfg)
+        self.configs[cfg.camera_id] = cfg
+
+    def remove(self, camera_id: str):
+        self.configs.pop(camera_id, None)
+        self.manager.remove(camera_id)
+
+    def reconfigure(self, camera_id: str, old_dict: dict, new_dict: dict) -> List[str]:
+        from .registry import CameraConfig
+
+        new = CameraConfig.from_dict(new_dict)
+        changed = self.manager.reconfigure(camera_id, CameraConfig.from_dict(old_dict), new)
+        self.configs[camera_id] = new
+        return changed
+
+    def all_stats(self) -> List[dict]:
+        return [{**s, "shard": self.index} for s in self.manager.all_stats()]
+
+    def get_stats(self, camera_id: str) -> dict:
+        return {**self._proc(camera_id).get_stats(), "shard": self.index}
+
+    def get_latest_frame(self, camera_id: str) -> Optional[bytes]:
+        return self._proc(camera_id).get_latest_frame()
+
+    def get_latest_meta(self, camera_id: str) -> dict:
+        return self._proc(camera_id).get_latest_meta()
+
+    def wait_for_frame(self, camera_id: str, after_seq: int, timeout: float):
+        return self._proc(camera_id).wait_for_frame(after_seq, timeout)
+
+    def loader_status(self) -> dict:
+        return self.manager.loader.status()
+
+    def retry_models(self) -> int:
+        return self.manager.loader.retry_failed()
+
+    def admission_status(self) -> dict:
+        return self.manager.admission.status()
+
+    def metrics(self) -> list:
+        from . import metrics
+        return metrics.collect()
+
+    def profile(self, seconds: float, mode: str, camera_id: Optional[str], interval: float) -> dict:
+        from . import profiler
+        return profiler.profile(seconds, mode, camera_id, interval)
+
+    def stop_all(self):
+        self.manager.stop_all()
+        self.stopped.set()
+
+    # ─── Internal helpers ────────────────────────────────────────────────
+
+    def _proc(self, camera_id: str):
+        proc = self.manager.get(camera_id)
+        if proc is None:
+            raise KeyError(f"Camera '{camera_id}' is not on shard {self.index}")
+        return proc
+
+    def serve(self, address, authkey: bytes):
+        listener = Listener(address, family=_FAMILY, authkey=authkey)
+        threading.Thread(target=self._accept, args=(listener,), daemon=True).start()
+        self.stopped.wait()
+        listener.close()
+
+    def _accept(self, listener: Listener):
+        while not self.stopped.is_set():
+            try:
+                conn = listener.accept()
+            except Exception:
+                if self.stopped.is_set():
+                    return
+                log.exception("[shard %d] accept failed", self.index)
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if method.startswith("_"):
+                        raise AttributeError(method)
+                    result = ("ok", getattr(self, method)(*args))
+                except Exception as exc:
+                    result = ("err", (type(exc).__name__, str(exc)))
+                try:
+                    conn.send(result)
+                except (EOFError, OSError):
+                    return
+
+
+def _worker_main(index: int, address, authkey: bytes):
+    # .env is loaded again here: spawned workers start from a clean interpreter.
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s [%(levelname)s] shard-{index} %(name)s - %(message)s",
+    )
+    log.info("[shard %d] worker started (pid %d)", index, os.getpid())
+    _ShardWorker(index).serve(address, authkey)
+
+
+# ─── Front-end side ──────────────────────────────────────────────────────────
+
+class ShardError(RuntimeError):
+    """
+    A worker call failed: `remote_type` is the name of the exception the
+    worker raised, or None when the worker could not be reached.
+    """
+
+    def __init__(self, message: str, remote_type: Optional[str] = None):
+        super().__init__(message)
+        self.remote_type = remote_type
+
+
+class ShardClient:
+    """Thread-safe RPC client for one worker, backed by a small connection pool."""
+
+    def __init__(self, address, authkey: bytes):
+        self.address  = address
+        self._authkey = authkey
+        self._idle: "queue.LifoQueue" = queue.LifoQueue(maxsize=IDLE_CONNECTIONS)
+
+    def call(self, method: str, *args):
+        try:
+            conn = self._checkout()
+        except OSError as exc:
+            raise ShardError(f"worker at {self.address} unreachable: {exc}") from exc
+        try:
+            conn.send((method, args))
+            status, value = conn.recv()
+        except (EOFError, OSError) as exc:
+            conn.close()
+            raise ShardError(f"worker at {self.address} unreachable: {exc}") from exc
+        self._checkin(conn)
+        if status == "err":
+            remote_type, message = value
+            raise ShardError(f"{remote_type}: {message}", remote_type)
+        return value
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return Client(self.address, family=_FAMILY, authkey=self._authkey)
+
+    def _checkin(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+class RemoteProcessor:
+    """Stand-in for a StreamProcessor that lives in a worker process."""
+
+    def __init__(self, manager: "ShardedManager", camera_id: str):
+        self._manager  = manager
+        self.camera_id = camera_id
+
+    def _call(self, method: str, *args):
+        return self._manager.call_for(self.camera_id, method, self.camera_id, *args)
+
+    @property
+    def running(self) -> bool:
+        return True             # the worker's processor runs until the camera is removed
+
+    def get_latest_frame(self) -> Optional[bytes]:
+        return self._call("get_latest_frame")
+
+    def get_latest_meta(self) -> dict:
+        return self._call("get_latest_meta")
+
+    def wait_for_frame(self, after_seq: int = 0, timeout: float = 1.0):
+        return self._call("wait_for_frame", after_seq, timeout)
+
+    def get_stats(self) -> dict:
+        return self._call("get_stats")
+
+
+class _ShardedLoaderView:
+    """Aggregates ModelLoader.status() across workers for /health."""
+
+    def __init__(self, manager: "ShardedManager"):
+        self._manager = manager
+
+    def status(self) -> dict:
+        total = {"ready": True, "degraded": False, "pending": 0, "loading": 0, "loaded": 0,
+                 "failed": 0, "errors": []}
+        for st in self._manager.broadcast("loader_status"):
+            total["ready"]    = total["ready"] and st["ready"]
+            total["degraded"] = total["degraded"] or st["degraded"]
+            for key in ("pending", "loading", "loaded", "failed"):
+                total[key] += st[key]
+            total["errors"].extend(st["errors"])
+        return total
+
+    def retry_failed(self) -> int:
+        return sum(self._manager.broadcast("retry_models"))
+
+
+class _ShardedAdmissionView:
+    """Each worker runs its own admission controller; /health lists them all."""
+
+    def __init__(self, manager: "ShardedManager"):
+        self._manager = manager
+
+    def status(self) -> dict:
+        shards = self._manager.broadcast("admission_status")
+        return {
+            "level":  max((st["level"] for st in shards), default=0),
+            "shards": shards,
+        }
+
+
+class ShardedManager:
+    """
+    Drop-in replacement for ProcessorManager that spreads cameras over
+    `workers` processes.  A worker that dies is restarted and gets its
+    cameras back on the next call that reaches it.
+    """
+
+    def __init__(self, workers: int = SHARD_WORKERS):
+        self.workers   = workers
+        self.ring      = HashRing(workers)
+        self.loader    = _ShardedLoaderView(self)
+        self.admission = _ShardedAdmissionView(self)
+        self._authkey  = secrets.token_bytes(32)
+        self._ctx      = mp.get_context("spawn")   # no fork after threads exist
+        self._tmpdir   = tempfile.mkdtemp(prefix="smartcity-shards-")
+        self._lock     = threading.Lock()
+        self._procs:   List[Optional[mp.Process]] = [None] * workers
+        self._clients: List[Optional[ShardClient]] = [None] * workers
+        self._configs: Dict[str, object] = {}     # camera_id → CameraConfig
+        for index in range(workers):
+            self._spawn(index)
+        log.info("Sharded mode: %d worker processes", workers)
+
+    # ─── ProcessorManager interface ──────────────────────────────────────
+
+    def add_camera(self, cfg):
+        self._config_call(cfg.camera_id, "add_camera", cfg.to_dict())
+        self._configs[cfg.camera_id] = cfg          # only once the worker runs it
+
+    def reconfigure(self, camera_id: str, old, new) -> List[str]:
+        changed = self._config_call(camera_id, "reconfigure", camera_id, old.to_dict(), new.to_dict())
+        self._configs[camera_id] = new
+        return changed
+
+    def remove(self, camera_id: str):
+        if self._configs.pop(camera_id, None) is not None:
+            try:
+                self._client(self.ring.node_for(camera_id)).call("remove", camera_id)
+            except ShardError:
+                log.exception("[%s] remove failed on its shard", camera_id)
+
+    def get(self, camera_id: str) -> Optional[RemoteProcessor]:
+        if camera_id not in self._configs:
+            return None
+        return RemoteProcessor(self, camera_id)
+
+    def all_stats(self) -> List[dict]:
+        stats: List[dict] = []
+        for shard_stats in self.broadcast("all_stats"):
+            stats.extend(shard_stats)
+        return stats
+
+    def stop_all(self):
+        for index in range(self.workers):
+            client, proc = self._clients[index], self._procs[index]
+            try:
+                if client is not None:
+                    client.call("stop_all")
+            except ShardError:
+                pass
+            if client is not None:
+                client.close()
+            if proc is not None:
+                proc.join(timeout=10)
+                if proc.is_alive():
+                    proc.terminate()
+        self._configs.clear()
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    # ─── Routing ─────────────────────────────────────────────────────────
+
+    def call_for(self, camera_id: str, method: str, *args):
+        """Call `method` on the worker that owns `camera_id`."""
+        return self._client(self.ring.node_for(camera_id)).call(method, *args)
+
+    def _config_call(self, camera_id: str, method: str, *args):
+        """call_for() a config change; a config the worker rejects raises ValueError."""
+        try:
+            return self.call_for(camera_id, method, *args)
+        except ShardError as exc:
+            if exc.remote_type in ("ValueError", "TypeError"):    # the config was rejected
+                raise ValueError(str(exc).split(": ", 1)[1]) from exc
+            raise
+
+    def broadcast(self, method: str, *args) -> list:
+        """Call `method` on every worker; unreachable workers are skipped."""
+        results = []
+        for index in range(self.workers):
+            try:
+                results.append(self._client(index).call(method, *args))
+            except ShardError:
+                log.exception("[shard %d] %s failed", index, method)
+        return results
+
+    def collect_metrics(self) -> list:
+        """(shard label, metric families) for every reachable worker."""
+        groups = []
+        for index in range(self.workers):
+            try:
+                groups.append((str(index), self._client(index).call("metrics")))
+            except ShardError:
+                log.exception("[shard %d] metrics failed", index)
+        return groups
+
+    def profile(self, seconds: float, mode: str, camera_id: Optional[str], interval: float) -> list:
+        """
+        Profile the workers concurrently (only the owner of `camera_id` if
+        given); returns (shard label, result) pairs for profiler.merge().
+        """
+        from . import profiler
+
+        seconds = profiler.clamp_seconds(seconds)
+        indexes = [self.ring.node_for(camera_id)] if camera_id else range(self.workers)
+        with profiler.session(), ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                i: pool.submit(self._client(i).call, "profile", seconds, mode, camera_id, interval)
+                for i in indexes
+            }
+            results = []
+            for index, future in futures.items():
+                try:
+                    results.append((str(index), future.result()))
+                except ShardError:
+                    log.exception("[shard %d] profile failed", index)
+        return results
+
+    # ─── Worker lifecycle ────────────────────────────────────────────────
+
+    def _address(self, index: int):
+        if _FAMILY == "AF_UNIX":
+            path = os.path.join(self._tmpdir, f"shard-{index}.sock")
+            if os.path.exists(path):
+                os.remove(path)
+            return path
+        import socket
+        with socket.socket() as sock:       # pick a free loopback port
+            sock.bind(("127.0.0.1", 0))
+            return ("127.0.0.1", sock.getsockname()[1])
+
+    def _spawn(self, index: int):
+        address = self._address(index)
+
+        proc = self._ctx.Process(
+            target=_worker_main, args=(index, address, self._authkey),
+            name=f"shard-{index}", daemon=True,
+        )
+        proc.start()
+        client = ShardClient(address, self._authkey)
+
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while True:
+            try:
+                client.call("ping")
+                break
+            except (ShardError, OSError):
+                if time.monotonic() > deadline or not proc.is_alive():
+                    raise ShardError(f"shard {index} did not start")
+                time.sleep(0.1)
+
+        self._procs[index], self._clients[index] = proc, client
+
+    def _client(self, index: int) -> ShardClient:
+        proc = self._procs[index]
+        if proc is not None and proc.is_alive():
+            return self._clients[index]
+
+        with self._lock:
+            proc = self._procs[index]
+            if proc is None or not proc.is_alive():
+                log.error("[shard %d] worker died — restarting", index)
+                if self._clients[index] is not None:
+                    self._clients[index].close()
+                self._spawn(index)
+                for camera_id, cfg in list(self._configs.items()):
+                    if self.ring.node_for(camera_id) == index:
+                        self._clients[index].call("add_camera", cfg.to_dict())
+        return self._clients[index]
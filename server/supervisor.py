@@ -0,0 +1,195 @@
+"""
+Stream supervisor
+─────────────────
+Decides when a camera's processor may try to (re)connect, so offline Pis
+cost a cheap HTTP probe every so often instead of a blocked thread and a
+log line every few seconds.
+
+  * Backoff — after each failed attempt the wait doubles from
+    RECONNECT_BASE_SECONDS up to RECONNECT_MAX_SECONDS, with ±RECONNECT_JITTER
+    so cameras that went down together do not retry in lockstep.  A stream
+    that drops after running is retried after the base delay.
+  * Probe — before opening an HTTP stream, GET <scheme>://<host>:<port>/health
+    (the Pi node's endpoint) with a PROBE_TIMEOUT.  Any HTTP response means
+    the host is up; only connection errors and timeouts count as down.
+  * Circuit breaker — per camera:
+        closed     connected, or fewer than BREAKER_THRESHOLD failures in a row
+        open       BREAKER_THRESHOLD or more failures in a row; until a probe
+                   answers, attempts stop at the probe
+        half_open  a probe answered; a full open attempt is under way
+  * Concurrency — at most RECONNECT_CONCURRENCY probes / opens run at once
+    across all cameras in the process (cv2.VideoCapture can block for the
+    FFmpeg timeout).
+
+State is shown per camera under "link" in /api/cameras.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+log = logging.getLogger(__name__)
+
+RECONNECT_BASE_SECONDS = float(os.getenv("RECONNECT_BASE_SECONDS", "3"))
+RECONNECT_MAX_SECONDS  = float(os.getenv("RECONNECT_MAX_SECONDS", "120"))
+RECONNECT_JITTER       = float(os.getenv("RECONNECT_JITTER", "0.2"))      # ± fraction of the delay
+RECONNECT_CONCURRENCY  = int(os.getenv("RECONNECT_CONCURRENCY", "4"))
+BREAKER_THRESHOLD      = int(os.getenv("BREAKER_THRESHOLD", "3"))
+PROBE_TIMEOUT          = float(os.getenv("PROBE_TIMEOUT", "2"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+BREAKER_STATES = (CLOSED, HALF_OPEN, OPEN)       # index = metric value
+
+_slots = threading.BoundedSemaphore(max(1, RECONNECT_CONCURRENCY))
+
+
+def health_url(stream_url: str) -> Optional[str]:
+    """The /health URL on the host serving `stream_url`; None if not HTTP."""
+    parts = urlsplit(stream_url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc}/health"
+
+
+def probe(stream_url: str, timeout: float = PROBE_TIMEOUT) -> bool:
+    """True if the stream's host answers HTTP (any status); non-HTTP: True."""
+    url = health_url(stream_url)
+    if url is None:
+        return True
+    try:
+        with urllib.request.urlopen(url, timeout=timeout):
+            return True
+    except urllib.error.HTTPError:
+        return True             # reachable, just no (working) /health
+    except (OSError, ValueError):
+        return False
+
+
+class StreamSupervisor:
+    """
+    Reconnect policy of one camera.  The processor thread calls connect()
+    until it returns a source, then disconnected() when the stream drops;
+    wake() (stop, new URL) cuts a pending wait short.
+    """
+
+    def __init__(self, camera_id: str, on_state: Optional[Callable[[str], None]] = None):
+        self.camera_id  = camera_id
+        self.state      = CLOSED
+        self.failures   = 0                  # consecutive failed attempts
+        self.attempts   = 0
+        self.last_error: Optional[str] = None
+        self._next_at   = 0.0                # monotonic time of the next attempt
+        self._on_state  = on_state
+        self._wake      = threading.Event()
+
+    def connect(
+        self, open_source: Callable[[], object], stream_url: str, probe_first: bool = True,
+        cancelled: Callable[[], bool] = lambda: False,
+    ):
+        """
+        Wait out the backoff, then probe and open under a reconnect slot.
+        Returns the opened source, or None (failed, or cancelled meanwhile).
+        """
+        if not self._sleep(cancelled) or not self._acquire_slot(cancelled):
+            return None
+        error = "stream did not open"
+        try:
+            self.attempts += 1
+            if probe_first and not probe(stream_url):
+                self._failed(f"no answer from {health_url(stream_url)}")
+                return None
+            if self.state == OPEN:
+                self._set_state(HALF_OPEN)
+            source = open_source()
+        except Exception as exc:
+            log.exception("[%s] Opening stream raised", self.camera_id)
+            source, error = None, str(exc)
+        finally:
+            _slots.release()
+
+        if source is None:
+            self._failed(error)
+            return None
+        if self.failures:
+            log.info("[%s] Stream back after %d failed attempt(s)", self.camera_id, self.failures)
+        self.failures   = 0
+        self.last_error = None
+        self._set_state(CLOSED)
+        return source
+
+    def disconnected(self, reason: str = "stream dropped"):
+        """The stream was up and died: retry after the base delay."""
+        self.last_error = reason
+        self._next_at   = time.monotonic() + self._jittered(RECONNECT_BASE_SECONDS)
+
+    def reset(self):
+        """Retry at once (e.g. the stream URL changed)."""
+        self.failures = 0
+        self._next_at = 0.0
+        self._set_state(CLOSED)
+        self.wake()
+
+    def wake(self):
+        self._wake.set()
+
+    def status(self) -> dict:
+        return {
+            "state":       self.state,
+            "failures":    self.failures,
+            "attempts":    self.attempts,
+            "retry_in":    round(max(0.0, self._next_at - time.monotonic()), 1),
+            "last_error":  self.last_error,
+        }
+
+    # ─── Internal helpers ────────────────────────────────────────────────
+
+    def _failed(self, reason: str):
+        self.failures  += 1
+        self.last_error = reason
+        delay = self._jittered(min(
+            RECONNECT_MAX_SECONDS, RECONNECT_BASE_SECONDS * 2 ** (self.failures - 1),
+        ))
+        self._next_at = time.monotonic() + delay
+        if self.failures >= BREAKER_THRESHOLD and self.state != OPEN:
+            self._set_state(OPEN)
+            log.warning("[%s] Stream down after %d attempts (%s) — circuit open, probing every ≤%.0fs",
+                        self.camera_id, self.failures, reason, RECONNECT_MAX_SECONDS)
+        elif self.failures == 1:
+            log.warning("[%s] Stream unavailable (%s) — retrying in %.1fs", self.camera_id, reason, delay)
+        else:
+            log.debug("[%s] Attempt %d failed (%s) — retrying in %.1fs",
+                      self.camera_id, self.failures, reason, delay)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            if self._on_state is not None:
+                self._on_state(state)
+
+    @staticmethod
+    def _jittered(delay: float) -> float:
+        return delay * (1 + random.uniform(-RECONNECT_JITTER, RECONNECT_JITTER))
+
+    def _sleep(self, cancelled: Callable[[], bool]) -> bool:
+        """Wait for the next attempt time; False if cancelled meanwhile."""
+        while not cancelled():
+            remaining = self._next_at - time.monotonic()
+            if remaining <= 0:
+                return True
+            self._wake.wait(remaining)
+            self._wake.clear()
+        return False
+
+    def _acquire_slot(self, cancelled: Callable[[], bool]) -> bool:
+        while not cancelled():
+            if _slots.acquire(timeout=0.5):
+                return True
+        return False
@@ -0,0 +1,282 @@
+"""
+Event clips — a short pre/post-event video as evidence, next to the snapshot.
+
+Every StreamProcessor keeps the JPEG bytes it serves in a FrameRing covering
+the last CLIP_PRE_SECONDS + CLIP_POST_SECONDS.  When an event fires, the
+clip writer thread waits until the post-event window has been captured and
+writes the buffered frames into an MJPEG AVI as they are — nothing is
+decoded or re-encoded.
+
+Memory is capped per camera (CLIP_BUFFER_MB) and across all cameras
+(CLIP_MEMORY_MB); under pressure a ring drops its oldest frames first, so a
+clip may start later than CLIP_PRE_SECONDS before the event.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from ..metrics import QUEUE_DEPTH
+from .frames import jpeg_size
+
+log = logging.getLogger(__name__)
+
+CLIP_DIR          = os.getenv("CLIP_DIR", "clips")
+CLIP_PRE_SECONDS  = float(os.getenv("CLIP_PRE_SECONDS", "5"))
+CLIP_POST_SECONDS = float(os.getenv("CLIP_POST_SECONDS", "5"))
+CLIP_BUFFER_MB    = float(os.getenv("CLIP_BUFFER_MB", "16"))     # per camera
+CLIP_MEMORY_MB    = float(os.getenv("CLIP_MEMORY_MB", "256"))    # all cameras
+CLIP_QUEUE_SIZE   = 32
+# Event labels that get a clip (comma-separated).
+CLIP_LABELS = frozenset(
+    s.strip() for s in os.getenv("CLIP_LABELS", "illegal_parking").split(",") if s.strip()
+)
+
+
+# ─── Ring buffer ─────────────────────────────────────────────────────────────
+
+class _MemoryBudget:
+    """Bytes held by all rings in this process."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def add(self, n: int):
+        with self._lock:
+            self.total += n
+
+
+_budget = _MemoryBudget(int(CLIP_MEMORY_MB * 1024 * 1024))
+
+
+class FrameRing:
+    """
+    The last `seconds` of JPEG frames of one camera, as (monotonic ts, bytes).
+    Pushed from the processor thread, read by the clip writer.
+    """
+
+    def __init__(
+        self,
+        seconds: float = CLIP_PRE_SECONDS + CLIP_POST_SECONDS + 1.0,
+        max_bytes: int = int(CLIP_BUFFER_MB * 1024 * 1024),
+        budget: _MemoryBudget = _budget,
+    ):
+        self.seconds   = seconds
+        self.max_bytes = max_bytes
+        self._budget   = budget
+        self._frames: deque = deque()
+        self._bytes    = 0
+        self._lock     = threading.Lock()
+
+    def push(self, jpeg: bytes, ts: Optional[float] = None):
+        ts = time.monotonic() if ts is None else ts
+        budget = self._budget
+        with self._lock:
+            self._frames.append((ts, jpeg))
+            self._bytes += len(jpeg)
+            budget.add(len(jpeg))
+            horizon = ts - self.seconds
+            freed   = 0
+            # Always keep the newest frame; anything older goes first when
+            # it is out of the window or either cap is exceeded.
+            while len(self._frames) > 1 and (
+                self._frames[0][0] < horizon
+                or self._bytes > self.max_bytes
+                or budget.total - freed > budget.limit
+            ):
+                _, old = self._frames.popleft()
+                self._bytes -= len(old)
+                freed += len(old)
+            if freed:
+                budget.add(-freed)
+
+    def window(self, start: float, end: float) -> List[Tuple[float, bytes]]:
+        """Frames captured between `start` and `end` (monotonic seconds)."""
+        with self._lock:
+            return [(ts, jpeg) for ts, jpeg in self._frames if start <= ts <= end]
+
+    def clear(self):
+        with self._lock:
+            self._budget.add(-self._bytes)
+            self._frames.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            span = self._frames[-1][0] - self._frames[0][0] if self._frames else 0.0
+            return {
+                "frames":  len(self._frames),
+                "bytes":   self._bytes,
+                "seconds": round(span, 2),
+            }
+
+
+# ─── Clip writer ─────────────────────────────────────────────────────────────
+
+class ClipWriter:
+    """
+    One background thread per process.  Clips are due in submission order
+    (the post-event window is the same for all), so a FIFO queue suffices.
+    """
+
+    def __init__(self, directory: str = CLIP_DIR, max_pending: int = CLIP_QUEUE_SIZE):
+        self.directory = directory
+        self._queue: queue.Queue = queue.Queue(max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(
+        self, ring: FrameRing, camera_id: str, label: str, at: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Schedule a clip of `ring` around monotonic time `at` (default: now).
+        Returns the path the clip will be written to, or None if the queue
+        is full.
+        """
+        at       = time.monotonic() if at is None else at
+        ts       = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        filename = f"{camera_id}_{label}_{ts}_{uuid.uuid4().hex[:6]}.avi"
+        path     = os.path.join(self.directory, filename)
+        try:
+            self._queue.put_nowait((at, ring, path))
+        except queue.Full:
+            log.warning("[%s] Clip queue full — no clip for this %s event", camera_id, label)
+            return None
+        QUEUE_DEPTH.labels("clip_write").set(self._queue.qsize())
+        self._ensure_thread()
+        return path
+
+    def release(self, ring: FrameRing):
+        """
+        Free `ring` (its camera stopped) once the clips already queued for
+        it are written; frees it at once if nothing is pending.
+        """
+        if self._queue.unfinished_tasks == 0:
+            ring.clear()
+            return
+        self._queue.put((None, ring, None))     # may block briefly when full
+        self._ensure_thread()
+
+    def drain(self, timeout: float = CLIP_POST_SECONDS + 5.0) -> bool:
+        """Wait for queued clips to be written; False if `timeout` ran out."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _ensure_thread(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="clip-writer")
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            at, ring, path = self._queue.get()
+            try:
+                if path is None:                # release() marker
+                    ring.clear()
+                else:
+                    self._write(at, ring, path)
+            finally:
+                self._queue.task_done()
+                QUEUE_DEPTH.labels("clip_write").set(self._queue.qsize())
+
+    @staticmethod
+    def _write(at: float, ring: FrameRing, path: str):
+        delay = at + CLIP_POST_SECONDS - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        frames = ring.window(at - CLIP_PRE_SECONDS, at + CLIP_POST_SECONDS)
+        if not frames:
+            log.warning("No buffered frames for clip %s", path)
+            return
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            write_mjpeg_avi(path, frames)
+        except Exception:
+            log.exception("Clip write failed: %s", path)
+
+
+_writer: Optional[ClipWriter] = None
+
+
+def clip_writer() -> ClipWriter:
+    """The process-wide ClipWriter (created on first use)."""
+    global _writer
+    if _writer is None:
+        _writer = ClipWriter()
+    return _writer
+
+
+# ─── MJPEG AVI ───────────────────────────────────────────────────────────────
+
+def _chunk(fourcc: bytes, data: bytes) -> bytes:
+    pad = b"\0" if len(data) % 2 else b""
+    return fourcc + struct.pack("<I", len(data)) + data + pad
+
+
+def _list(kind: bytes, data: bytes) -> bytes:
+    return _chunk(b"LIST", kind + data)
+
+
+def write_mjpeg_avi(path: str, frames: List[Tuple[float, bytes]]):
+    """
+    Write (ts, jpeg) frames to an AVI 1.0 file with an MJPG video stream.
+    The frame rate is the average over the clip, so it plays back at
+    roughly real time.  Written to a temporary name and renamed into place.
+    """
+    size = jpeg_size(frames[0][1])
+    if size is None:
+        raise ValueError("No SOF marker in JPEG")
+    width, height = size
+    span = frames[-1][0] - frames[0][0]
+    fps  = (len(frames) - 1) / span if len(frames) > 1 and span > 0 else 1.0
+    biggest = max(len(jpeg) for _, jpeg in frames)
+
+    avih = struct.pack(
+        "<IIIIIIIIII16x",
+        int(1e6 / fps),                 # dwMicroSecPerFrame
+        int(biggest * fps),             # dwMaxBytesPerSec
+        0, 0x10,                        # padding, AVIF_HASINDEX
+        len(frames), 0, 1,              # total frames, initial frames, streams
+        biggest, width, height,
+    )
+    strh = struct.pack(
+        "<4s4sIHHIIIIIIiI4h",
+        b"vids", b"MJPG", 0, 0, 0, 0,
+        1000, int(round(fps * 1000)),   # dwScale, dwRate
+        0, len(frames), biggest, -1, 0,
+        0, 0, width, height,
+    )
+    strf = struct.pack(
+        "<IiiHH4sIiiII",
+        40, width, height, 1, 24, b"MJPG", width * height * 3, 0, 0, 0, 0,
+    )
+    hdrl = _list(b"hdrl", _chunk(b"avih", avih) + _list(b"strl", _chunk(b"strh", strh) + _chunk(b"strf", strf)))
+
+    movi  = bytearray()
+    index = bytearray()
+    for _, jpeg in frames:
+        offset = 4 + len(movi)          # relative to the 'movi' fourcc
+        movi  += _chunk(b"00dc", jpeg)
+        index += struct.pack("<4sIII", b"00dc", 0x10, offset, len(jpeg))
+    body = hdrl + _list(b"movi", bytes(movi)) + _chunk(b"idx1", bytes(index))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(b"RIFF" + struct.pack("<I", 4 + len(body)) + b"AVI " + body)
+    os.replace(tmp, path)
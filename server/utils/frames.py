@@ -0,0 +1,108 @@
+"""
+Frame ingest helpers — JPEG header sniffing, reduced-size decoding and
+resizing into a reused buffer, so the processor never allocates a fresh
+full-size array per frame just to end up at FRAME_RESIZE.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# IMREAD_REDUCED_* flags by downscale factor, largest first.
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Start-of-frame markers that carry the image dimensions.
+_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF,
+}
+
+
+def jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Return (width, height) from a JPEG's SOF header without decoding it."""
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i, n = 2, len(data)
+    while i + 4 <= n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:            # fill byte
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        seg_len = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker in _SOF_MARKERS:
+            if i + 9 > n:
+                return None
+            h, w = struct.unpack(">HH", data[i + 5:i + 9])
+            return w, h
+        if marker == 0xDA:            # start of scan — no SOF found before it
+            return None
+        i += 2 + seg_len
+    return None
+
+
+class FrameDecoder:
+    """
+    Turns camera frames into `size` (w, h) BGR arrays as cheaply as possible.
+
+    - frames already at `size` are returned untouched (no resize, no copy);
+    - JPEGs much larger than `size` are decoded with IMREAD_REDUCED_* so
+      libjpeg does most of the downscaling during the IDCT;
+    - any remaining resize writes into a buffer reused across frames.
+
+    The returned array may be that shared buffer: it is only valid until
+    the next decode()/fit() call, so copy it if it must outlive the frame.
+    """
+
+    def __init__(self, size: Tuple[int, int]):
+        self.size = size
+        self._buf: Optional[np.ndarray] = None
+
+    def decode(self, jpeg: bytes) -> Optional[np.ndarray]:
+        """Decode a JPEG straight to `size`; None if the bytes are not an image."""
+        frame = self.imdecode(jpeg)
+        if frame is None:
+            return None
+        return self.fit(frame)
+
+    def imdecode(self, jpeg: bytes) -> Optional[np.ndarray]:
+        """
+        Decode step of decode() on its own: the JPEG at the smallest reduced
+        size that still covers `size`, not yet resized.
+        """
+        flag = cv2.IMREAD_COLOR
+        src  = jpeg_size(jpeg)
+        if src is not None:
+            flag = self._reduced_flag(*src)
+        return cv2.imdecode(np.frombuffer(jpeg, np.uint8), flag)
+
+    def fit(self, frame: np.ndarray) -> np.ndarray:
+        """Resize a decoded BGR frame to `size`, skipping the work when it matches."""
+        w, h = self.size
+        if frame.shape[1] == w and frame.shape[0] == h:
+            return frame
+        if self._buf is None or self._buf.shape != (h, w, frame.shape[2]):
+            self._buf = np.empty((h, w, frame.shape[2]), dtype=np.uint8)
+        return cv2.resize(frame, (w, h), dst=self._buf)
+
+    def _reduced_flag(self, src_w: int, src_h: int) -> int:
+        w, h = self.size
+        for factor, flag in _REDUCED_FLAGS:
+            # Only reduce while the result still covers the target size,
+            # so the final step is always a (cheap) downscale.
+            if src_w // factor >= w and src_h // factor >= h:
+                return flag
+        return cv2.IMREAD_COLOR
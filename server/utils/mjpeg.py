@@ -0,0 +1,141 @@
+"""
+MJPEG stream reader — pulls raw JPEG parts out of a
+multipart/x-mixed-replace HTTP stream (the format served by
+pi_node/stream.py) without decoding them, so the processor can
+pass the camera's own bytes straight through to viewers.
+"""
+
+from __future__ import annotations
+
+import logging
+import urllib.request
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE     = 64 * 1024
+MAX_PART_BYTES = 8 * 1024 * 1024    # give up on a part larger than this
+
+_SOI = b"\xff\xd8"
+_EOI = b"\xff\xd9"
+
+
+def is_mjpeg_content_type(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.lower().startswith("multipart/x-mixed-replace")
+
+
+class MJPEGReader:
+    """
+    Minimal multipart JPEG reader.
+
+    Parts are delimited by their Content-Length header when the server
+    sends one, otherwise by the JPEG SOI/EOI markers.
+
+    Usage
+    ─────
+        reader = MJPEGReader("http://10.0.0.5:5000/video_feed")
+        if reader.open():
+            jpeg = reader.read()     # bytes, or None on EOF/error
+        reader.release()
+    """
+
+    yields_jpeg = True      # read() returns encoded bytes, not arrays
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url      = url
+        self.timeout  = timeout
+        self._resp    = None
+        self._buf     = bytearray()
+
+    # ─── Public API ───────────────────────────────────────────────────────
+
+    def open(self) -> bool:
+        """Connect and return True when the server answered with an MJPEG stream."""
+        try:
+            self._resp = urllib.request.urlopen(self.url, timeout=self.timeout)
+        except Exception as exc:
+            log.debug("MJPEG open failed for %s: %s", self.url, exc)
+            self._resp = None
+            return False
+
+        if not is_mjpeg_content_type(self._resp.headers.get("Content-Type")):
+            self.release()
+            return False
+        return True
+
+    def isOpened(self) -> bool:
+        return self._resp is not None
+
+    def read(self) -> Optional[bytes]:
+        """Return the next JPEG part, or None when the stream ended or broke."""
+        if self._resp is None:
+            return None
+        try:
+            return self._read_part()
+        except Exception as exc:
+            log.debug("MJPEG read failed for %s: %s", self.url, exc)
+            return None
+
+    def release(self):
+        if self._resp is not None:
+            try:
+                self._resp.close()
+            except Exception:
+                pass
+        self._resp = None
+        self._buf.clear()
+
+    # ─── Internal helpers ────────────────────────────────────────────────
+
+    def _fill(self) -> bool:
+        chunk = self._resp.read1(CHUNK_SIZE)
+        if not chunk:
+            return False
+        self._buf += chunk
+        return True
+
+    def _read_part(self) -> Optional[bytes]:
+        # Locate the start of the next part's headers or the JPEG itself.
+        while True:
+            soi = self._buf.find(_SOI)
+            hdr = self._buf.find(b"\r\n\r\n")
+            if soi >= 0 or hdr >= 0:
+                break
+            if len(self._buf) > MAX_PART_BYTES or not self._fill():
+                return None
+
+        length: Optional[int] = None
+        if hdr >= 0 and (soi < 0 or hdr < soi):
+            length = _content_length(bytes(self._buf[:hdr]))
+            del self._buf[:hdr + 4]
+
+        if length is not None:
+            while len(self._buf) < length:
+                if length > MAX_PART_BYTES or not self._fill():
+                    return None
+            part = bytes(self._buf[:length])
+            del self._buf[:length]
+            return part
+
+        # No Content-Length: cut between the SOI and EOI markers.
+        while True:
+            soi = self._buf.find(_SOI)
+            if soi >= 0:
+                eoi = self._buf.find(_EOI, soi + 2)
+                if eoi >= 0:
+                    part = bytes(self._buf[soi:eoi + 2])
+                    del self._buf[:eoi + 2]
+                    return part
+            if len(self._buf) > MAX_PART_BYTES or not self._fill():
+                return None
+
+
+def _content_length(header_block: bytes) -> Optional[int]:
+    for line in header_block.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            try:
+                return int(value.strip())
+            except ValueError:
+                return None
+    return None
@@ -1,19 +1,49 @@
 """
-Snapshot utility — saves annotated frames as evidence images.
+Snapshot store — saves annotated frames as evidence images.
+
+Layout under SNAPSHOT_DIR:
+
+    2025-06-01/cam-01/3fa29c41d07be1c85a16.jpg        full image
+    2025-06-01/cam-01/3fa29c41d07be1c85a16.thumb.jpg  dashboard thumbnail
+
+Files are named after the SHA-256 of the raw frame pixels plus the label
+and box drawn on them (hashed before annotating and the lossy encode), so
+the same frame and detection saved twice on the same day for the same
+camera is stored — and encoded — once.  Days are UTC dates.  The relative
+path is the snapshot id kept on events and served by
+GET /api/snapshots/<id>.  Day directories older than
+SNAPSHOT_RETENTION_DAYS are removed, and the oldest images (with their
+thumbnails) go first once SNAPSHOT_QUOTA_MB is exceeded; both checks run in
+the background at most every SNAPSHOT_SWEEP_SECONDS.
 """
 
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
-import uuid
-from datetime import datetime
-from typing import Optional
+import re
+import shutil
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
 
 import cv2
 import numpy as np
 
-SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
-os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+log = logging.getLogger(__name__)
+
+SNAPSHOT_DIR            = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_QUALITY        = int(os.getenv("SNAPSHOT_QUALITY", "90"))
+SNAPSHOT_THUMB_WIDTH    = int(os.getenv("SNAPSHOT_THUMB_WIDTH", "320"))
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "30"))      # 0 = keep
+SNAPSHOT_QUOTA_MB       = float(os.getenv("SNAPSHOT_QUOTA_MB", "0"))           # 0 = no quota
+SNAPSHOT_SWEEP_SECONDS  = float(os.getenv("SNAPSHOT_SWEEP_SECONDS", "3600"))
+THUMB_QUALITY = 70
+
+_DAY_DIR = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_ID      = re.compile(r"^\d{4}-\d{2}-\d{2}/[^/]+/[0-9a-f]{20}\.jpg$")
 
 
 def save_snapshot(
@@ -23,11 +53,18 @@ def save_snapshot(
     bbox: Optional[list] = None,
 ) -> str:
     """
-    Save an annotated frame to disk.
-    Returns the file path.
+    Save an annotated frame (and its thumbnail) to disk.
+    Returns the snapshot id — its path relative to SNAPSHOT_DIR.
     """
-    annotated = frame.copy()
+    digest = _digest(frame, label, bbox)
+    shard  = os.path.join(datetime.utcnow().date().isoformat(), _safe(camera_id))
+    snapshot_id = f"{shard}/{digest}.jpg".replace(os.sep, "/")
+    path   = os.path.join(SNAPSHOT_DIR, shard, f"{digest}.jpg")
+    if os.path.exists(path):            # identical snapshot already stored
+        _maybe_sweep()
+        return snapshot_id
 
+    annotated = frame.copy()
     if bbox:
         x1, y1, x2, y2 = bbox
         cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 0, 255), 2)
@@ -36,9 +73,146 @@ def save_snapshot(
             cv2.FONT_HERSHEY_SIMPLEX, 0.65, (0, 0, 255), 2,
         )
 
-    ts       = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    uid      = uuid.uuid4().hex[:6]
-    filename = f"{camera_id}_{label}_{ts}_{uid}.jpg"
-    path     = os.path.join(SNAPSHOT_DIR, filename)
-    cv2.imwrite(path, annotated, [cv2.IMWRITE_JPEG_QUALITY, 90])
-    return path
\ No newline at end of file
+    ok, buf = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, SNAPSHOT_QUALITY])
+    if not ok:
+        raise ValueError("Could not encode snapshot")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_atomic(_thumb_path(path), _thumbnail(annotated))
+    _write_atomic(path, buf.tobytes())
+    _maybe_sweep()
+    return snapshot_id
+
+
+def resolve_snapshot(snapshot_id: str, thumb: bool = False) -> Optional[str]:
+    """Filesystem path of a stored snapshot id, or None if unknown / invalid."""
+    if not _ID.match(snapshot_id) or ".." in snapshot_id:
+        return None
+    path = os.path.join(SNAPSHOT_DIR, *snapshot_id.split("/"))
+    if thumb:
+        path = _thumb_path(path)
+    return path if os.path.isfile(path) else None
+
+
+# ─── Helpers ─────────────────────────────────────────────────────────────────
+
+def _digest(frame: np.ndarray, label: str, bbox: Optional[list]) -> str:
+    """Content id of a snapshot: the raw pixels and what gets drawn on them."""
+    h = hashlib.sha256()
+    h.update(repr((frame.shape, str(frame.dtype), label, list(bbox) if bbox else None)).encode())
+    h.update(np.ascontiguousarray(frame).data)
+    return h.hexdigest()[:20]
+
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name).lstrip(".") or "unknown"
+
+
+def _thumb_path(path: str) -> str:
+    return path[:-len(".jpg")] + ".thumb.jpg"
+
+
+def _thumbnail(frame: np.ndarray) -> bytes:
+    h, w = frame.shape[:2]
+    if w > SNAPSHOT_THUMB_WIDTH:
+        frame = cv2.resize(
+            frame, (SNAPSHOT_THUMB_WIDTH, max(1, h * SNAPSHOT_THUMB_WIDTH // w)),
+            interpolation=cv2.INTER_AREA,
+        )
+    _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, THUMB_QUALITY])
+    return buf.tobytes()
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+# ─── Retention ───────────────────────────────────────────────────────────────
+
+_sweep_lock = threading.Lock()
+_next_sweep = 0.0
+
+
+def _maybe_sweep():
+    """Start a background sweep if one is due and none is running."""
+    global _next_sweep
+    if not (SNAPSHOT_RETENTION_DAYS or SNAPSHOT_QUOTA_MB):
+        return
+    now = time.monotonic()
+    if now < _next_sweep or not _sweep_lock.acquire(blocking=False):
+        return
+    _next_sweep = now + SNAPSHOT_SWEEP_SECONDS
+
+    def run():
+        try:
+            sweep()
+        except Exception:
+            log.exception("Snapshot retention sweep failed")
+        finally:
+            _sweep_lock.release()
+
+    threading.Thread(target=run, daemon=True, name="snapshot-sweep").start()
+
+
+def _day_dirs() -> List[Tuple[str, str]]:
+    """(day, path) of every day directory, oldest first."""
+    try:
+        names = sorted(n for n in os.listdir(SNAPSHOT_DIR) if _DAY_DIR.match(n))
+    except FileNotFoundError:
+        return []
+    return [(n, os.path.join(SNAPSHOT_DIR, n)) for n in names]
+
+
+def sweep(today: Optional[date] = None) -> dict:
+    """
+    Apply retention and quota now.  Whole day directories past retention
+    are removed; then, over quota, the oldest images go, each together with
+    its thumbnail.  Returns what was removed.
+    """
+    today   = today or datetime.utcnow().date()
+    removed = {"days": 0, "files": 0, "bytes": 0}
+
+    days = _day_dirs()
+    if SNAPSHOT_RETENTION_DAYS:
+        cutoff = (today - timedelta(days=SNAPSHOT_RETENTION_DAYS)).isoformat()
+        for day, path in days:
+            if day < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed["days"] += 1
+        days = [(d, p) for d, p in days if d >= cutoff]
+
+    if SNAPSHOT_QUOTA_MB:
+        quota = SNAPSHOT_QUOTA_MB * 1024 * 1024
+        images: dict = {}                   # image path → [mtime, size, [files]]
+        for _, day_path in days:
+            for root, _, names in os.walk(day_path):
+                for name in names:
+                    p = os.path.join(root, name)
+                    try:
+                        st = os.stat(p)
+                    except FileNotFoundError:
+                        continue
+                    key   = p[:-len(".thumb.jpg")] + ".jpg" if p.endswith(".thumb.jpg") else p
+                    entry = images.setdefault(key, [st.st_mtime, 0, []])
+                    entry[0] = min(entry[0], st.st_mtime)
+                    entry[1] += st.st_size
+                    entry[2].append(p)
+        total = sum(size for _, size, _ in images.values())
+        for _, size, paths in sorted(images.values()):
+            if total <= quota:
+                break
+            for p in paths:
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed["files"] += len(paths)
+            removed["bytes"] += size
+
+    if any(removed.values()):
+        log.info("Snapshot sweep removed %d day dir(s), %d file(s) (%.1f MB)",
+                 removed["days"], removed["files"], removed["bytes"] / 1e6)
+    return removed
@@ -0,0 +1,129 @@
+"""
+Offline frame sources — recorded video files and synthetic frame
+generators that stand in for a Pi MJPEG stream, so the full pipeline can
+be replayed reproducibly (see server/bench.py).
+
+Both read like MJPEGReader: `read()` returns JPEG bytes (or None once the
+source is exhausted).  Frames are encoded once up front, so replay costs
+no more than receiving them from a camera, and `fps` paces delivery
+(0 = as fast as the pipeline can take them).
+"""
+
+from __future__ import annotations
+
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+JPEG_QUALITY = 80
+
+
+class _ReplaySource:
+    """Cycles through pre-encoded JPEG frames at a fixed rate."""
+
+    yields_jpeg = True
+
+    def __init__(self, frames: List[bytes], fps: float = 0, max_frames: Optional[int] = None):
+        self._frames    = frames
+        self._interval  = 1.0 / fps if fps and fps > 0 else 0.0
+        self.max_frames = max_frames
+        self.served     = 0
+        self._next      = 0.0
+        self._open      = bool(frames)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_frames is not None and self.served >= self.max_frames
+
+    def isOpened(self) -> bool:
+        return self._open
+
+    def read(self) -> Optional[bytes]:
+        if not self._open or self.exhausted:
+            return None
+        if self._interval:
+            now = time.perf_counter()
+            if self._next > now:
+                time.sleep(self._next - now)
+            self._next = max(now, self._next) + self._interval
+        jpeg = self._frames[self.served % len(self._frames)]
+        self.served += 1
+        return jpeg
+
+    def release(self):
+        self._open = False
+
+
+class VideoFileSource(_ReplaySource):
+    """
+    Replays a recorded video file (anything OpenCV can open) in a loop.
+    At most `preload` frames are decoded, resized to `size` and kept as
+    JPEG bytes in memory.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fps: float = 0,
+        max_frames: Optional[int] = None,
+        size: Optional[Tuple[int, int]] = (640, 480),
+        preload: int = 900,
+    ):
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video file {path}")
+        frames: List[bytes] = []
+        try:
+            while len(frames) < preload:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                if size is not None and (frame.shape[1], frame.shape[0]) != tuple(size):
+                    frame = cv2.resize(frame, tuple(size))
+                ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                if ok:
+                    frames.append(buf.tobytes())
+        finally:
+            cap.release()
+        if not frames:
+            raise ValueError(f"No frames could be read from {path}")
+        super().__init__(frames, fps, max_frames)
+
+
+class SyntheticSource(_ReplaySource):
+    """
+    Generated street-like frames: a textured background with a few
+    vehicle-sized blocks drifting across it, deterministic per `seed`.
+    """
+
+    def __init__(
+        self,
+        fps: float = 0,
+        max_frames: Optional[int] = None,
+        size: Tuple[int, int] = (640, 480),
+        distinct: int = 120,
+        seed: int = 0,
+    ):
+        w, h = size
+        rng  = np.random.default_rng(seed)
+        background = cv2.GaussianBlur(
+            rng.integers(60, 200, (h, w, 3), dtype=np.uint8), (0, 0), 3,
+        )
+        blocks = [
+            (rng.integers(0, w), rng.integers(h // 3, h - 60),      # x, y
+             rng.integers(60, 140), rng.integers(40, 80),          # bw, bh
+             rng.uniform(-4, 4),                                   # dx per frame
+             tuple(int(c) for c in rng.integers(0, 255, 3)))
+            for _ in range(4)
+        ]
+        frames: List[bytes] = []
+        for i in range(distinct):
+            frame = background.copy()
+            for x, y, bw, bh, dx, color in blocks:
+                x0 = int(x + dx * i) % w
+                cv2.rectangle(frame, (x0, int(y)), (x0 + int(bw), int(y + bh)), color, -1)
+            ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            frames.append(buf.tobytes())
+        super().__init__(frames, fps, max_frames)
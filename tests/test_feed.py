@@ -0,0 +1,99 @@
+"""
+Live viewers must end when their camera goes away: a DELETE while a feed
+or SSE stream is open closes the generator (and its viewer gauge) instead
+of leaving the thread spinning on a stopped processor — in the Flask app
+and in the ASGI front-end, which must also drop the camera's channel.
+"""
+
+import threading
+import time
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from server import api, metrics
+from server.db import mongo
+from server.processor import ProcessorManager, StreamProcessor
+from server.utils.sources import SyntheticSource
+
+CAMERA = "feed-test"
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    mongo.use_database(mongomock.MongoClient().smart_city_test)
+    manager = ProcessorManager()
+    manager.checkpoints.interval = 0            # no checkpoint files from tests
+    monkeypatch.setattr(api, "manager", manager)
+    manager.add(StreamProcessor(
+        CAMERA, "synthetic://", detectors=[], save_snapshots=False, save_clips=False,
+        source=lambda: SyntheticSource(fps=20, distinct=4),
+    ))
+    yield manager
+    manager.stop_all()
+
+
+@pytest.fixture
+def client(manager):
+    app = api.Flask(__name__)
+    app.register_blueprint(api.bp)
+    return app.test_client()
+
+
+def _viewers() -> float:
+    child = metrics.VIEWERS._children.get((CAMERA,))
+    return child.value if child is not None else 0
+
+
+def _watch(client, path: str, started: threading.Event, done: threading.Event):
+    """Open the stream and read it to the end, in this thread (request context)."""
+    resp = client.get(f"/api/cameras/{CAMERA}/{path}", buffered=False)
+    chunks = iter(resp.response)
+    if path == "feed":
+        assert next(chunks).startswith(b"--frame")
+    started.set()
+    for _ in chunks:
+        pass
+    done.set()
+
+
+@pytest.mark.parametrize("path", ["feed", "annotations"])
+def test_delete_camera_ends_open_viewer(client, path):
+    started, done = threading.Event(), threading.Event()
+    threading.Thread(target=_watch, args=(client, path, started, done), daemon=True).start()
+    assert started.wait(10)
+    deadline = time.monotonic() + 5
+    while _viewers() != 1 and time.monotonic() < deadline:
+        time.sleep(0.05)                        # SSE enters its generator on first read
+    assert _viewers() == 1
+
+    assert client.delete(f"/api/cameras/{CAMERA}").status_code == 200
+
+    assert done.wait(5), f"{path} generator kept running after DELETE"
+    assert _viewers() == 0
+
+
+@pytest.mark.parametrize("path", ["feed", "annotations"])
+def test_delete_camera_ends_open_asgi_viewer(manager, path):
+    pytest.importorskip("a2wsgi")
+    from starlette.testclient import TestClient
+    from server import asgi
+
+    done = threading.Event()
+    with TestClient(asgi.create_app(start_cameras=False)) as client:
+        def watch():
+            client.get(f"/api/cameras/{CAMERA}/{path}")     # returns once the stream ends
+            done.set()
+
+        threading.Thread(target=watch, daemon=True).start()
+        deadline = time.monotonic() + 10
+        while _viewers() != 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert _viewers() == 1
+
+        assert client.delete(f"/api/cameras/{CAMERA}").status_code == 200
+
+        assert done.wait(5), f"ASGI {path} stream kept running after DELETE"
+        assert _viewers() == 0
+        assert CAMERA not in asgi._channels._channels